@@ -1,9 +1,13 @@
 import os
+import sys
 import json
 import yaml
 import vercel_blob
 from datetime import datetime
-from substrateinterface import SubstrateInterface
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'substrate-event-worker'))
+from src.utils.substrate import CachedSubstrateInterface  # noqa: E402
+from src.utils.endpoint_pool import EndpointPool  # noqa: E402
 
 
 class FetchBlockchainData:
@@ -18,22 +22,30 @@ class FetchBlockchainData:
             self.networks = yaml.safe_load(f)
             print(self.networks)
 
-    def connect_to_network(self, url):
+    def connect_to_network(self, urls):
         """
         Establish connection to a substrate network
 
+        Endpoints are tried fastest first, failing over to the next one when a
+        connection fails.
+
+        Runtime metadata is shared with the event worker's on-disk cache, so
+        networks whose runtime did not change since the last run skip the
+        metadata download.
+
         Args:
-            url (str): RPC endpoint URL
+            urls (str | list): RPC endpoint URL or list of URLs
 
         Returns:
-            SubstrateInterface: Connected substrate interface
+            tuple: URL connected to and connected substrate interface, (None, None) on failure
         """
         try:
-            substrate = SubstrateInterface(url=url, ws_options={'timeout': 15})
-            return substrate
+            return EndpointPool(urls).connect(
+                lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': 15})
+            )
         except Exception as e:
-            print(f"Failed to connect to {url}: {str(e)}")
-            return None
+            print(f"Failed to connect to {urls}: {str(e)}")
+            return None, None
 
     def get_block_epoch(self, block_number, substrate):
         block_hash = substrate.get_block_hash(block_number)
@@ -142,7 +154,7 @@ class FetchBlockchainData:
 
         for network_name, network_info in self.networks.items():
             print(f"\nChecking {network_name}...")
-            substrate = self.connect_to_network(network_info['url'])
+            url, substrate = self.connect_to_network(network_info['url'])
 
             if not substrate:
                 continue
@@ -152,7 +164,7 @@ class FetchBlockchainData:
             opengov_result = self.check_opengov_proposal(substrate)
 
             results[network_name] = {
-                'url': network_info['url'],
+                'url': url,
                 'democracy': democracy_result,
                 'opengov': opengov_result,
                 'last_checked': datetime.now().isoformat()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Ingestion throughput benchmark for BlockRangeGovernanceMonitor.
+
+Every scenario runs a fresh monitor in its own process against a local node
+in another process, the synthetic mock node or a replayed recording, so CPU
+time and peak RSS are those of the worker alone. Results are printed as JSON.
+
+    python3 benchmarks/ingestion.py --scenario backfill tip --rules 1 10 100 --events-per-block 10 100
+    python3 benchmarks/ingestion.py --recording hydration-6695830.jsonl.gz --network hydration \\
+        --from-block 6695830 --to-block 6696829
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config.settings import get_rule_matcher  # noqa: E402
+from src.config.ruleset.rule_matcher import EventRule, RuleMatcher  # noqa: E402
+from src.decoding import DecodePool  # noqa: E402
+from src.mock import MockSubstrateNode, ReplayNode, RpcRecording, SyntheticChain  # noqa: E402
+from src.monitoring import BlockRangeGovernanceMonitor  # noqa: E402
+from src.monitoring.tracing import AlertTracer  # noqa: E402
+from src.storage import CheckpointStore, EventArchive  # noqa: E402
+
+logger = logging.getLogger('benchmark')
+
+RESULTS_VERSION = 1
+
+# Chain head of the synthetic chain, blocks before it are backfilled
+MOCK_HEIGHT = 1_000_000
+
+
+def build_matcher(base_rules: List[EventRule], count: int) -> RuleMatcher:
+    """
+    Pad a rule set to `count` rules with rules that never match
+
+    The padding alternates between conditions on transfers and extrinsic
+    results, which are decoded and evaluated for every such event, and rules
+    on pallets the chain does not have, which only grow the index.
+    """
+    rules = list(base_rules)
+    for i in range(count - len(rules)):
+        kind = i % 3
+        if kind == 0:
+            rules.append(EventRule('Balances', 'Transfer', {'amount': {'gt': 10 ** 40 + i}}))
+        elif kind == 1:
+            rules.append(EventRule('System', 'ExtrinsicSuccess', {'dispatch_info.weight': {'gt': 10 ** 30 + i}}))
+        else:
+            rules.append(EventRule(f"Pallet{i}", f"Event{i}", {}))
+    return RuleMatcher(rules)
+
+
+class BenchmarkTracer(AlertTracer):
+    """Alert tracer that also counts alerts and remembers when the first one was matched"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.alerts = 0
+        self.first_alert_at = None
+
+    def begin(self, *args, **kwargs):
+        if self.first_alert_at is None:
+            self.first_alert_at = time.monotonic()
+        self.alerts += 1
+        return super().begin(*args, **kwargs)
+
+
+class BenchmarkMonitor(BlockRangeGovernanceMonitor):
+    """Monitor counting the blocks and events it processes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.blocks = 0
+        self.events = 0
+
+    def process_events(self, block_number, events, event_count=None):
+        super().process_events(block_number, events, event_count)
+        self.blocks += 1
+        self.events += event_count if event_count is not None else len(events)
+
+
+def serve_node(source: Dict[str, Any], ready) -> None:
+    """Run the mock or replay node of a scenario, putting its URL on `ready` once listening"""
+    logging.basicConfig(level=logging.WARNING)
+
+    async def serve():
+        if source.get('recording'):
+            node = ReplayNode(RpcRecording(source['recording']), latency_scale=source['latency_scale'], port=0)
+        else:
+            chain = SyntheticChain(
+                start_block=MOCK_HEIGHT,
+                block_time=source['block_time'],
+                events_per_block=source['events_per_block'],
+                alert_rate=source['alert_rate'],
+                seed=source['seed']
+            )
+            node = MockSubstrateNode(chain=chain, port=0, latency=source['latency'], jitter=source['jitter'])
+        await node.start()
+        ready.put(node.url)
+        await node.serve_forever()
+
+    asyncio.run(serve())
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def drive(monitor: BenchmarkMonitor, spec: Dict[str, Any]) -> None:
+    """Run monitor_blocks until the backfill range is processed or the tip duration elapsed"""
+    task = asyncio.ensure_future(monitor.monitor_blocks(spec['start_block']))
+    deadline = time.monotonic() + spec['timeout']
+    try:
+        while not task.done() and time.monotonic() < deadline:
+            if spec['end_block'] is not None and (monitor.current_block or 0) > spec['end_block']:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    await monitor.tracer.flush()
+
+
+def run_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario in this (fresh) process and measure it"""
+    logging.basicConfig(level=logging.DEBUG if spec['verbose'] else logging.WARNING,
+                        format='%(levelname)s - %(name)s - %(message)s')
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Queue()
+    node = ctx.Process(target=serve_node, args=(spec['source'], ready), daemon=True)
+    node.start()
+    decode_pool = None
+
+    try:
+        url = ready.get(timeout=60)
+        base_rules = [EventRule('Referenda', None, {})]
+        if spec['source'].get('recording'):
+            base_rules = get_rule_matcher(spec['network']).rules
+        if spec['decode_workers']:
+            decode_pool = DecodePool(workers=spec['decode_workers'] if spec['decode_workers'] > 0 else None)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            monitor = BenchmarkMonitor(
+                network_name=spec['network'],
+                urls=url,
+                fetch_mode=spec['fetch_mode'],
+                decode_pool=decode_pool,
+                matcher=build_matcher(base_rules, spec['rules'])
+            )
+            try:
+                # Write checkpoints, archived events and traces of the run to the temporary directory
+                monitor.checkpoints.close()
+                monitor.archive.close()
+                monitor.checkpoints = CheckpointStore(spec['network'], db_path=Path(tmp) / 'checkpoints.db')
+                monitor.archive = EventArchive(db_path=Path(tmp) / 'events.db')
+                monitor.tracer = BenchmarkTracer(spec['network'], monitor.metrics, reader=monitor.reader,
+                                                 trace_path=Path(tmp) / 'alerts.jsonl')
+
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                started = time.monotonic()
+                asyncio.run(drive(monitor, spec))
+                elapsed = time.monotonic() - started
+                usage_end = resource.getrusage(resource.RUSAGE_SELF)
+
+                latencies = []
+                if monitor.tracer.trace_path.exists():
+                    with open(monitor.tracer.trace_path) as f:
+                        for line in f:
+                            latency = json.loads(line).get('latency', {})
+                            if 'notified' in latency:
+                                latencies.append(latency['notified'])
+            finally:
+                monitor.close()
+    finally:
+        if decode_pool is not None:
+            decode_pool.close()
+        node.terminate()
+        node.join()
+
+    cpu = (usage_end.ru_utime - usage.ru_utime) + (usage_end.ru_stime - usage.ru_stime)
+    tracer = monitor.tracer
+    return {
+        'scenario': spec['scenario'],
+        'source': 'recording' if spec['source'].get('recording') else 'mock',
+        'network': spec['network'],
+        'fetch_mode': spec['fetch_mode'],
+        'decode_workers': spec['decode_workers'],
+        'rules': spec['rules'],
+        'events_per_block': spec['source'].get('events_per_block'),
+        'rpc_latency': spec['source'].get('latency'),
+        'blocks': monitor.blocks,
+        'events': monitor.events,
+        'alerts': tracer.alerts,
+        'seconds': round(elapsed, 3),
+        'blocks_per_second': round(monitor.blocks / elapsed, 2) if elapsed else None,
+        'events_per_second': round(monitor.events / elapsed, 2) if elapsed else None,
+        'cpu_seconds': round(cpu, 3),
+        'cpu_ms_per_block': round(cpu * 1000 / monitor.blocks, 3) if monitor.blocks else None,
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        'peak_rss_mb': round(usage_end.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+        'time_to_first_alert': round(tracer.first_alert_at - started, 3) if tracer.first_alert_at else None,
+        # Seconds from block timestamp to notification, only meaningful for blocks produced during the run
+        'alert_latency': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'max': max(latencies)
+        } if latencies and spec['scenario'] == 'tip' else None
+    }
+
+
+def build_specs(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Expand the options into one spec per scenario run"""
+    specs = []
+    common = {'decode_workers': args.decode_workers, 'verbose': args.verbose}
+
+    if args.recording:
+        if 'tip' in args.scenario:
+            logger.warning("The tip scenario needs a live chain, only backfill is run against a recording")
+        for fetch_mode, rules in itertools.product(args.fetch_mode, args.rules):
+            specs.append({
+                **common,
+                'scenario': 'backfill',
+                'network': args.network,
+                'fetch_mode': fetch_mode,
+                'rules': rules,
+                'start_block': args.from_block,
+                'end_block': args.to_block,
+                'timeout': args.timeout,
+                'source': {'recording': os.path.abspath(args.recording), 'latency_scale': args.latency_scale}
+            })
+        return specs
+
+    finalized = MOCK_HEIGHT - 2
+    for scenario, fetch_mode, rules, density in itertools.product(
+            args.scenario, args.fetch_mode, args.rules, args.events_per_block):
+        backfill = scenario == 'backfill'
+        specs.append({
+            **common,
+            'scenario': scenario,
+            'network': 'benchmark',
+            'fetch_mode': fetch_mode,
+            'rules': rules,
+            # A backfill covers the last `blocks` finalized blocks of a chain that does not grow,
+            # the tip scenario follows a growing chain from its finalized head for `duration` seconds
+            'start_block': finalized - args.blocks + 1 if backfill else None,
+            'end_block': finalized if backfill else None,
+            'timeout': args.timeout if backfill else args.duration,
+            'source': {
+                'block_time': 0 if backfill else args.block_time,
+                'events_per_block': density,
+                'alert_rate': args.alert_rate,
+                'latency': args.latency,
+                'jitter': args.jitter,
+                'seed': args.seed
+            }
+        })
+    return specs
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Benchmark block ingestion of the event worker',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('--scenario', nargs='+', default=['backfill', 'tip'], choices=['backfill', 'tip'],
+                        help='Catch up on a range of finalized blocks, or follow the chain tip')
+    parser.add_argument('--rules', type=int, nargs='+', default=[1, 10, 100],
+                        help='Rule counts, padded with rules that never match')
+    parser.add_argument('--events-per-block', type=int, nargs='+', default=[10, 100],
+                        help='Average events per block of the mock chain')
+    parser.add_argument('--fetch-mode', nargs='+', default=['range'], choices=['range', 'batch', 'pipelined', 'async'],
+                        help='Fetch modes to run, a recording only replays with the fetch mode it was recorded with')
+    parser.add_argument('--decode-workers', type=int, default=0,
+                        help='Decode pool processes (0 = decode inline, -1 = one per CPU)')
+    parser.add_argument('--blocks', type=int, default=2000, help='Blocks per backfill')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per tip run')
+    parser.add_argument('--block-time', type=float, default=0.5, help='Seconds between blocks in tip runs')
+    parser.add_argument('--alert-rate', type=float, default=0.05, help='Fraction of mock blocks with an alert')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock node latency per message in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Mock node random extra latency in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the mock chain')
+    parser.add_argument('--recording', type=str, help='Replay this recording instead of the mock chain')
+    parser.add_argument('--network', type=str, help='Network of the recording, selects its rules')
+    parser.add_argument('--from-block', type=int, help='First recorded block to process')
+    parser.add_argument('--to-block', type=int, help='Last recorded block to process')
+    parser.add_argument('--latency-scale', type=float, default=0.0,
+                        help='Multiple of the recorded latency to replay with (0 = full speed)')
+    parser.add_argument('--timeout', type=float, default=600, help='Give up on a backfill after this many seconds')
+    parser.add_argument('--output', type=str, help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show the worker log')
+
+    args = parser.parse_args()
+    if args.recording and (not args.network or args.from_block is None or args.to_block is None):
+        parser.error('--recording needs --network, --from-block and --to-block')
+    return args
+
+
+def main() -> None:
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+
+    results = []
+    for spec in build_specs(args):
+        logger.info(f"Running {spec['scenario']} ({spec['fetch_mode']}, {spec['rules']} rules, "
+                    f"{spec['source'].get('events_per_block', 'recorded')} events per block)")
+        # A fresh process per scenario, so caches and peak RSS never carry over
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            result = executor.submit(run_scenario, spec).result()
+        logger.info(f"  {result['blocks_per_second']} blocks/s, {result['events_per_second']} events/s, "
+                    f"{result['cpu_ms_per_block']} ms CPU per block, {result['peak_rss_mb']} MB peak RSS")
+        results.append(result)
+
+    report = {
+        'version': RESULTS_VERSION,
+        'created': time.time(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
+import json
 import os
 import logging
-from src.monitoring import BlockRangeGovernanceMonitor
-from src.config import load_config, get_network_names
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.monitoring import BlockRangeGovernanceMonitor, MetricsServer, ShardedBackfill, ALERT_QUEUE_POLICIES
+from src.decoding import DecodePool
+from src.storage import EventArchive
+from src.sinks import create_sinks, EventSink, SINK_TYPES
+from src.mock import MockSubstrateNode, RecordingProxy, ReplayNode, RpcRecording, SyntheticChain
+from src.config import load_config, get_network_names, DEFAULT_CONFIG
+from src.utils import SamplingProfiler, install_profile_signal
 import sys
 
 logging.basicConfig(
@@ -33,9 +42,10 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument(
         '--network',
         type=str,
-        default='polkadot',
-        help='Network to monitor',
-        choices=get_network_names()
+        nargs='+',
+        default=['polkadot'],
+        help='Network(s) to monitor: one or more names (space or comma separated), or "all". '
+             f'Available: {", ".join(get_network_names())}'
     )
 
     parser.add_argument(
@@ -44,6 +54,66 @@ def parse_arguments() -> argparse.Namespace:
         help='Starting block number (default: latest)'
     )
 
+    parser.add_argument(
+        '--fetch-mode',
+        type=str,
+        default=DEFAULT_CONFIG['fetch_mode'],
+        choices=['range', 'batch', 'pipelined', 'async'],
+        help='How blocks are fetched: range storage queries, JSON-RPC batches, concurrent per-block requests '
+             'or concurrent JSON-RPC batches over one asyncio connection'
+    )
+
+    parser.add_argument(
+        '--fetch-window',
+        type=int,
+        default=DEFAULT_CONFIG['fetch_window'],
+        help='Number of blocks fetched concurrently (1 = sequential)'
+    )
+
+    parser.add_argument(
+        '--decode-workers',
+        type=int,
+        default=DEFAULT_CONFIG['decode_workers'],
+        help='Worker processes decoding events in range/batch fetch modes (0 = decode inline, -1 = one per CPU)'
+    )
+
+    parser.add_argument(
+        '--follow-mode',
+        type=str,
+        default=DEFAULT_CONFIG['follow_mode'],
+        choices=['subscribe', 'poll'],
+        help='How new finalized blocks are followed at the chain tip'
+    )
+
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=DEFAULT_CONFIG['hedge_reads'],
+        help='Repeat slow finalized head and referendum reads on a second endpoint, taking the first answer'
+    )
+
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=DEFAULT_CONFIG['metrics_port'],
+        help='Serve Prometheus /metrics and /healthz on this port (0 = disabled)'
+    )
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Sample stacks for the first --profile-window seconds and write a collapsed-stack profile to '
+             'src/storage/data/profiles. A running worker also takes a profile on SIGUSR1'
+    )
+
+    parser.add_argument(
+        '--profile-window',
+        type=float,
+        default=DEFAULT_CONFIG['profile_window'],
+        metavar='SECONDS',
+        help='Seconds sampled by --profile'
+    )
+
     parser.add_argument(
         '--debug',
         action='store_true',
@@ -62,38 +132,539 @@ def parse_arguments() -> argparse.Namespace:
         help='Enable Discord notifications via Redis webhook system'
     )
 
+    parser.add_argument(
+        '--alert-queue-policy',
+        type=str,
+        default=DEFAULT_CONFIG['alert_queue_policy'],
+        choices=ALERT_QUEUE_POLICIES,
+        help=f'What to do when {DEFAULT_CONFIG["alert_queue_size"]} alerts wait for delivery: block processing '
+             'until notifiers catch up, drop the lowest priority alert (rules listed last) or spill alerts to disk'
+    )
+
+    parser.add_argument(
+        '--sink',
+        type=str,
+        nargs='+',
+        default=[],
+        choices=SINK_TYPES,
+        help='Publish matched events as JSON lines to rotating files in src/storage/data/events, '
+             'Redis Streams and/or stdout'
+    )
+
+    parser.add_argument(
+        '--redis-url',
+        type=str,
+        default=DEFAULT_CONFIG['redis_url'],
+        help='Redis server of the redis sink'
+    )
+
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+
+    query_parser = subparsers.add_parser(
+        'query',
+        help='Search the archive of matched events instead of monitoring',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    query_parser.add_argument(
+        '--network',
+        type=str,
+        nargs='+',
+        help='Network(s) to search, space or comma separated (default: all)'
+    )
+
+    query_parser.add_argument(
+        '--module',
+        type=str,
+        help='Pallet name, e.g. Referenda (case-insensitive)'
+    )
+
+    query_parser.add_argument(
+        '--event',
+        type=str,
+        help='Event name, e.g. DecisionDepositPlaced (case-insensitive)'
+    )
+
+    query_parser.add_argument(
+        '--referendum',
+        type=int,
+        help='Referendum index'
+    )
+
+    query_parser.add_argument(
+        '--from-block',
+        type=int,
+        help='First block to include'
+    )
+
+    query_parser.add_argument(
+        '--to-block',
+        type=int,
+        help='Last block to include'
+    )
+
+    query_parser.add_argument(
+        '--limit',
+        type=int,
+        default=100,
+        help='Maximum number of events to show, newest first (0 = no limit)'
+    )
+
+    query_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print events as JSON lines'
+    )
+
+    backfill_parser = subparsers.add_parser(
+        'backfill',
+        help='Process a historical block range in parallel shards instead of monitoring',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    backfill_parser.add_argument(
+        '--network',
+        type=str,
+        required=True,
+        help='Network to backfill'
+    )
+
+    backfill_parser.add_argument(
+        '--from-block',
+        type=int,
+        required=True,
+        help='First block to process'
+    )
+
+    backfill_parser.add_argument(
+        '--to-block',
+        type=int,
+        required=True,
+        help='Last block to process'
+    )
+
+    backfill_parser.add_argument(
+        '--shards',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of shards, each fetched by its own worker process and connection'
+    )
+
+    mock_parser = subparsers.add_parser(
+        'mock-node',
+        help='Serve a synthetic chain over a local substrate JSON-RPC websocket, for offline testing and benchmarks',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    mock_parser.add_argument(
+        '--host',
+        type=str,
+        default='127.0.0.1',
+        help='Address to listen on'
+    )
+
+    mock_parser.add_argument(
+        '--port',
+        type=int,
+        default=9944,
+        help='Port to listen on (0 = any free port)'
+    )
+
+    mock_parser.add_argument(
+        '--height',
+        type=int,
+        default=1_000_000,
+        help='Number of the chain head at startup, every earlier block can be fetched'
+    )
+
+    mock_parser.add_argument(
+        '--block-time',
+        type=float,
+        default=6.0,
+        help='Seconds between produced blocks (0 = the chain never grows)'
+    )
+
+    mock_parser.add_argument(
+        '--events-per-block',
+        type=int,
+        default=20,
+        help='Average number of events in a block'
+    )
+
+    mock_parser.add_argument(
+        '--alert-rate',
+        type=float,
+        default=0.01,
+        help='Fraction of blocks carrying a Referenda event'
+    )
+
+    mock_parser.add_argument(
+        '--upgrade-every',
+        type=int,
+        default=0,
+        help='Bump the runtime spec version every N blocks (0 = never)'
+    )
+
+    mock_parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.0,
+        help='Seconds before every message is answered'
+    )
+
+    mock_parser.add_argument(
+        '--jitter',
+        type=float,
+        default=0.0,
+        help='Up to this many seconds of random latency added to every message'
+    )
+
+    mock_parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of calls answered with an internal error'
+    )
+
+    mock_parser.add_argument(
+        '--throttle-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of calls answered with a "429 Too Many Requests" error'
+    )
+
+    mock_parser.add_argument(
+        '--drop-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of messages answered by dropping the connection'
+    )
+
+    mock_parser.add_argument(
+        '--max-batch-size',
+        type=int,
+        default=0,
+        help='Reject JSON-RPC batches with more calls as too large (0 = no limit)'
+    )
+
+    mock_parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed of the synthetic chain and of the injected faults'
+    )
+
+    record_parser = subparsers.add_parser(
+        'record',
+        help='Proxy a node and record every JSON-RPC request and response for replay',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    record_parser.add_argument(
+        '--upstream',
+        type=str,
+        required=True,
+        help='Node to record, e.g. wss://rpc.polkadot.io'
+    )
+
+    record_parser.add_argument(
+        '--output',
+        type=str,
+        help='Recording file (default: src/storage/data/recordings/recording-{time}.jsonl.gz)'
+    )
+
+    record_parser.add_argument(
+        '--host',
+        type=str,
+        default='127.0.0.1',
+        help='Address to listen on'
+    )
+
+    record_parser.add_argument(
+        '--port',
+        type=int,
+        default=9944,
+        help='Port to listen on (0 = any free port)'
+    )
+
+    replay_parser = subparsers.add_parser(
+        'replay',
+        help='Serve a recording made with the record command as a local node',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    replay_parser.add_argument(
+        'recording',
+        type=str,
+        help='Recording file'
+    )
+
+    replay_parser.add_argument(
+        '--host',
+        type=str,
+        default='127.0.0.1',
+        help='Address to listen on'
+    )
+
+    replay_parser.add_argument(
+        '--port',
+        type=int,
+        default=9944,
+        help='Port to listen on (0 = any free port)'
+    )
+
+    replay_parser.add_argument(
+        '--latency-scale',
+        type=float,
+        default=0.0,
+        help='Multiple of the recorded latency to wait before answering (0 = full speed, 1 = as recorded)'
+    )
+
     return parser.parse_args()
 
 
+def resolve_networks(requested: List[str], config: Dict[str, Any]) -> List[str]:
+    """Expand the --network values into a list of configured network names"""
+    names = [name.strip() for value in requested for name in value.split(',') if name.strip()]
+    if 'all' in names:
+        return list(config.keys())
+
+    unknown = [name for name in names if name not in config]
+    if unknown:
+        raise ValueError(f"Network(s) not found in configuration: {', '.join(unknown)}")
+
+    # Preserve order, drop duplicates
+    return list(dict.fromkeys(names))
+
+
+def run_query(args: argparse.Namespace) -> None:
+    """Print archived events matching the query options"""
+    networks = [name.strip() for value in args.network or [] for name in value.split(',') if name.strip()]
+    if 'all' in networks:
+        networks = []
+
+    archive = EventArchive()
+    try:
+        events = archive.query(
+            networks=networks,
+            module=args.module,
+            event=args.event,
+            referendum_index=args.referendum,
+            from_block=args.from_block,
+            to_block=args.to_block,
+            limit=args.limit or None
+        )
+    finally:
+        archive.close()
+
+    for event in events:
+        if args.json:
+            print(json.dumps(event))
+            continue
+        referendum = f" [referendum {event['referendum_index']}]" if event['referendum_index'] is not None else ''
+        print(f"{event['network']} #{event['block_number']}-{event['event_idx']} "
+              f"{event['module_id']}.{event['event_id']}{referendum} {json.dumps(event['attributes'])}")
+
+    if not args.json:
+        print(f"{len(events)} event(s)")
+
+
+async def run_backfill(args: argparse.Namespace, config: Dict[str, Any], sinks: List[EventSink]) -> None:
+    """Backfill a block range of one network and wait until it is fully covered"""
+    if args.network not in config:
+        logger.error(f"Network not found in configuration: {args.network}")
+        return
+    if args.to_block < args.from_block:
+        logger.error("--to-block must not be lower than --from-block")
+        return
+
+    backfill = ShardedBackfill(
+        network_name=args.network,
+        urls=config[args.network]['url'],
+        start_block=args.from_block,
+        end_block=args.to_block + 1,
+        shards=args.shards,
+        fetch_mode=args.fetch_mode,
+        sinks=sinks
+    )
+    try:
+        await backfill.run()
+    finally:
+        backfill.close()
+
+
+async def run_mock_node(args: argparse.Namespace) -> None:
+    """Serve a synthetic chain until interrupted"""
+    chain = SyntheticChain(
+        start_block=args.height,
+        block_time=args.block_time,
+        events_per_block=args.events_per_block,
+        alert_rate=args.alert_rate,
+        upgrade_every=args.upgrade_every,
+        seed=args.seed
+    )
+    node = MockSubstrateNode(
+        chain=chain,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        drop_rate=args.drop_rate,
+        max_batch_size=args.max_batch_size,
+        seed=args.seed
+    )
+    try:
+        await node.serve_forever()
+    finally:
+        await node.close()
+        logger.info(f"Mock node served {node.stats}")
+
+
+async def run_recorder(args: argparse.Namespace) -> None:
+    """Record the traffic to a node until interrupted"""
+    output = args.output or (Path(__file__).parent / 'src' / 'storage' / 'data' / 'recordings' /
+                             f"recording-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+    proxy = RecordingProxy(args.upstream, output, host=args.host, port=args.port)
+    try:
+        await proxy.serve_forever()
+    finally:
+        await proxy.close()
+
+
+async def run_replay(args: argparse.Namespace) -> None:
+    """Serve a recording until interrupted"""
+    node = ReplayNode(RpcRecording(args.recording), latency_scale=args.latency_scale, host=args.host,
+                      port=args.port)
+    try:
+        await node.serve_forever()
+    finally:
+        await node.close()
+        logger.info(f"Replay node served {node.stats}")
+
+
+async def run_monitor(monitor: BlockRangeGovernanceMonitor, start_block: Optional[int]) -> None:
+    """Run one network's monitor so that its failure never stops the other networks"""
+    try:
+        logger.info(f"Starting monitoring for {monitor.network_name}")
+        await monitor.monitor_blocks(start_block)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Monitoring for {monitor.network_name} stopped: {str(e)}")
+        logger.debug(f"Monitoring for {monitor.network_name} stopped", exc_info=True)
+
+
 async def main() -> None:
     """Main entry point for the blockchain monitor"""
+    monitors = []
+    sinks = []
+    decode_pool = None
+    metrics_server = None
+    profiler = None
     try:
         args = parse_arguments()
 
         if args.debug:
             logging.getLogger().setLevel(logging.DEBUG)
 
+        if 'stdout' in args.sink:
+            # Keep stdout for event records, log to stderr instead
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                    handler.setStream(sys.stderr)
+
+        # Profile on demand (SIGUSR1) and, with --profile, from the start
+        profiler = SamplingProfiler(interval=DEFAULT_CONFIG['profile_interval'])
+        install_profile_signal(profiler, DEFAULT_CONFIG['profile_window'])
+        if args.profile:
+            profiler.start(args.profile_window)
+
+        if args.command == 'query':
+            run_query(args)
+            return
+
+        if args.command == 'mock-node':
+            await run_mock_node(args)
+            return
+
+        if args.command == 'record':
+            await run_recorder(args)
+            return
+
+        if args.command == 'replay':
+            await run_replay(args)
+            return
+
         config = load_config(args.config)
 
-        if args.network not in config:
-            logger.error(f"Network {args.network} not found in configuration")
+        if args.command == 'backfill':
+            sinks = create_sinks(args.sink, redis_url=args.redis_url)
+            await run_backfill(args, config, sinks)
+            return
+
+        try:
+            networks = resolve_networks(args.network, config)
+        except ValueError as e:
+            logger.error(str(e))
+            return
+
+        if len(networks) > 1 and args.watch:
+            logger.error("Interactive display mode (--watch) supports a single network only")
+            return
+
+        if len(networks) > 1 and args.start_block is not None:
+            logger.error("--start-block can only be used with a single network")
+            return
+
+        if args.watch and 'stdout' in args.sink:
+            logger.error("The stdout sink cannot be used with interactive display mode (--watch)")
             return
 
         if args.watch:
             os.system('cls' if os.name == 'nt' else 'clear')
 
-        # Initialize monitor
-        monitor = BlockRangeGovernanceMonitor(
-            network_name=args.network,
-            ws_url=config[args.network]['url'],
-            display_mode=args.watch,
-            debug=args.debug,
-            enable_discord=args.discord
-        )
+        # Event sinks are shared by every network, each network writes its own batches
+        sinks = create_sinks(args.sink, redis_url=args.redis_url)
+
+        # One decode pool shared by every network in the process
+        if args.decode_workers:
+            decode_pool = DecodePool(
+                workers=args.decode_workers if args.decode_workers > 0 else None,
+                chunk_size=DEFAULT_CONFIG['decode_chunk_size']
+            )
+
+        # Initialize one monitor per network, all sharing this process and event loop
+        for network in networks:
+            monitors.append(BlockRangeGovernanceMonitor(
+                network_name=network,
+                urls=config[network]['url'],
+                display_mode=args.watch,
+                debug=args.debug,
+                enable_discord=args.discord,
+                fetch_mode=args.fetch_mode,
+                fetch_window=args.fetch_window,
+                follow_mode=args.follow_mode,
+                decode_pool=decode_pool,
+                hedge=args.hedge,
+                alert_policy=args.alert_queue_policy,
+                sinks=sinks
+            ))
+
+        if args.metrics_port:
+            # Healthy while every monitor keeps reading the chain or processing blocks
+            metrics_server = MetricsServer(
+                args.metrics_port,
+                host=DEFAULT_CONFIG['metrics_host'],
+                health_check=lambda: all(
+                    monitor.metrics.is_healthy(DEFAULT_CONFIG['health_max_stall']) for monitor in monitors
+                )
+            )
+            metrics_server.start()
 
         # Start monitoring
-        logger.info(f"Starting monitoring for {args.network}")
-        await monitor.monitor_blocks(args.start_block)
+        await asyncio.gather(*(run_monitor(monitor, args.start_block) for monitor in monitors))
 
     except KeyboardInterrupt:
         logger.info("\nShutting down...")
@@ -101,6 +672,17 @@ async def main() -> None:
         logger.error(f"Fatal error: {str(e)}")
         if args.debug:
             logger.exception(e)
+    finally:
+        if profiler is not None and profiler.running:
+            profiler.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+        for monitor in monitors:
+            monitor.close()
+        for sink in sinks:
+            sink.close()
+        if decode_pool is not None:
+            decode_pool.close()
 
 
 if __name__ == "__main__":
@@ -108,4 +690,3 @@ if __name__ == "__main__":
         asyncio.run(main())
     except KeyboardInterrupt:
         pass
-    
\ No newline at end of file
@@ -3,6 +3,7 @@ from .settings import (
     get_network_names,
     get_network_urls,
     get_monitored_events,
+    get_rule_matcher,
     DEFAULT_CONFIG
 )
 
@@ -11,5 +12,6 @@ __all__ = [
     'get_network_names',
     'get_network_urls',
     'get_monitored_events',
+    'get_rule_matcher',
     'DEFAULT_CONFIG'
 ]
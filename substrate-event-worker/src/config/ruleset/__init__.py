@@ -1,3 +1,4 @@
 from .rules_store import RulesStore
+from .rule_matcher import RuleMatcher, EventRule
 
-__all__ = ['RulesStore']
\ No newline at end of file
+__all__ = ['RulesStore', 'RuleMatcher', 'EventRule']
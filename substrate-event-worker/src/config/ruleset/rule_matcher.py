@@ -0,0 +1,162 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for attribute paths that do not exist on an event
+MISSING = object()
+
+
+def normalize_value(value: Any) -> Any:
+    """Normalize numbers and numeric strings so attribute values compare consistently"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            number = float(value)
+            return int(number) if number.is_integer() else number
+        except ValueError:
+            pass
+    return value
+
+
+def resolve_path(attributes: Any, path: Tuple[str, ...]) -> Any:
+    """Look up a dotted attribute path in decoded event attributes"""
+    value = attributes
+    for key in path:
+        if isinstance(value, dict):
+            if key not in value:
+                return MISSING
+            value = value[key]
+        elif isinstance(value, (list, tuple)) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return MISSING
+    return value
+
+
+class Predicate:
+    """A single compiled comparison against one event attribute"""
+
+    OPERATORS = ('eq', 'ne', 'in', 'not_in', 'gt', 'gte', 'lt', 'lte')
+
+    def __init__(self, path: str, operator: str, operand: Any):
+        if operator not in self.OPERATORS:
+            raise ValueError(f"Unknown operator '{operator}' for '{path}'")
+
+        self.path = tuple(path.split('.'))
+        self.operator = operator
+
+        if operator in ('in', 'not_in'):
+            if not isinstance(operand, (list, tuple, set)):
+                raise ValueError(f"Operator '{operator}' for '{path}' needs a list")
+            self.operand = frozenset(normalize_value(item) for item in operand)
+        else:
+            self.operand = normalize_value(operand)
+
+        if operator in ('gt', 'gte', 'lt', 'lte') and not isinstance(self.operand, (int, float)):
+            raise ValueError(f"Operator '{operator}' for '{path}' needs a number")
+
+    def __call__(self, attributes: Any) -> bool:
+        value = resolve_path(attributes, self.path)
+        if value is MISSING:
+            return False
+
+        value = normalize_value(value)
+        operator = self.operator
+
+        if operator == 'eq':
+            return value == self.operand
+        if operator == 'ne':
+            return value != self.operand
+        if operator == 'in':
+            return isinstance(value, (str, int, float)) and value in self.operand
+        if operator == 'not_in':
+            return not (isinstance(value, (str, int, float)) and value in self.operand)
+
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        if operator == 'gt':
+            return value > self.operand
+        if operator == 'gte':
+            return value >= self.operand
+        if operator == 'lt':
+            return value < self.operand
+        return value <= self.operand
+
+    def __repr__(self):
+        return f"{'.'.join(self.path)} {self.operator} {self.operand!r}"
+
+
+class EventRule(NamedTuple):
+    """A monitored module/event with optional attribute conditions"""
+    module: str
+    event: Optional[str]
+    where: Dict[str, Any]
+
+
+def compile_predicates(where: Dict[str, Any]) -> List[Predicate]:
+    """
+    Compile a `where` mapping into predicates
+
+    Each key is a dotted attribute path. A scalar value means equality, a mapping
+    holds one or more operators that must all hold, e.g. `track: {in: [0, 1]}`.
+    """
+    predicates = []
+    for path, condition in (where or {}).items():
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                predicates.append(Predicate(str(path), operator, operand))
+        else:
+            predicates.append(Predicate(str(path), 'eq', condition))
+    return predicates
+
+
+class RuleMatcher:
+    """
+    Compiled form of a network's rules.
+
+    Rules are indexed by lower-cased (module, event) so a lookup costs two dict
+    hits; an event matches if any rule for it has all its predicates satisfied.
+    Rules listed first have the highest priority when alerts must be dropped.
+    """
+
+    def __init__(self, rules: List[EventRule]):
+        self.rules = rules
+        self._index: Dict[Tuple[str, Optional[str]], List[Tuple[str, List[Predicate]]]] = {}
+        self._priority: Dict[str, int] = {}
+
+        for position, rule in enumerate(rules):
+            key = (rule.module.lower(), rule.event.lower() if rule.event else None)
+            name = f"{rule.module}.{rule.event if rule.event else '*'}"
+            self._index.setdefault(key, []).append((name, compile_predicates(rule.where)))
+            self._priority.setdefault(name, position)
+
+    @property
+    def event_filters(self) -> List[Tuple[str, Optional[str]]]:
+        """The (module, event) pairs of all rules, without their predicates"""
+        return [(rule.module, rule.event) for rule in self.rules]
+
+    def match(self, module_id: str, event_id: str, attributes: Any) -> Optional[str]:
+        """Get the name ('Module.Event' or 'Module.*') of the first rule a decoded event satisfies, if any"""
+        module_id = module_id.lower()
+        candidates = self._index.get((module_id, event_id.lower()), []) + self._index.get((module_id, None), [])
+
+        for name, predicates in candidates:
+            if all(predicate(attributes) for predicate in predicates):
+                return name
+        return None
+
+    def priority(self, name: str) -> int:
+        """Priority of a rule name returned by match(), its position in the rules (0 = most important)"""
+        return self._priority.get(name, len(self.rules))
+
+    def matches(self, module_id: str, event_id: str, attributes: Any) -> bool:
+        """Check whether a decoded event satisfies any rule"""
+        return self.match(module_id, event_id, attributes) is not None
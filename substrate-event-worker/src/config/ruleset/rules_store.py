@@ -2,10 +2,17 @@ import os
 import yaml
 import logging
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+from .rule_matcher import EventRule, RuleMatcher, compile_predicates
 
 logger = logging.getLogger(__name__)
 
+# Compiled matchers keyed by rules file, reused until the file changes
+_compiled_rules: Dict[Path, Tuple[Optional[float], RuleMatcher]] = {}
+
+# Keys allowed in a rule with attribute conditions
+RULE_KEYS = ('event', 'where')
+
 
 class RulesStore:
     def __init__(self, network_name: str):
@@ -21,12 +28,16 @@ class RulesStore:
 
     def load_rules(self) -> List[Tuple[str, Optional[str]]]:
         """Load monitoring rules for the network"""
+        return [(rule.module, rule.event) for rule in self.load_event_rules()]
+
+    def load_event_rules(self) -> List[EventRule]:
+        """Load monitoring rules for the network, including attribute conditions"""
         try:
             if not self.rules_file.exists():
                 logger.warning(f"No rules file found for {self.network_name}, using defaults")
                 return [
-                    ('democracy', None),
-                    ('referenda', None)
+                    EventRule('democracy', None, {}),
+                    EventRule('referenda', None, {})
                 ]
 
             with open(self.rules_file, 'r') as f:
@@ -40,12 +51,29 @@ class RulesStore:
             for rule in rules_data:
                 if isinstance(rule, str):
                     # If rule is just a module name, monitor all events
-                    parsed_rules.append((rule, None))
+                    parsed_rules.append(EventRule(rule, None, {}))
                 elif isinstance(rule, dict) and len(rule) == 1:
-                    # If rule is a dict with module and specific event
                     module = list(rule.keys())[0]
                     event = rule[module]
-                    parsed_rules.append((module, event))
+                    if isinstance(event, dict):
+                        # Rule with attribute conditions, e.g. {event: Submitted, where: {track: {in: [0, 1]}}}
+                        unknown_keys = set(event) - set(RULE_KEYS)
+                        if unknown_keys:
+                            # A misspelled key would otherwise widen the rule to every event of the module
+                            logger.warning(f"Skipping rule with unknown keys {sorted(unknown_keys)}: {rule}")
+                            continue
+                        if event.get('where') is not None and not isinstance(event['where'], dict):
+                            logger.warning(f"Skipping rule whose 'where' is not a mapping: {rule}")
+                            continue
+                        try:
+                            compile_predicates(event.get('where'))
+                        except ValueError as e:
+                            logger.warning(f"Skipping invalid rule condition {rule}: {e}")
+                            continue
+                        parsed_rules.append(EventRule(module, event.get('event'), event.get('where') or {}))
+                    else:
+                        # If rule is a dict with module and specific event
+                        parsed_rules.append(EventRule(module, event, {}))
                 else:
                     logger.warning(f"Skipping invalid rule format: {rule}")
 
@@ -55,19 +83,38 @@ class RulesStore:
             logger.error(f"Failed to load rules: {e}")
             return []
 
-    def save_rules(self, rules: List[Tuple[str, Optional[str]]]) -> None:
-        """Save monitoring rules for the network"""
+    def compile_rules(self) -> RuleMatcher:
+        """
+        Get the compiled matcher for the network's rules
+
+        The compiled matcher is cached and only rebuilt when the rules file changes.
+        """
+        mtime = self.rules_file.stat().st_mtime if self.rules_file.exists() else None
+        cached = _compiled_rules.get(self.rules_file)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        matcher = RuleMatcher(self.load_event_rules())
+        _compiled_rules[self.rules_file] = (mtime, matcher)
+        return matcher
+
+    def save_rules(self, rules: List[EventRule]) -> None:
+        """Save monitoring rules for the network, including attribute conditions"""
         try:
             # Convert rules to YAML-friendly format
             rules_data = []
-            for module, event in rules:
-                if event is None:
-                    rules_data.append(module)
+            for rule in rules:
+                if rule.where:
+                    condition = {'event': rule.event} if rule.event is not None else {}
+                    condition['where'] = rule.where
+                    rules_data.append({rule.module: condition})
+                elif rule.event is None:
+                    rules_data.append(rule.module)
                 else:
-                    rules_data.append({module: event})
+                    rules_data.append({rule.module: rule.event})
 
             with open(self.rules_file, 'w') as f:
-                yaml.safe_dump(rules_data, f, default_flow_style=False)
+                yaml.safe_dump(rules_data, f, default_flow_style=False, sort_keys=False)
 
             logger.debug(f"Saved rules for {self.network_name}")
         except Exception as e:
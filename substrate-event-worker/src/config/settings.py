@@ -1,8 +1,8 @@
 import yaml
 import os
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Union
 from pathlib import Path
-from .ruleset import RulesStore
+from .ruleset import RulesStore, RuleMatcher
 
 # Default configuration values
 DEFAULT_CONFIG = {
@@ -10,7 +10,41 @@ DEFAULT_CONFIG = {
     'connection_timeout': 15,
     'retry_delay': 5,
     'max_events': 50,
-    'max_alerts': 100
+    'max_alerts': 100,
+    'fetch_mode': 'range',
+    'fetch_window': 16,
+    'rpc_batch_size': 1000,
+    'rpc_window': 32,
+    'decode_workers': 0,
+    'decode_chunk_size': 100,
+    'max_block_retries': 3,
+    'follow_mode': 'subscribe',
+    'subscription_timeout': 60,
+    'subscription_retry_delay': 60,
+    'checkpoint_interval': 5,
+    'checkpoint_blocks': 100,
+    'lag_threshold': 100,
+    'tip_batch_size': 50,
+    'tip_in_flight': 2,
+    'hedge_reads': False,
+    'hedge_percentile': 95,
+    'hedge_max_ratio': 0.1,
+    'metrics_port': 0,
+    'metrics_host': '127.0.0.1',
+    'health_max_stall': 300,
+    'profile_interval': 0.01,
+    'profile_window': 30,
+    'alert_trace_max_age': 3600,
+    'alert_queue_size': 1000,
+    'alert_queue_policy': 'block',
+    'notifier_workers': 4,
+    'sink_batch_size': 500,
+    'sink_jsonl_max_bytes': 64 * 1024 * 1024,
+    'sink_jsonl_backups': 5,
+    'redis_url': 'redis://localhost:6379/0',
+    'redis_stream_key': 'substrate:events:{network}',
+    'redis_stream_maxlen': 100000,
+    'redis_consumer_groups': ['notifications']
 }
 
 
@@ -96,8 +130,12 @@ def validate_config(config: Dict[str, Any]) -> None:
         if 'url' not in settings:
             raise ConfigurationError(f"Network '{network}' is missing 'url' setting")
 
-        if not isinstance(settings['url'], str):
-            raise ConfigurationError(f"Network '{network}' URL must be a string")
+        urls = settings['url']
+        if isinstance(urls, list):
+            if not urls or not all(isinstance(url, str) for url in urls):
+                raise ConfigurationError(f"Network '{network}' URL list must contain one or more strings")
+        elif not isinstance(urls, str):
+            raise ConfigurationError(f"Network '{network}' URL must be a string or a list of strings")
 
 
 def get_monitored_events(network_name: str) -> List[Tuple[str, Optional[str]]]:
@@ -106,12 +144,17 @@ def get_monitored_events(network_name: str) -> List[Tuple[str, Optional[str]]]:
     return rules_store.load_rules()
 
 
-def get_network_urls() -> Dict[str, str]:
+def get_rule_matcher(network_name: str) -> RuleMatcher:
+    """Get the compiled rule matcher for a specific network"""
+    return RulesStore(network_name).compile_rules()
+
+
+def get_network_urls() -> Dict[str, Union[str, List[str]]]:
     """
     Get dictionary of network names and their WebSocket URLs
 
     Returns:
-        Dict[str, str]: Dictionary of network names and URLs
+        Dict[str, Union[str, List[str]]]: Dictionary of network names and their URL or list of URLs
     """
     config = load_config()
     return {name: settings['url'] for name, settings in config.items()}
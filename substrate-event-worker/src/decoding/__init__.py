@@ -0,0 +1,13 @@
+from .scale_skip import ScaleSkipper, decode_compact
+from .event_decoder import LazyEventDecoder, RuntimeEventDecoders
+from .decode_pool import DecodePool, RuntimeSpec, decode_blocks
+
+__all__ = [
+    'ScaleSkipper',
+    'decode_compact',
+    'LazyEventDecoder',
+    'RuntimeEventDecoders',
+    'DecodePool',
+    'RuntimeSpec',
+    'decode_blocks'
+]
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from scalecodec.base import RuntimeConfigurationObject, ScaleBytes
+from scalecodec.type_registry import load_type_registry_preset
+from .event_decoder import LazyEventDecoder
+from ..utils.substrate import decode_events_value
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeSpec(NamedTuple):
+    """Everything a decode worker needs to rebuild a runtime"""
+    key: str
+    spec_version: int
+    metadata_path: str
+    ss58_format: Optional[int]
+    type_registry_preset: Optional[str]
+
+
+# Runtimes loaded in this worker process, keyed by RuntimeSpec.key
+_worker_runtimes: Dict[str, Tuple[RuntimeConfigurationObject, Any]] = {}
+
+# Lazy decoders in this worker process, keyed by runtime key and rule filters
+_worker_decoders: Dict[Tuple[str, tuple], Optional[LazyEventDecoder]] = {}
+
+
+def _load_runtime(runtime: RuntimeSpec) -> Tuple[RuntimeConfigurationObject, Any]:
+    """Decode the metadata of a runtime once per worker process and keep it warm"""
+    if runtime.key not in _worker_runtimes:
+        runtime_config = RuntimeConfigurationObject()
+        runtime_config.update_type_registry(load_type_registry_preset(name="core"))
+        if runtime.type_registry_preset:
+            runtime_config.update_type_registry(load_type_registry_preset(name=runtime.type_registry_preset))
+
+        with open(runtime.metadata_path, 'r') as f:
+            metadata = runtime_config.create_scale_object('MetadataVersioned', data=ScaleBytes(f.read()))
+        metadata.decode()
+
+        if metadata.portable_registry:
+            runtime_config.implements_scale_info = True
+            runtime_config.add_portable_registry(metadata)
+        runtime_config.set_active_spec_version_id(runtime.spec_version)
+        if runtime.ss58_format is not None:
+            runtime_config.ss58_format = runtime.ss58_format
+
+        _worker_runtimes[runtime.key] = (runtime_config, metadata)
+
+    return _worker_runtimes[runtime.key]
+
+
+def decode_blocks(runtime: RuntimeSpec, matcher, blocks: List[Tuple[int, Optional[str]]]) -> List[tuple]:
+    """
+    Decode and filter the System.Events of blocks sharing one runtime (runs in a worker process)
+
+    Args:
+        runtime (RuntimeSpec): Runtime the blocks were produced with
+        matcher (RuleMatcher): Compiled rules, used to skip and filter events
+        blocks (List[Tuple[int, Optional[str]]]): Block numbers with their raw System.Events
+
+    Returns:
+        List[tuple]: (block_number, events, event_count) for each block, in order
+    """
+    runtime_config, metadata = _load_runtime(runtime)
+
+    decoder_key = (runtime.key, tuple(matcher.event_filters))
+    if decoder_key not in _worker_decoders:
+        try:
+            _worker_decoders[decoder_key] = LazyEventDecoder(metadata, matcher.event_filters)
+        except Exception:
+            _worker_decoders[decoder_key] = None
+    decoder = _worker_decoders[decoder_key]
+
+    results = []
+    for block_number, raw_events in blocks:
+        if not raw_events:
+            results.append((block_number, None, 0))
+            continue
+
+        if decoder is None:
+            events = decode_events_value(runtime_config, metadata, raw_events)
+            event_count = len(events)
+        else:
+            event_count, events = decoder.decode(runtime_config, raw_events)
+
+        events = [
+            event for event in events
+            if matcher.matches(event['module_id'], event['event_id'], event.get('attributes'))
+        ]
+        results.append((block_number, events, event_count))
+
+    return results
+
+
+class DecodePool:
+    """
+    Decode System.Events in a pool of worker processes.
+
+    Workers read the raw metadata of each runtime from the on-disk metadata cache
+    (or, for connections without one, from a copy written once to a scratch
+    directory), decode it on first use and keep it warm per runtime, so a task
+    only carries the raw event bytes of its blocks. One pool can be shared by
+    every network monitored in the process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 100):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self.metadata_dir = Path(tempfile.mkdtemp(prefix='substrate-event-metadata-'))
+        self._runtimes: Dict[str, RuntimeSpec] = {}
+        self._lock = threading.Lock()
+
+    def register_runtime(self, network_name: str, substrate) -> RuntimeSpec:
+        """
+        Make the runtime currently loaded in `substrate` available to the workers
+
+        Args:
+            network_name (str): Network the runtime belongs to
+            substrate (SubstrateInterface): Connection with the runtime loaded by init_runtime
+
+        Returns:
+            RuntimeSpec: Handle to pass along with blocks of this runtime
+        """
+        key = f"{network_name}-{substrate.runtime_version}"
+        with self._lock:
+            if key not in self._runtimes:
+                cached_metadata_path = getattr(substrate, 'cached_metadata_path', None)
+                metadata_path = cached_metadata_path() if cached_metadata_path else None
+                if metadata_path is None:
+                    metadata_path = self.metadata_dir / f"{key}.scale"
+                    metadata_path.write_text(substrate.metadata.data.to_hex())
+                self._runtimes[key] = RuntimeSpec(
+                    key=key,
+                    spec_version=substrate.runtime_version,
+                    metadata_path=str(metadata_path),
+                    ss58_format=substrate.ss58_format,
+                    type_registry_preset=substrate.type_registry_preset
+                )
+            return self._runtimes[key]
+
+    def submit(self, runtime: RuntimeSpec, matcher, blocks: List[Tuple[int, Optional[str]]]) -> asyncio.Future:
+        """Schedule decoding of blocks that share one runtime, returning an awaitable future"""
+        return asyncio.wrap_future(self.executor.submit(decode_blocks, runtime, matcher, blocks))
+
+    def close(self) -> None:
+        """Stop the worker processes and remove the scratch metadata"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.metadata_dir, ignore_errors=True)
@@ -0,0 +1,138 @@
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from scalecodec.base import ScaleBytes
+from .scale_skip import ScaleSkipper, decode_compact
+from ..utils.substrate import decode_events_storage
+
+logger = logging.getLogger(__name__)
+
+
+def parse_type_id(type_string: str) -> int:
+    """Extract the portable registry id from a 'scale_info::<id>' type string"""
+    prefix, _, type_id = type_string.partition('::')
+    if prefix != 'scale_info' or not type_id.isdigit():
+        raise ValueError(f"Not a scale-info type: {type_string}")
+    return int(type_id)
+
+
+class LazyEventDecoder:
+    """
+    Decode System.Events, fully decoding only the records that match the rules.
+
+    Rules are resolved against runtime metadata into a set of (pallet_index,
+    event_index) pairs. Every EventRecord is walked with ScaleSkipper to peek at
+    its two index bytes and find where it ends; only matching records are passed
+    to scalecodec, everything else stays an undecoded slice of the storage value.
+    """
+
+    def __init__(self, metadata, rules: List[Tuple[str, Optional[str]]]):
+        self.metadata = metadata
+
+        portable_types = metadata.portable_registry.value['types']
+        self.skipper = ScaleSkipper(portable_types)
+
+        storage_function = metadata.get_metadata_pallet('System').get_storage_function('Events')
+        events_type = self.skipper.definitions[parse_type_id(storage_function.get_value_type_string())]
+        self.record_type_id = events_type['sequence']['type']
+        self.record_type_string = f"scale_info::{self.record_type_id}"
+
+        self.record_fields = self.skipper.definitions[self.record_type_id]['composite']['fields']
+        if not any(field['name'] == 'event' for field in self.record_fields):
+            raise ValueError("EventRecord has no 'event' field")
+
+        self.monitored = self.compile_rules(rules)
+
+    def compile_rules(self, rules: List[Tuple[str, Optional[str]]]) -> Set[Tuple[int, int]]:
+        """Resolve (module, event) rules into the (pallet_index, event_index) pairs of this runtime"""
+        wanted = {}
+        for module, event in rules:
+            events = wanted.setdefault(module.lower(), set())
+            events.add(event.lower() if event else None)
+
+        monitored = set()
+        for pallet in self.metadata.pallets:
+            pallet_name = pallet.value['name'].lower()
+            pallet_event = pallet.value.get('event')
+            if pallet_name not in wanted or not pallet_event:
+                continue
+
+            for variant in self.skipper.variants.get(pallet_event['ty'], {}).values():
+                if None in wanted[pallet_name] or variant['name'].lower() in wanted[pallet_name]:
+                    monitored.add((pallet.value['index'], variant['index']))
+
+        return monitored
+
+    def decode(self, runtime_config, raw_events: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Decode the records of a System.Events value that match the rules
+
+        Args:
+            runtime_config: Runtime configuration with this runtime's type registry loaded
+            raw_events (str): Hex encoded storage value of System.Events
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: Total number of events and the decoded matching records,
+                each with its position in the block as 'event_idx'
+        """
+        data = bytes.fromhex(raw_events[2:])
+        event_count, offset = decode_compact(data, 0)
+        matched = []
+
+        for event_idx in range(event_count):
+            record_start = offset
+            indices = None
+
+            for field in self.record_fields:
+                if field['name'] == 'event':
+                    indices = (data[offset], data[offset + 1])
+                offset = self.skipper.skip(field['type'], data, offset)
+
+            if indices in self.monitored:
+                record = runtime_config.create_scale_object(
+                    type_string=self.record_type_string,
+                    data=ScaleBytes(bytearray(data[record_start:offset])),
+                    metadata=self.metadata
+                )
+                decoded = record.decode()
+                decoded['event_idx'] = event_idx
+                matched.append(decoded)
+
+        return event_count, matched
+
+
+class RuntimeEventDecoders:
+    """
+    Lazy event decoders for every runtime seen by one connection.
+
+    Decoders are built once per spec version. Runtimes without a portable type
+    registry (metadata before V14) fall back to decoding every event.
+    """
+
+    def __init__(self, rules: List[Tuple[str, Optional[str]]]):
+        self.rules = rules
+        self._decoders: Dict[int, Optional[LazyEventDecoder]] = {}
+
+    def get_decoder(self, substrate) -> Optional[LazyEventDecoder]:
+        """Get the lazy decoder for the runtime currently loaded in `substrate`"""
+        spec_version = substrate.runtime_version
+        if spec_version not in self._decoders:
+            try:
+                self._decoders[spec_version] = LazyEventDecoder(substrate.metadata, self.rules)
+            except Exception as e:
+                logger.warning(f"Lazy event decoding unavailable for runtime {spec_version}, "
+                               f"decoding all events: {e}")
+                self._decoders[spec_version] = None
+        return self._decoders[spec_version]
+
+    def decode(self, substrate, raw_events: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Decode the monitored events of a System.Events value with the current runtime
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: Total number of events and the decoded events
+        """
+        decoder = self.get_decoder(substrate)
+        if decoder is None:
+            events = decode_events_storage(substrate, raw_events)
+            return len(events), events
+        return decoder.decode(substrate.runtime_config, raw_events)
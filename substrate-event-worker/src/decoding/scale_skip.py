@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Tuple
+
+PRIMITIVE_SIZES = {
+    'bool': 1, 'char': 4,
+    'u8': 1, 'u16': 2, 'u32': 4, 'u64': 8, 'u128': 16, 'u256': 32,
+    'i8': 1, 'i16': 2, 'i32': 4, 'i64': 8, 'i128': 16, 'i256': 32,
+}
+
+
+def decode_compact(data, offset: int) -> Tuple[int, int]:
+    """
+    Decode a SCALE compact integer
+
+    Args:
+        data: Buffer holding the encoded value
+        offset (int): Position of the first byte
+
+    Returns:
+        Tuple[int, int]: The decoded value and the offset just past it
+    """
+    mode = data[offset] & 0b11
+    if mode == 0:
+        return data[offset] >> 2, offset + 1
+    if mode == 1:
+        return int.from_bytes(data[offset:offset + 2], 'little') >> 2, offset + 2
+    if mode == 2:
+        return int.from_bytes(data[offset:offset + 4], 'little') >> 2, offset + 4
+    length = (data[offset] >> 2) + 4
+    return int.from_bytes(data[offset + 1:offset + 1 + length], 'little'), offset + 1 + length
+
+
+class ScaleSkipper:
+    """
+    Walk SCALE encoded data using a scale-info portable type registry without decoding it.
+
+    Only the bytes needed to find the encoded length of a value are read, so
+    values can be skipped for a fraction of the cost of a scalecodec decode.
+    Fixed-size types are resolved once and skipped in a single step.
+    """
+
+    def __init__(self, portable_types: List[dict]):
+        self.definitions = {item['id']: item['type']['def'] for item in portable_types}
+        self.variants = {}
+        self._fixed_sizes: Dict[int, Optional[int]] = {}
+
+        for type_id, definition in self.definitions.items():
+            if 'variant' in definition:
+                self.variants[type_id] = {
+                    variant['index']: variant for variant in definition['variant']['variants']
+                }
+
+    def fixed_size(self, type_id: int) -> Optional[int]:
+        """Encoded size of a type if it is the same for every value, otherwise None"""
+        if type_id in self._fixed_sizes:
+            return self._fixed_sizes[type_id]
+
+        # Guard against recursive types while the size is being resolved
+        self._fixed_sizes[type_id] = None
+        size = self._resolve_fixed_size(self.definitions[type_id])
+        self._fixed_sizes[type_id] = size
+        return size
+
+    def _resolve_fixed_size(self, definition: dict) -> Optional[int]:
+        kind, value = next(iter(definition.items()))
+
+        if kind == 'primitive':
+            return PRIMITIVE_SIZES.get(value)
+        if kind == 'composite':
+            return self._sum_fixed(field['type'] for field in value['fields'])
+        if kind == 'tuple':
+            return self._sum_fixed(value)
+        if kind == 'array':
+            size = self.fixed_size(value['type'])
+            return None if size is None else size * value['len']
+        if kind == 'variant':
+            sizes = set(
+                self._sum_fixed(field['type'] for field in variant['fields'])
+                for variant in value['variants']
+            )
+            if len(sizes) == 1 and None not in sizes:
+                return 1 + sizes.pop()
+        return None
+
+    def _sum_fixed(self, type_ids) -> Optional[int]:
+        total = 0
+        for type_id in type_ids:
+            size = self.fixed_size(type_id)
+            if size is None:
+                return None
+            total += size
+        return total
+
+    def skip(self, type_id: int, data, offset: int) -> int:
+        """
+        Skip over a value of the given type
+
+        Args:
+            type_id (int): Portable registry id of the encoded type
+            data: Buffer holding the encoded value
+            offset (int): Position of the first byte of the value
+
+        Returns:
+            int: The offset just past the value
+        """
+        size = self.fixed_size(type_id)
+        if size is not None:
+            return offset + size
+
+        kind, value = next(iter(self.definitions[type_id].items()))
+
+        if kind == 'composite':
+            return self.skip_fields(value['fields'], data, offset)
+
+        if kind == 'variant':
+            variant = self.variants[type_id][data[offset]]
+            return self.skip_fields(variant['fields'], data, offset + 1)
+
+        if kind == 'sequence':
+            length, offset = decode_compact(data, offset)
+            return self._skip_repeated(value['type'], length, data, offset)
+
+        if kind == 'array':
+            return self._skip_repeated(value['type'], value['len'], data, offset)
+
+        if kind == 'tuple':
+            for element_type in value:
+                offset = self.skip(element_type, data, offset)
+            return offset
+
+        if kind == 'compact':
+            _, offset = decode_compact(data, offset)
+            return offset
+
+        if kind == 'primitive' and value == 'str':
+            length, offset = decode_compact(data, offset)
+            return offset + length
+
+        if kind == 'bitsequence':
+            bits, offset = decode_compact(data, offset)
+            store_bits = 8 * (self.fixed_size(value['bit_store_type']) or 1)
+            return offset + -(-bits // store_bits) * (store_bits // 8)
+
+        raise ValueError(f"Cannot skip type {type_id} ({kind})")
+
+    def skip_fields(self, fields: List[dict], data, offset: int) -> int:
+        """Skip over the encoded fields of a composite or variant"""
+        for field in fields:
+            offset = self.skip(field['type'], data, offset)
+        return offset
+
+    def _skip_repeated(self, element_type: int, count: int, data, offset: int) -> int:
+        size = self.fixed_size(element_type)
+        if size is not None:
+            return offset + size * count
+        for _ in range(count):
+            offset = self.skip(element_type, data, offset)
+        return offset
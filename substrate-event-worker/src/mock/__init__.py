@@ -0,0 +1,12 @@
+from .chain import SyntheticChain
+from .node import MockSubstrateNode
+from .recording import RecordingProxy, RpcRecording
+from .replay import ReplayNode
+
+__all__ = [
+    'SyntheticChain',
+    'MockSubstrateNode',
+    'RecordingProxy',
+    'RpcRecording',
+    'ReplayNode'
+]
@@ -0,0 +1,141 @@
+import hashlib
+import random
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from . import metadata as runtime
+
+
+class SyntheticChain:
+    """
+    A deterministic chain of the synthetic mock runtime.
+
+    Blocks 0 to `start_block` exist from the start; after that one block is
+    produced every `block_time` seconds (never with a block_time of 0) and is
+    finalized `finality_lag` blocks later. A block's hash, timestamp and events
+    depend only on its number and `seed`, so every run serves the same chain.
+
+    Every block carries the timestamp inherent and `events_per_block` events on
+    average (transfers with their ExtrinsicSuccess). With probability
+    `alert_rate` a block also carries a referendum lifecycle event. The runtime
+    is upgraded every `upgrade_every` blocks, only bumping the spec version, so
+    runtime segmentation can be exercised.
+    """
+
+    def __init__(self, start_block: int = 1_000_000, block_time: float = 6.0, finality_lag: int = 2,
+                 events_per_block: int = 20, alert_rate: float = 0.01, upgrade_every: int = 0,
+                 spec_version: int = 1000, seed: int = 0):
+        self.start_block = start_block
+        self.block_time = block_time
+        self.finality_lag = finality_lag
+        self.events_per_block = events_per_block
+        self.alert_rate = alert_rate
+        self.upgrade_every = upgrade_every
+        self.base_spec_version = spec_version
+        self.seed = seed
+        self.started = time.time()
+        self.metadata = runtime.build_metadata()
+
+    def head(self) -> int:
+        """Number of the best block"""
+        if not self.block_time:
+            return self.start_block
+        return self.start_block + int((time.time() - self.started) / self.block_time)
+
+    def finalized_head(self) -> int:
+        """Number of the last finalized block"""
+        return max(0, self.head() - self.finality_lag)
+
+    def block_hash(self, block_number: int) -> Optional[str]:
+        """Hash of a block, None for blocks not produced yet. The number is embedded in the first 8 bytes"""
+        if block_number < 0 or block_number > self.head():
+            return None
+        digest = hashlib.sha256(f"{self.seed}:{block_number}".encode()).digest()
+        return '0x' + struct.pack('>Q', block_number).hex() + digest[:24].hex()
+
+    def block_number(self, block_hash: Optional[str]) -> Optional[int]:
+        """Number of the block with a hash, the best block for None, None for unknown hashes"""
+        if block_hash is None:
+            return self.head()
+        try:
+            block_number = struct.unpack('>Q', bytes.fromhex(block_hash[2:18]))[0]
+        except (ValueError, struct.error):
+            return None
+        return block_number if self.block_hash(block_number) == block_hash else None
+
+    def header(self, block_number: int) -> Dict[str, Any]:
+        """JSON header of a block as returned by chain_getHeader"""
+        return {
+            'parentHash': self.block_hash(block_number - 1) if block_number > 0 else '0x' + '00' * 32,
+            'number': hex(block_number),
+            'stateRoot': '0x' + hashlib.sha256(f"state:{self.seed}:{block_number}".encode()).hexdigest(),
+            'extrinsicsRoot': '0x' + hashlib.sha256(f"ext:{self.seed}:{block_number}".encode()).hexdigest(),
+            'digest': {'logs': []}
+        }
+
+    def spec_version(self, block_number: int) -> int:
+        """Spec version of the runtime at a block"""
+        if not self.upgrade_every:
+            return self.base_spec_version
+        return self.base_spec_version + block_number // self.upgrade_every
+
+    def timestamp(self, block_number: int) -> int:
+        """Timestamp.Now of a block in milliseconds"""
+        block_time = self.block_time or 6.0
+        return int((self.started + (block_number - self.start_block) * block_time) * 1000)
+
+    def events(self, block_number: int) -> str:
+        """Hex encoded System.Events value of a block"""
+        return runtime.encode_events([record for _, record in self._records(block_number)])
+
+    def referendum_events(self, block_number: int) -> List[str]:
+        """Names of the Referenda events of a block, the alerts the worker should raise for it"""
+        return [name for name, _ in self._records(block_number) if name.startswith('Referenda.')]
+
+    def _records(self, block_number: int) -> List[Tuple[str, bytes]]:
+        """Encoded event records of a block with their names"""
+        rng = random.Random(self.seed * 1_000_003 + block_number)
+        records = [('System.ExtrinsicSuccess', self._success(rng, 0))]
+
+        transfers = rng.randint(0, max(0, self.events_per_block - 1)) // 2
+        for extrinsic_index in range(1, transfers + 1):
+            records.append(('Balances.Transfer', runtime.encode_event_record(
+                (runtime.PHASE_APPLY_EXTRINSIC, extrinsic_index),
+                runtime.BALANCES_PALLET, runtime.BALANCES_EVENTS['Transfer'],
+                self._account(rng) + self._account(rng) + rng.randrange(10 ** 14).to_bytes(16, 'little')
+            )))
+            records.append(('System.ExtrinsicSuccess', self._success(rng, extrinsic_index)))
+
+        if rng.random() < self.alert_rate:
+            records.append(self._referendum_event(rng, transfers + 1))
+
+        return records
+
+    @staticmethod
+    def _account(rng: random.Random) -> bytes:
+        return rng.getrandbits(256).to_bytes(32, 'little')
+
+    @staticmethod
+    def _success(rng: random.Random, extrinsic_index: int) -> bytes:
+        weight = rng.randrange(10 ** 9)
+        return runtime.encode_event_record(
+            (runtime.PHASE_APPLY_EXTRINSIC, extrinsic_index),
+            runtime.SYSTEM_PALLET, runtime.SYSTEM_EVENTS['ExtrinsicSuccess'],
+            struct.pack('<Q', weight) + b'\x01'
+        )
+
+    def _referendum_event(self, rng: random.Random, extrinsic_index: int) -> Tuple[str, bytes]:
+        name = rng.choice(sorted(runtime.REFERENDA_EVENTS))
+        index = struct.pack('<I', rng.randrange(2000))
+        if name == 'Submitted':
+            fields = index + struct.pack('<H', rng.randrange(40)) + rng.getrandbits(256).to_bytes(32, 'little')
+        elif name == 'DecisionDepositPlaced':
+            fields = index + self._account(rng) + rng.randrange(10 ** 14).to_bytes(16, 'little')
+        elif name == 'DecisionStarted':
+            fields = index + struct.pack('<H', rng.randrange(40))
+        else:
+            fields = index
+        return f"Referenda.{name}", runtime.encode_event_record(
+            (runtime.PHASE_APPLY_EXTRINSIC, extrinsic_index),
+            runtime.REFERENDA_PALLET, runtime.REFERENDA_EVENTS[name], fields
+        )
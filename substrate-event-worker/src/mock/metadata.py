@@ -0,0 +1,269 @@
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+# Pallet indices, as on Polkadot
+SYSTEM_PALLET = 0
+TIMESTAMP_PALLET = 3
+BALANCES_PALLET = 5
+REFERENDA_PALLET = 21
+
+# Event indices within their pallet, as on Polkadot
+SYSTEM_EVENTS = {'ExtrinsicSuccess': 0, 'NewAccount': 3}
+BALANCES_EVENTS = {'Transfer': 2}
+REFERENDA_EVENTS = {
+    'Submitted': 0,
+    'DecisionDepositPlaced': 1,
+    'DecisionStarted': 4,
+    'Confirmed': 7,
+    'Approved': 8,
+    'Rejected': 9
+}
+
+# Phase variants of an EventRecord
+PHASE_APPLY_EXTRINSIC = 0
+PHASE_FINALIZATION = 1
+
+
+def encode_compact(value: int) -> bytes:
+    """SCALE compact encoding of an unsigned integer"""
+    if value < 1 << 6:
+        return bytes([value << 2])
+    if value < 1 << 14:
+        return struct.pack('<H', (value << 2) | 1)
+    if value < 1 << 30:
+        return struct.pack('<I', (value << 2) | 2)
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+    return bytes([((len(data) - 4) << 2) | 3]) + data
+
+
+def encode_str(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return encode_compact(len(data)) + data
+
+
+def encode_bytes(value: bytes) -> bytes:
+    return encode_compact(len(value)) + value
+
+
+def encode_vec(items: List[bytes]) -> bytes:
+    return encode_compact(len(items)) + b''.join(items)
+
+
+def encode_option(value: Optional[bytes]) -> bytes:
+    return b'\x00' if value is None else b'\x01' + value
+
+
+def _field(name: Optional[str], type_id: int, type_name: Optional[str] = None) -> bytes:
+    return (encode_option(None if name is None else encode_str(name)) + encode_compact(type_id) +
+            encode_option(None if type_name is None else encode_str(type_name)) + encode_vec([]))
+
+
+def _type(type_id: int, path: List[str], definition: bytes, params: List[Tuple[str, Optional[int]]] = ()) -> bytes:
+    encoded_params = [
+        encode_str(name) + encode_option(None if param_type is None else encode_compact(param_type))
+        for name, param_type in params
+    ]
+    return (encode_compact(type_id) + encode_vec([encode_str(part) for part in path]) +
+            encode_vec(encoded_params) + definition + encode_vec([]))
+
+
+def _composite(fields: List[bytes]) -> bytes:
+    return b'\x00' + encode_vec(fields)
+
+
+def _variant(variants: List[Tuple[str, int, List[bytes]]]) -> bytes:
+    return b'\x01' + encode_vec([
+        encode_str(name) + encode_vec(fields) + bytes([index]) + encode_vec([])
+        for name, index, fields in variants
+    ])
+
+
+def _sequence(type_id: int) -> bytes:
+    return b'\x02' + encode_compact(type_id)
+
+
+def _array(length: int, type_id: int) -> bytes:
+    return b'\x03' + struct.pack('<I', length) + encode_compact(type_id)
+
+
+def _tuple(type_ids: List[int]) -> bytes:
+    return b'\x04' + encode_vec([encode_compact(type_id) for type_id in type_ids])
+
+
+def _primitive(kind: str) -> bytes:
+    kinds = ['bool', 'char', 'str', 'u8', 'u16', 'u32', 'u64', 'u128', 'u256']
+    return b'\x05' + bytes([kinds.index(kind)])
+
+
+# Portable registry ids of the synthetic runtime
+U8, U16, U32, U64, U128, BYTES32, ACCOUNT_ID, VEC_U8, BOOL, PHASE = range(10)
+DISPATCH_INFO, SYSTEM_EVENT, REFERENDA_EVENT, H256, BALANCES_EVENT, RUNTIME_EVENT = range(10, 16)
+EVENT_RECORD, VEC_H256, VEC_EVENT_RECORD, RUNTIME_CALL, SYSTEM_CALL, EXTRINSIC, EMPTY_TUPLE = range(16, 23)
+REFERENDUM_INFO = 23
+
+
+def _registry() -> bytes:
+    types = [
+        _type(U8, [], _primitive('u8')),
+        _type(U16, [], _primitive('u16')),
+        _type(U32, [], _primitive('u32')),
+        _type(U64, [], _primitive('u64')),
+        _type(U128, [], _primitive('u128')),
+        _type(BYTES32, [], _array(32, U8)),
+        _type(ACCOUNT_ID, ['sp_core', 'crypto', 'AccountId32'], _composite([_field(None, BYTES32, '[u8; 32]')])),
+        _type(VEC_U8, [], _sequence(U8)),
+        _type(BOOL, [], _primitive('bool')),
+        _type(PHASE, ['frame_system', 'Phase'], _variant([
+            ('ApplyExtrinsic', PHASE_APPLY_EXTRINSIC, [_field(None, U32, 'u32')]),
+            ('Finalization', PHASE_FINALIZATION, []),
+            ('Initialization', 2, [])
+        ])),
+        _type(DISPATCH_INFO, ['frame_support', 'dispatch', 'DispatchInfo'], _composite([
+            _field('weight', U64, 'u64'),
+            _field('pays_fee', BOOL, 'bool')
+        ])),
+        _type(SYSTEM_EVENT, ['frame_system', 'pallet', 'Event'], _variant([
+            ('ExtrinsicSuccess', SYSTEM_EVENTS['ExtrinsicSuccess'], [_field('dispatch_info', DISPATCH_INFO)]),
+            ('NewAccount', SYSTEM_EVENTS['NewAccount'], [_field('account', ACCOUNT_ID, 'T::AccountId')])
+        ]), [('T', None)]),
+        _type(REFERENDA_EVENT, ['pallet_referenda', 'pallet', 'Event'], _variant([
+            ('Submitted', REFERENDA_EVENTS['Submitted'], [
+                _field('index', U32, 'ReferendumIndex'),
+                _field('track', U16, 'TrackIdOf<T, I>'),
+                _field('proposal_hash', H256, 'T::Hash')
+            ]),
+            ('DecisionDepositPlaced', REFERENDA_EVENTS['DecisionDepositPlaced'], [
+                _field('index', U32, 'ReferendumIndex'),
+                _field('who', ACCOUNT_ID, 'T::AccountId'),
+                _field('amount', U128, 'BalanceOf<T, I>')
+            ]),
+            ('DecisionStarted', REFERENDA_EVENTS['DecisionStarted'], [
+                _field('index', U32, 'ReferendumIndex'),
+                _field('track', U16, 'TrackIdOf<T, I>')
+            ]),
+            ('Confirmed', REFERENDA_EVENTS['Confirmed'], [_field('index', U32, 'ReferendumIndex')]),
+            ('Approved', REFERENDA_EVENTS['Approved'], [_field('index', U32, 'ReferendumIndex')]),
+            ('Rejected', REFERENDA_EVENTS['Rejected'], [_field('index', U32, 'ReferendumIndex')])
+        ]), [('T', None), ('I', None)]),
+        _type(H256, ['primitive_types', 'H256'], _composite([_field(None, BYTES32, '[u8; 32]')])),
+        _type(BALANCES_EVENT, ['pallet_balances', 'pallet', 'Event'], _variant([
+            ('Transfer', BALANCES_EVENTS['Transfer'], [
+                _field('from', ACCOUNT_ID, 'T::AccountId'),
+                _field('to', ACCOUNT_ID, 'T::AccountId'),
+                _field('amount', U128, 'T::Balance')
+            ])
+        ]), [('T', None), ('I', None)]),
+        _type(RUNTIME_EVENT, ['mock_runtime', 'RuntimeEvent'], _variant([
+            ('System', SYSTEM_PALLET, [_field(None, SYSTEM_EVENT, 'frame_system::Event<Runtime>')]),
+            ('Balances', BALANCES_PALLET, [_field(None, BALANCES_EVENT, 'pallet_balances::Event<Runtime>')]),
+            ('Referenda', REFERENDA_PALLET, [_field(None, REFERENDA_EVENT, 'pallet_referenda::Event<Runtime>')])
+        ])),
+        _type(EVENT_RECORD, ['frame_system', 'EventRecord'], _composite([
+            _field('phase', PHASE, 'Phase'),
+            _field('event', RUNTIME_EVENT, 'E'),
+            _field('topics', VEC_H256, 'Vec<T>')
+        ]), [('E', RUNTIME_EVENT), ('T', H256)]),
+        _type(VEC_H256, [], _sequence(H256)),
+        _type(VEC_EVENT_RECORD, [], _sequence(EVENT_RECORD)),
+        _type(RUNTIME_CALL, ['mock_runtime', 'RuntimeCall'], _variant([
+            ('System', SYSTEM_PALLET, [_field(None, SYSTEM_CALL, 'frame_system::Call<Runtime>')])
+        ])),
+        _type(SYSTEM_CALL, ['frame_system', 'pallet', 'Call'], _variant([
+            ('remark', 0, [_field('remark', VEC_U8, 'Vec<u8>')])
+        ]), [('T', None)]),
+        _type(EXTRINSIC, ['sp_runtime', 'generic', 'unchecked_extrinsic', 'UncheckedExtrinsic'],
+              _composite([_field(None, VEC_U8)]),
+              [('Address', ACCOUNT_ID), ('Call', RUNTIME_CALL), ('Signature', H256), ('Extra', EMPTY_TUPLE)]),
+        _type(EMPTY_TUPLE, [], _tuple([])),
+        _type(REFERENDUM_INFO, ['pallet_referenda', 'types', 'ReferendumInfo'], _variant([
+            ('Ongoing', 0, [_field('track', U16, 'TrackId')]),
+            ('Approved', 1, [_field(None, U32, 'Moment')]),
+            ('Rejected', 2, [_field(None, U32, 'Moment')])
+        ]))
+    ]
+    return encode_vec(types)
+
+
+def _storage_entry(name: str, value_type: int, default: bytes, key: Optional[Tuple[str, int]] = None) -> bytes:
+    """A Plain storage entry, or a Map entry hashed with the given (hasher, key type)"""
+    hashers = ['Blake2_128', 'Blake2_256', 'Blake2_128Concat', 'Twox128', 'Twox256', 'Twox64Concat', 'Identity']
+    if key is None:
+        entry_type = b'\x00' + encode_compact(value_type)
+        modifier = b'\x01'
+    else:
+        hasher, key_type = key
+        entry_type = (b'\x01' + encode_vec([bytes([hashers.index(hasher)])]) +
+                      encode_compact(key_type) + encode_compact(value_type))
+        modifier = b'\x00'
+    return encode_str(name) + modifier + entry_type + encode_bytes(default) + encode_vec([])
+
+
+def _pallet(name: str, index: int, storage: List[bytes] = None, calls: Optional[int] = None,
+            event: Optional[int] = None) -> bytes:
+    encoded_storage = None if storage is None else encode_str(name) + encode_vec(storage)
+    return (encode_str(name) + encode_option(encoded_storage) +
+            encode_option(None if calls is None else encode_compact(calls)) +
+            encode_option(None if event is None else encode_compact(event)) +
+            encode_vec([]) + encode_option(None) + bytes([index]))
+
+
+def build_metadata() -> str:
+    """
+    SCALE encode the V14 metadata of the synthetic mock runtime
+
+    The runtime has System, Timestamp, Balances and Referenda pallets at their
+    Polkadot indices, with a few of their events and the storage entries the
+    worker reads: System.Events, Timestamp.Now and Referenda.ReferendumInfoFor.
+
+    Returns:
+        str: Hex encoded metadata as returned by state_getMetadata
+    """
+    pallets = [
+        _pallet('System', SYSTEM_PALLET, storage=[
+            _storage_entry('Events', VEC_EVENT_RECORD, b'\x00'),
+            _storage_entry('Number', U32, b'\x00' * 4)
+        ], calls=SYSTEM_CALL, event=SYSTEM_EVENT),
+        _pallet('Timestamp', TIMESTAMP_PALLET, storage=[_storage_entry('Now', U64, b'\x00' * 8)]),
+        _pallet('Balances', BALANCES_PALLET, event=BALANCES_EVENT),
+        _pallet('Referenda', REFERENDA_PALLET, storage=[
+            _storage_entry('ReferendumInfoFor', REFERENDUM_INFO, b'\x00', key=('Twox64Concat', U32))
+        ], event=REFERENDA_EVENT)
+    ]
+    extrinsic = encode_compact(EXTRINSIC) + bytes([4]) + encode_vec([])
+    metadata = b'meta' + bytes([14]) + _registry() + encode_vec(pallets) + extrinsic + encode_compact(RUNTIME_CALL)
+    return '0x' + metadata.hex()
+
+
+def encode_event_record(phase: Tuple[int, Optional[int]], pallet_index: int, event_index: int,
+                        fields: bytes) -> bytes:
+    """
+    SCALE encode one EventRecord of the synthetic runtime
+
+    Args:
+        phase (Tuple[int, Optional[int]]): Phase variant and, for ApplyExtrinsic, the extrinsic index
+        pallet_index (int): Index of the pallet emitting the event
+        event_index (int): Index of the event within the pallet
+        fields (bytes): The SCALE encoded event fields
+    """
+    variant, extrinsic_index = phase
+    encoded_phase = bytes([variant]) + (struct.pack('<I', extrinsic_index) if extrinsic_index is not None else b'')
+    return encoded_phase + bytes([pallet_index, event_index]) + fields + encode_vec([])
+
+
+def encode_events(records: List[bytes]) -> str:
+    """Hex encode a System.Events value from encoded EventRecords"""
+    return '0x' + encode_vec(records).hex()
+
+
+def runtime_version(spec_version: int) -> Dict[str, Any]:
+    """The state_getRuntimeVersion result of the synthetic runtime"""
+    return {
+        'specName': 'mock-node',
+        'implName': 'mock-node',
+        'authoringVersion': 1,
+        'specVersion': spec_version,
+        'implVersion': 0,
+        'apis': [],
+        'transactionVersion': 1,
+        'stateVersion': 1
+    }
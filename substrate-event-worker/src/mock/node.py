@@ -0,0 +1,395 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from substrateinterface.utils.hasher import xxh128
+from .chain import SyntheticChain
+from .metadata import runtime_version
+from ..utils.substrate import SYSTEM_EVENTS_STORAGE_KEY
+from ..utils.websocket_frames import (
+    OP_TEXT,
+    WebSocketProtocolError,
+    encode_frame,
+    read_message,
+    server_handshake
+)
+
+logger = logging.getLogger(__name__)
+
+
+def storage_prefix(pallet: str, name: str) -> str:
+    """Storage key of a plain storage entry, the prefix of a map entry"""
+    return '0x' + xxh128(pallet.encode()).hex() + xxh128(name.encode()).hex()
+
+
+SYSTEM_NUMBER_STORAGE_KEY = storage_prefix('System', 'Number')
+TIMESTAMP_NOW_STORAGE_KEY = storage_prefix('Timestamp', 'Now')
+
+# JSON-RPC error codes as returned by substrate nodes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+CALL_ERROR = -32000
+
+RPC_METHODS = [
+    'chain_getBlock',
+    'chain_getBlockHash',
+    'chain_getFinalisedHead',
+    'chain_getFinalizedHead',
+    'chain_getHead',
+    'chain_getHeader',
+    'chain_getRuntimeVersion',
+    'chain_subscribeFinalizedHeads',
+    'chain_subscribeNewHeads',
+    'chain_unsubscribeFinalizedHeads',
+    'chain_unsubscribeNewHeads',
+    'rpc_methods',
+    'state_getMetadata',
+    'state_getRuntimeVersion',
+    'state_getStorage',
+    'state_getStorageAt',
+    'state_queryStorage',
+    'state_queryStorageAt',
+    'system_chain',
+    'system_health',
+    'system_name',
+    'system_properties',
+    'system_version'
+]
+
+
+class RpcError(Exception):
+    """A JSON-RPC error returned to the client"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class JsonRpcServer:
+    """
+    Substrate style JSON-RPC websocket server with latency and fault injection.
+
+    Subclasses answer calls in `_dispatch`. Every message is answered after
+    `_delay` seconds, `latency` plus up to `jitter` by default, concurrently, so
+    pipelined clients see a realistic round trip per request rather than a queue.
+
+    Faults are injected per call: with `error_rate` an internal error, with
+    `throttle_rate` a "429 Too Many Requests" error as returned by rate limiting
+    proxies, and with `drop_rate` the connection is closed without an answer.
+    Batches larger than `max_batch_size` (0 = no limit) are rejected as too large.
+    """
+
+    description = 'JSON-RPC server'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9944, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, drop_rate: float = 0.0,
+                 max_batch_size: int = 0, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.drop_rate = drop_rate
+        self.max_batch_size = max_batch_size
+        self.random = random.Random(seed)
+        self.stats = {'connections': 0, 'messages': 0, 'calls': 0, 'errors': 0, 'throttled': 0, 'dropped': 0}
+        self._server = None
+        self._subscription_ids = itertools.count(1)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start listening, on a free port if `port` is 0"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=2 ** 20)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"{self.description} listening on {self.url}")
+
+    async def serve_forever(self) -> None:
+        """Start listening and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats['connections'] += 1
+        subscriptions: Dict[str, asyncio.Task] = {}
+        tasks = set()
+        try:
+            await server_handshake(reader, writer)
+            while True:
+                message = await read_message(reader, writer)
+                if message is None:
+                    break
+                self.stats['messages'] += 1
+                # Answer concurrently, a slow call must not hold up the calls sent after it
+                task = asyncio.ensure_future(self._answer(message, writer, subscriptions))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (WebSocketProtocolError, ConnectionError) as e:
+            logger.debug(f"{self.description} connection closed: {e}")
+        finally:
+            for task in list(tasks) + list(subscriptions.values()):
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, message: bytes, writer: asyncio.StreamWriter,
+                      subscriptions: Dict[str, asyncio.Task]) -> None:
+        try:
+            request = json.loads(message)
+        except ValueError:
+            self._send(writer, {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}})
+            return
+
+        delay = self._delay(request)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if isinstance(request, list):
+            if self.max_batch_size and len(request) > self.max_batch_size:
+                response = {'jsonrpc': '2.0', 'id': None, 'error': {
+                    'code': CALL_ERROR,
+                    'message': f"Batch of {len(request)} requests too large, limit is {self.max_batch_size}"
+                }}
+            else:
+                response = [self._call(item, writer, subscriptions) for item in request]
+        else:
+            response = self._call(request, writer, subscriptions)
+
+        if response is not None and self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['dropped'] += 1
+            writer.transport.abort()
+            return
+        self._send(writer, response)
+
+    def _delay(self, request: Any) -> float:
+        """Seconds to wait before answering a request or batch"""
+        return self.latency + self.random.uniform(0, self.jitter)
+
+    def _send(self, writer: asyncio.StreamWriter, payload: Any) -> None:
+        if not writer.is_closing():
+            writer.write(encode_frame(OP_TEXT, json.dumps(payload).encode()))
+
+    def _call(self, request: Dict[str, Any], writer: asyncio.StreamWriter,
+              subscriptions: Dict[str, asyncio.Task]) -> Dict[str, Any]:
+        """Answer one JSON-RPC call, injecting faults"""
+        self.stats['calls'] += 1
+        request_id = request.get('id')
+        method = request.get('method')
+        params = request.get('params') or []
+
+        try:
+            if self.throttle_rate and self.random.random() < self.throttle_rate:
+                self.stats['throttled'] += 1
+                raise RpcError(CALL_ERROR, '429 Too Many Requests')
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                raise RpcError(INTERNAL_ERROR, 'Internal error')
+
+            if '_unsubscribe' in method:
+                task = subscriptions.pop(str(params[0]) if params else '', None)
+                if task is not None:
+                    task.cancel()
+                result = task is not None
+            else:
+                result = self._dispatch(method, params, writer, subscriptions)
+        except RpcError as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': e.message}}
+        except (TypeError, ValueError, IndexError) as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': INVALID_PARAMS, 'message': str(e)}}
+
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    def _dispatch(self, method: str, params: list, writer: asyncio.StreamWriter,
+                  subscriptions: Dict[str, asyncio.Task]) -> Any:
+        """Result of one call, raising RpcError to answer with an error"""
+        raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    def _subscribe(self, subscriptions: Dict[str, asyncio.Task],
+                   push: Callable[[str], Awaitable[None]]) -> str:
+        """Start pushing notifications with `push(subscription_id)`, returning the subscription id"""
+        subscription_id = str(next(self._subscription_ids))
+        subscriptions[subscription_id] = asyncio.ensure_future(push(subscription_id))
+        return subscription_id
+
+    def _notify(self, writer: asyncio.StreamWriter, method: str, subscription_id: str, result: Any) -> None:
+        """Send one subscription notification"""
+        self._send(writer, {
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': {'subscription': subscription_id, 'result': result}
+        })
+
+
+class MockSubstrateNode(JsonRpcServer):
+    """
+    Local substrate node serving a SyntheticChain.
+
+    Serves the RPC methods the worker and py-substrate-interface use, single and
+    batch requests alike, and pushes finalized and new heads to subscribers as the
+    chain produces blocks. state_queryStorage ranges over `max_query_range` blocks
+    are rejected as too large. See JsonRpcServer for latency and fault injection.
+    """
+
+    description = 'Mock substrate node'
+
+    def __init__(self, chain: Optional[SyntheticChain] = None, max_query_range: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain or SyntheticChain()
+        self.max_query_range = max_query_range
+
+    async def start(self) -> None:
+        await super().start()
+        logger.info(f"Serving a synthetic chain at block {self.chain.head()}")
+
+    def _dispatch(self, method: str, params: list, writer: asyncio.StreamWriter,
+                  subscriptions: Dict[str, asyncio.Task]) -> Any:
+        if method in ('chain_subscribeFinalizedHeads', 'chain_subscribeNewHeads'):
+            finalized = method == 'chain_subscribeFinalizedHeads'
+            return self._subscribe(subscriptions, lambda subscription_id: self._push_heads(
+                writer, subscription_id, 'chain_finalizedHead' if finalized else 'chain_newHead', finalized
+            ))
+
+        handler = getattr(self, f"_rpc_{method}", None) if method in RPC_METHODS else None
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        return handler(*params)
+
+    async def _push_heads(self, writer: asyncio.StreamWriter, subscription_id: str, notification: str,
+                          finalized: bool) -> None:
+        """Push every new head, starting with the current one, like a node does"""
+        # Let the subscription id reach the client first
+        await asyncio.sleep(0)
+        last = None
+        interval = min(self.chain.block_time or 1.0, 1.0) / 4
+        while not writer.is_closing():
+            head = self.chain.finalized_head() if finalized else self.chain.head()
+            if last is None or head > last:
+                self._notify(writer, notification, subscription_id, self.chain.header(head))
+                last = head
+            await asyncio.sleep(interval)
+
+    def _block(self, block_hash: Optional[str]) -> int:
+        """Number of the block with a hash, the best block for None"""
+        block_number = self.chain.block_number(block_hash)
+        if block_number is None:
+            raise RpcError(CALL_ERROR, f"Unknown block: {block_hash}")
+        return block_number
+
+    def _storage(self, key: str, block_number: int) -> Optional[str]:
+        """Value of a storage key at a block, None for keys the mock does not store"""
+        key = key.lower()
+        if key == SYSTEM_EVENTS_STORAGE_KEY:
+            return self.chain.events(block_number)
+        if key == SYSTEM_NUMBER_STORAGE_KEY:
+            return '0x' + block_number.to_bytes(4, 'little').hex()
+        if key == TIMESTAMP_NOW_STORAGE_KEY:
+            return '0x' + self.chain.timestamp(block_number).to_bytes(8, 'little').hex()
+        return None
+
+    # JSON-RPC methods, named _rpc_<method>
+
+    def _rpc_system_health(self) -> Dict[str, Any]:
+        return {'peers': 0, 'isSyncing': False, 'shouldHavePeers': False}
+
+    def _rpc_system_chain(self) -> str:
+        return 'Mock'
+
+    def _rpc_system_name(self) -> str:
+        return 'mock-node'
+
+    def _rpc_system_version(self) -> str:
+        return '1.0.0'
+
+    def _rpc_system_properties(self) -> Dict[str, Any]:
+        return {'ss58Format': 42, 'tokenDecimals': 10, 'tokenSymbol': 'UNIT'}
+
+    def _rpc_rpc_methods(self) -> Dict[str, Any]:
+        return {'version': 1, 'methods': RPC_METHODS}
+
+    def _rpc_chain_getBlockHash(self, block_number=None):
+        if isinstance(block_number, list):
+            return [self._rpc_chain_getBlockHash(number) for number in block_number]
+        if block_number is None:
+            return self.chain.block_hash(self.chain.head())
+        if isinstance(block_number, str):
+            block_number = int(block_number, 16) if block_number.startswith('0x') else int(block_number)
+        return self.chain.block_hash(block_number)
+
+    def _rpc_chain_getHead(self) -> str:
+        return self.chain.block_hash(self.chain.head())
+
+    def _rpc_chain_getFinalizedHead(self) -> str:
+        return self.chain.block_hash(self.chain.finalized_head())
+
+    _rpc_chain_getFinalisedHead = _rpc_chain_getFinalizedHead
+
+    def _rpc_chain_getHeader(self, block_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        block_number = self.chain.block_number(block_hash)
+        return self.chain.header(block_number) if block_number is not None else None
+
+    def _rpc_chain_getBlock(self, block_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        block_number = self.chain.block_number(block_hash)
+        if block_number is None:
+            return None
+        return {'block': {'header': self.chain.header(block_number), 'extrinsics': []}, 'justifications': None}
+
+    def _rpc_state_getRuntimeVersion(self, block_hash: Optional[str] = None) -> Dict[str, Any]:
+        return runtime_version(self.chain.spec_version(self._block(block_hash)))
+
+    _rpc_chain_getRuntimeVersion = _rpc_state_getRuntimeVersion
+
+    def _rpc_state_getMetadata(self, block_hash: Optional[str] = None) -> str:
+        self._block(block_hash)
+        return self.chain.metadata
+
+    def _rpc_state_getStorage(self, key: str, block_hash: Optional[str] = None) -> Optional[str]:
+        return self._storage(key, self._block(block_hash))
+
+    _rpc_state_getStorageAt = _rpc_state_getStorage
+
+    def _rpc_state_queryStorage(self, keys: List[str], from_hash: str,
+                                to_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        start = self._block(from_hash)
+        end = self._block(to_hash)
+        if end < start:
+            raise RpcError(CALL_ERROR, "Invalid range: end block is before the start block")
+        if end - start + 1 > self.max_query_range:
+            raise RpcError(CALL_ERROR, f"Query range of {end - start + 1} blocks too large, "
+                                       f"limit is {self.max_query_range}")
+
+        change_sets = []
+        previous = {}
+        for block_number in range(start, end + 1):
+            # Like a node, report only the keys whose value changed since the previous block
+            changes = []
+            for key in keys:
+                value = self._storage(key, block_number)
+                if block_number == start or previous.get(key) != value:
+                    changes.append([key, value])
+                previous[key] = value
+            if changes:
+                change_sets.append({'block': self.chain.block_hash(block_number), 'changes': changes})
+        return change_sets
+
+    def _rpc_state_queryStorageAt(self, keys: List[str], block_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        block_number = self._block(block_hash)
+        return [{
+            'block': self.chain.block_hash(block_number),
+            'changes': [[key, self._storage(key, block_number)] for key in keys]
+        }]
@@ -0,0 +1,334 @@
+import asyncio
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import ssl
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from ..utils.websocket_frames import (
+    OP_CLOSE,
+    OP_TEXT,
+    WebSocketProtocolError,
+    client_handshake,
+    encode_frame,
+    read_message,
+    server_handshake
+)
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FORMAT = 'substrate-rpc-recording'
+RECORDING_VERSION = 1
+
+# Methods whose responses depend on a runtime version, used to pick metadata for a block
+RUNTIME_VERSION_METHODS = ('state_getRuntimeVersion', 'chain_getRuntimeVersion')
+
+
+def call_key(method: str, params: Any) -> str:
+    """Canonical key of a call, the same for equal method and parameters whatever the request id"""
+    return json.dumps([method, params or []], separators=(',', ':'), sort_keys=True)
+
+
+class RecordingWriter:
+    """
+    Append JSON-RPC traffic to a gzip compressed JSON lines recording.
+
+    The first line is a header; every other line is a call with its response
+    and latency, or a subscription notification with its offset from the
+    subscription. A response equal to the previous one for the same call is
+    not written again, so polling the same head or reloading the same metadata
+    costs nothing. The stream is flushed every `flush_interval` seconds, so a
+    recording cut short by a crash stays readable up to the last flush.
+    """
+
+    def __init__(self, path: Path, upstream: Optional[str] = None, flush_interval: float = 5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.calls = 0
+        self.notifications = 0
+        self._last_response: Dict[str, bytes] = {}
+        self._last_flush = time.monotonic()
+        self._file = gzip.open(self.path, 'wt', compresslevel=6)
+        self._write({'format': RECORDING_FORMAT, 'version': RECORDING_VERSION, 'upstream': upstream,
+                     'created': time.time()})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = time.monotonic()
+
+    def call(self, method: str, params: Any, response: Dict[str, Any], latency: float) -> None:
+        """Record the response (the `result` or `error` of a JSON-RPC reply) to a call"""
+        answer = {'error': response['error']} if 'error' in response else {'result': response.get('result')}
+        key = call_key(method, params)
+        digest = hashlib.sha1(json.dumps(answer, sort_keys=True).encode()).digest()
+        if self._last_response.get(key) == digest:
+            return
+        self._last_response[key] = digest
+        self._write({'method': method, 'params': params or [], 'latency': round(latency, 6), **answer})
+        self.calls += 1
+
+    def notification(self, method: str, params: Any, notification: str, result: Any, offset: float) -> None:
+        """Record a notification of the subscription made with `method` and `params`"""
+        self._write({'subscribe': method, 'params': params or [], 'notification': notification,
+                     'result': result, 'offset': round(offset, 6)})
+        self.notifications += 1
+
+    def close(self) -> None:
+        self._file.close()
+        logger.info(f"Recorded {self.calls} responses and {self.notifications} notifications to {self.path}")
+
+
+class RpcRecording:
+    """
+    Responses of a recording, looked up by call.
+
+    The responses recorded for the same call are served in recording order and
+    the last one is repeated once they run out, so calls whose answer changes
+    over time, such as chain_getFinalizedHead, progress as they did when
+    recorded and then settle on the last answer.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.header: Dict[str, Any] = {}
+        self.calls: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.notifications: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        # Spec versions by the parameters of runtime version calls, metadata by spec version
+        self._spec_versions: Dict[Tuple, Any] = {}
+        self._metadata: Dict[Any, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        lines = 0
+        try:
+            with gzip.open(self.path, 'rt') as f:
+                for line in f:
+                    record = json.loads(line)
+                    lines += 1
+                    if 'format' in record:
+                        if record['format'] != RECORDING_FORMAT or record.get('version') != RECORDING_VERSION:
+                            raise ValueError(f"Unsupported recording format in {self.path}")
+                        self.header = record
+                    elif 'subscribe' in record:
+                        self.notifications[call_key(record['subscribe'], record['params'])].append(record)
+                    else:
+                        self.calls[call_key(record['method'], record['params'])].append(record)
+                        self._index_runtime(record)
+        except (EOFError, zlib.error, json.JSONDecodeError) as e:
+            # The recorder was killed before closing the stream, keep what was flushed
+            logger.warning(f"Recording {self.path} ends early after {lines} lines: {e}")
+
+        if not self.header:
+            raise ValueError(f"{self.path} is not a substrate RPC recording")
+        # Key metadata by the spec version of the block it was read at
+        self._metadata = {self._spec_versions.get(params): metadata for params, metadata in self._metadata.items()}
+        logger.info(f"Loaded {sum(len(responses) for responses in self.calls.values())} responses "
+                    f"for {len(self.calls)} calls from {self.path}")
+
+    def _index_runtime(self, record: Dict[str, Any]) -> None:
+        result = record.get('result')
+        if record['method'] in RUNTIME_VERSION_METHODS and isinstance(result, dict):
+            self._spec_versions[tuple(record['params'])] = result.get('specVersion')
+        elif record['method'] == 'state_getMetadata' and result:
+            # Keyed by call parameters until every runtime version is loaded
+            self._metadata[tuple(record['params'])] = result
+
+    def peek(self, method: str, params: Any) -> Optional[Dict[str, Any]]:
+        """The recorded response the next identical call gets, None if the call was never recorded"""
+        responses = self.calls.get(call_key(method, params))
+        if not responses:
+            return None
+        return responses[min(self._positions[call_key(method, params)], len(responses) - 1)]
+
+    def next(self, method: str, params: Any) -> Optional[Dict[str, Any]]:
+        """Take the recorded response to a call, None if the call was never recorded"""
+        record = self.peek(method, params)
+        if record is not None:
+            self._positions[call_key(method, params)] += 1
+        return record
+
+    def subscription(self, method: str, params: Any) -> List[Dict[str, Any]]:
+        """Notifications recorded for a subscription, in order"""
+        return self.notifications.get(call_key(method, params), [])
+
+    def metadata_for(self, block_hash: Optional[str]) -> Optional[str]:
+        """
+        Metadata of the runtime of a block, from any recorded state_getMetadata call for the same runtime
+
+        Workers with a warm metadata cache never download metadata, so the recorder
+        fetches it for every runtime version it sees; this finds it whatever block
+        the replayed client asks for.
+        """
+        if not self._metadata:
+            return None
+        spec_version = self._spec_versions.get((block_hash,) if block_hash else ())
+        if spec_version in self._metadata:
+            return self._metadata[spec_version]
+        # Unknown block, assume the newest runtime recorded
+        return self._metadata[max(self._metadata, key=lambda version: version if version is not None else -1)]
+
+
+class RecordingProxy:
+    """
+    Websocket proxy recording all JSON-RPC traffic between clients and a node.
+
+    Every client connection gets its own upstream connection. Requests and
+    batches are forwarded unchanged; each response is written to the recording
+    with the time it took, and subscription notifications with their offset from
+    the subscription. The first time a runtime version is seen the proxy also
+    downloads its metadata, so recordings made with a warm metadata cache replay
+    on a machine without one.
+    """
+
+    def __init__(self, upstream: str, output: Path, host: str = '127.0.0.1', port: int = 9944):
+        self.upstream = upstream
+        self.host = host
+        self.port = port
+        self.recording = RecordingWriter(output, upstream=upstream)
+        self._server = None
+        self._internal_ids = itertools.count(1)
+        self._metadata_specs = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start listening, on a free port if `port` is 0"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=2 ** 20)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Recording {self.upstream} through {self.url} to {self.recording.path}")
+
+    async def serve_forever(self) -> None:
+        """Start listening and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and finish the recording"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.recording.close()
+
+    async def _connect_upstream(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        url = urlsplit(self.upstream)
+        secure = url.scheme == 'wss'
+        port = url.port or (443 if secure else 80)
+        reader, writer = await asyncio.open_connection(
+            url.hostname, port, ssl=ssl.create_default_context() if secure else None, limit=2 ** 20
+        )
+        host = url.hostname if url.port is None else f"{url.hostname}:{url.port}"
+        path = url.path or '/'
+        await client_handshake(reader, writer, host, path + (f"?{url.query}" if url.query else ''))
+        return reader, writer
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        upstream_writer = None
+        try:
+            await server_handshake(reader, writer)
+            upstream_reader, upstream_writer = await self._connect_upstream()
+
+            # Calls awaiting a response by request id: (method, params, sent at)
+            pending: Dict[Any, Tuple[str, Any, float]] = {}
+            # Open subscriptions by subscription id: (method, params, subscribed at)
+            subscriptions: Dict[str, Tuple[str, Any, float]] = {}
+
+            forward = [
+                asyncio.ensure_future(self._forward_requests(reader, writer, upstream_writer, pending)),
+                asyncio.ensure_future(self._forward_responses(upstream_reader, upstream_writer, writer, pending,
+                                                              subscriptions))
+            ]
+            done, running = await asyncio.wait(forward, return_when=asyncio.FIRST_COMPLETED)
+            for task in running:
+                task.cancel()
+            for task in done:
+                if task.exception() and not isinstance(task.exception(), (WebSocketProtocolError, ConnectionError)):
+                    logger.error(f"Recording proxy connection failed: {task.exception()}")
+        except (WebSocketProtocolError, ConnectionError, OSError) as e:
+            logger.warning(f"Recording proxy connection closed: {e}")
+        finally:
+            if upstream_writer is not None:
+                upstream_writer.close()
+            writer.close()
+
+    async def _forward_requests(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                upstream_writer: asyncio.StreamWriter, pending: Dict) -> None:
+        while True:
+            message = await read_message(reader, writer)
+            if message is None:
+                upstream_writer.write(encode_frame(OP_CLOSE, b'\x03\xe8', mask=True))
+                return
+            try:
+                request = json.loads(message)
+            except ValueError:
+                request = None
+            sent_at = time.monotonic()
+            for call in request if isinstance(request, list) else [request]:
+                if isinstance(call, dict) and 'id' in call:
+                    pending[call['id']] = (call.get('method'), call.get('params'), sent_at)
+            upstream_writer.write(encode_frame(OP_TEXT, message, mask=True))
+
+    async def _forward_responses(self, upstream_reader: asyncio.StreamReader, upstream_writer: asyncio.StreamWriter,
+                                 writer: asyncio.StreamWriter, pending: Dict, subscriptions: Dict) -> None:
+        while True:
+            # Control frames sent back upstream are masked, as a client's must be
+            message = await read_message(upstream_reader, upstream_writer, mask=True)
+            if message is None:
+                return
+            try:
+                response = json.loads(message)
+            except ValueError:
+                writer.write(encode_frame(OP_TEXT, message))
+                continue
+
+            internal = False
+            for reply in response if isinstance(response, list) else [response]:
+                if not isinstance(reply, dict):
+                    continue
+                if 'id' in reply:
+                    internal = internal or str(reply['id']).startswith('recorder-')
+                    self._record(pending.pop(reply['id'], None), reply, subscriptions, upstream_writer, pending)
+                elif isinstance(reply.get('params'), dict) and reply['params'].get('subscription') in subscriptions:
+                    method, params, subscribed_at = subscriptions[reply['params']['subscription']]
+                    self.recording.notification(method, params, reply.get('method'), reply['params'].get('result'),
+                                                time.monotonic() - subscribed_at)
+
+            # Replies to the proxy's own metadata requests never reach the client
+            if not internal:
+                writer.write(encode_frame(OP_TEXT, message))
+
+    def _record(self, call: Optional[Tuple[str, Any, float]], reply: Dict[str, Any], subscriptions: Dict,
+                upstream_writer: asyncio.StreamWriter, pending: Dict) -> None:
+        if call is None:
+            return
+        method, params, sent_at = call
+        now = time.monotonic()
+        self.recording.call(method, params, reply, now - sent_at)
+
+        result = reply.get('result')
+        if method and '_subscribe' in method and isinstance(result, (str, int)):
+            subscriptions[result] = (method, params, now)
+        elif method in RUNTIME_VERSION_METHODS and isinstance(result, dict):
+            spec_version = result.get('specVersion')
+            if spec_version not in self._metadata_specs:
+                self._metadata_specs.add(spec_version)
+                request_id = f"recorder-{next(self._internal_ids)}"
+                metadata_params = list(params or [])
+                pending[request_id] = ('state_getMetadata', metadata_params, now)
+                upstream_writer.write(encode_frame(OP_TEXT, json.dumps({
+                    'jsonrpc': '2.0', 'id': request_id, 'method': 'state_getMetadata', 'params': metadata_params
+                }).encode(), mask=True))
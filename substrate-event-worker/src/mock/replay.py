@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Dict
+from .node import CALL_ERROR, JsonRpcServer, RpcError
+from .recording import RpcRecording
+
+logger = logging.getLogger(__name__)
+
+
+class RecordedError(RpcError):
+    """A JSON-RPC error answered as recorded"""
+
+    def __init__(self, error: Dict[str, Any]):
+        super().__init__(error.get('code', CALL_ERROR), error.get('message', ''))
+
+
+class ReplayNode(JsonRpcServer):
+    """
+    Local substrate node answering from an RPC recording.
+
+    Calls get their recorded responses, errors included, so a replayed run sees
+    the same blocks, events and failures as the recorded one. With a
+    `latency_scale` of 0 answers are immediate; 1 waits the latency measured when
+    recording (the slowest call of a batch) and 2 twice that. Subscriptions push
+    their recorded notifications at their recorded offsets, scaled the same way.
+    Calls missing from the recording are answered with an error and counted in
+    stats['misses']. Latency and faults of JsonRpcServer come on top.
+    """
+
+    description = 'Replay node'
+
+    def __init__(self, recording: RpcRecording, latency_scale: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+        self.latency_scale = latency_scale
+        self.stats['misses'] = 0
+
+    async def start(self) -> None:
+        await super().start()
+        logger.info(f"Replaying {self.recording.path} recorded from {self.recording.header.get('upstream')}")
+
+    def _delay(self, request: Any) -> float:
+        delay = super()._delay(request)
+        if not self.latency_scale:
+            return delay
+
+        recorded = 0.0
+        for call in request if isinstance(request, list) else [request]:
+            if isinstance(call, dict):
+                record = self.recording.peek(call.get('method'), call.get('params'))
+                if record is not None:
+                    recorded = max(recorded, record.get('latency', 0.0))
+        return delay + recorded * self.latency_scale
+
+    def _dispatch(self, method: str, params: list, writer: asyncio.StreamWriter,
+                  subscriptions: Dict[str, asyncio.Task]) -> Any:
+        record = self.recording.next(method, params)
+        if record is None:
+            if method == 'state_getMetadata':
+                metadata = self.recording.metadata_for(params[0] if params else None)
+                if metadata is not None:
+                    return metadata
+            self.stats['misses'] += 1
+            logger.debug(f"Not in the recording: {method} {params}")
+            raise RpcError(CALL_ERROR, f"Call not in the recording: {method}")
+
+        if 'error' in record:
+            raise RecordedError(record['error'])
+
+        if '_subscribe' in method:
+            notifications = self.recording.subscription(method, params)
+            return self._subscribe(subscriptions, lambda subscription_id: self._push_notifications(
+                writer, subscription_id, notifications
+            ))
+        return record['result']
+
+    async def _push_notifications(self, writer: asyncio.StreamWriter, subscription_id: str,
+                                  notifications: list) -> None:
+        """Push recorded notifications at their recorded offsets"""
+        # Let the subscription id reach the client first
+        await asyncio.sleep(0)
+        elapsed = 0.0
+        for notification in notifications:
+            if self.latency_scale and notification['offset'] > elapsed:
+                await asyncio.sleep((notification['offset'] - elapsed) * self.latency_scale)
+                elapsed = notification['offset']
+            self._notify(writer, notification['notification'], subscription_id, notification['result'])
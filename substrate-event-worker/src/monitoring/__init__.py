@@ -1,7 +1,16 @@
 from .monitor import BlockRangeGovernanceMonitor
 from .metrics import MetricsTracker
+from .alert_queue import AlertQueue, QueuedAlert, ALERT_QUEUE_POLICIES
+from .backfill import ShardedBackfill
+from .prometheus import MetricsServer, REGISTRY
 
 __all__ = [
     'BlockRangeGovernanceMonitor',
-    'MetricsTracker'
+    'MetricsTracker',
+    'AlertQueue',
+    'QueuedAlert',
+    'ALERT_QUEUE_POLICIES',
+    'ShardedBackfill',
+    'MetricsServer',
+    'REGISTRY'
 ]
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from .tracing import AlertTrace
+
+logger = logging.getLogger(__name__)
+
+ALERT_QUEUE_POLICIES = ('block', 'drop', 'spill')
+
+
+class QueuedAlert(NamedTuple):
+    """A matched event waiting for its notification"""
+    block_number: int
+    event: Dict[str, Any]
+    rule: str
+    priority: int
+    trace: Optional[AlertTrace] = None
+
+
+class AlertQueue:
+    """
+    Bounded queue between block processing and a pool of notifier tasks.
+
+    put() never waits, so matching a block costs the same with or without
+    notifications, while `workers` tasks take alerts in order and await
+    `deliver` for each. Once `maxsize` alerts are waiting, the policy decides:
+
+    - 'block': the alert is queued anyway and wait_for_room() holds block
+      processing until the notifiers have drained the queue below maxsize
+    - 'drop': the alert with the lowest priority (the highest number, the
+      newest among equals) is dropped, which may be the new one
+    - 'spill': new alerts are appended to src/storage/data/alerts/<network>.jsonl
+      and read back in order once the queue has drained to half of maxsize.
+      Alerts still waiting on close are spilled too, and delivered after a restart.
+    """
+
+    def __init__(self, deliver: Callable[[QueuedAlert], Awaitable[None]], network_name: str, metrics,
+                 workers: int = 4, maxsize: int = 1000, policy: str = 'block', spill_path: Optional[Path] = None):
+        if policy not in ALERT_QUEUE_POLICIES:
+            raise ValueError(f"Unknown alert queue policy: {policy}")
+
+        self.deliver = deliver
+        self.network_name = network_name
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.spill_path = Path(spill_path) if spill_path else self._ensure_storage_dir() / f"{network_name}.jsonl"
+
+        self.depth = metrics.registry.gauge(
+            'substrate_worker_alert_queue_depth', 'Alerts waiting in memory for their notification', ('network',))
+        self.spilled_depth = metrics.registry.gauge(
+            'substrate_worker_alert_queue_spilled', 'Alerts spilled to disk waiting for their notification',
+            ('network',))
+        self.dropped = metrics.registry.counter(
+            'substrate_worker_alerts_dropped_total', 'Alerts dropped because the alert queue was full',
+            ('network', 'rule'))
+        self.deliveries = metrics.registry.counter(
+            'substrate_worker_alert_deliveries_total', 'Alert notifications by outcome', ('network', 'outcome'))
+
+        self._items: deque = deque()
+        self._available = asyncio.Event()
+        self._room = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._delivering = 0
+        self._spilled = self._count_spilled()
+        self._update_depth()
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent.parent / "storage" / "data" / "alerts"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def _count_spilled(self) -> int:
+        """Count alerts left on disk by a previous run"""
+        try:
+            with open(self.spill_path) as f:
+                count = sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+        if count:
+            logger.info(f"[{self.network_name}] {count} spilled alerts to deliver from {self.spill_path}")
+        return count
+
+    def start(self) -> None:
+        """Start the notifier tasks (needs a running event loop, does nothing once started)"""
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+            if self._spilled:
+                self._available.set()
+
+    def __len__(self) -> int:
+        return len(self._items) + self._spilled
+
+    def put(self, alert: QueuedAlert) -> None:
+        """Queue an alert for delivery without waiting, applying the policy when the queue is full"""
+        self.start()
+
+        if self.policy == 'spill' and (self._spilled or len(self._items) >= self.maxsize):
+            # Keep the delivery order: once alerts are on disk, newer ones go there too
+            self._spill([alert])
+        elif self.policy == 'drop' and len(self._items) >= self.maxsize:
+            self._drop_lowest(alert)
+        else:
+            self._items.append(alert)
+
+        self._available.set()
+        self._update_depth()
+
+    def _drop_lowest(self, alert: QueuedAlert) -> None:
+        """Make room for an alert by dropping the lowest priority one, the new alert included"""
+        lowest = max(range(len(self._items)), key=lambda index: (self._items[index].priority, index))
+        if alert.priority >= self._items[lowest].priority:
+            dropped = alert
+        else:
+            dropped = self._items[lowest]
+            del self._items[lowest]
+            self._items.append(alert)
+
+        self.dropped.inc(network=self.network_name, rule=dropped.rule)
+        logger.warning(f"[{self.network_name}] Alert queue full, dropped {dropped.rule} alert "
+                       f"of block #{dropped.block_number}")
+
+    async def wait_for_room(self) -> None:
+        """With the 'block' policy, wait until fewer than maxsize alerts are queued"""
+        while self.policy == 'block' and len(self._items) >= self.maxsize:
+            self._room.clear()
+            await self._room.wait()
+
+    def _update_depth(self) -> None:
+        self.depth.set(len(self._items), network=self.network_name)
+        self.spilled_depth.set(self._spilled, network=self.network_name)
+
+    def _spill(self, alerts: List[QueuedAlert]) -> None:
+        """Append alerts to the spill file"""
+        with open(self.spill_path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(self._to_record(alert), default=str) + '\n')
+        self._spilled += len(alerts)
+
+    def _unspill(self) -> None:
+        """Move spilled alerts back into the queue, up to maxsize, rewriting the rest"""
+        try:
+            with open(self.spill_path) as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            lines = []
+
+        room = self.maxsize - len(self._items)
+        loaded, rest = lines[:room], lines[room:]
+        if rest:
+            temp_path = self.spill_path.with_suffix('.tmp')
+            with open(temp_path, 'w') as f:
+                f.writelines(rest)
+            os.replace(temp_path, self.spill_path)
+        elif self.spill_path.exists():
+            self.spill_path.unlink()
+
+        for line in loaded:
+            try:
+                self._items.append(self._from_record(json.loads(line)))
+            except (ValueError, KeyError) as e:
+                logger.error(f"[{self.network_name}] Skipping unreadable spilled alert: {e}")
+        self._spilled = len(rest)
+
+    def _to_record(self, alert: QueuedAlert) -> Dict[str, Any]:
+        record = {
+            'block_number': alert.block_number,
+            'event': alert.event,
+            'rule': alert.rule,
+            'priority': alert.priority
+        }
+        if alert.trace is not None:
+            record['marks'] = alert.trace.marks
+        return record
+
+    def _from_record(self, record: Dict[str, Any]) -> QueuedAlert:
+        trace = None
+        if 'marks' in record:
+            event = record['event']
+            trace = AlertTrace(self.network_name, record['block_number'], event['module_id'], event['event_id'],
+                               record['rule'])
+            trace.marks.update(record['marks'])
+        return QueuedAlert(record['block_number'], record['event'], record['rule'], record['priority'], trace)
+
+    async def _next(self) -> QueuedAlert:
+        """Wait for the next alert, reading spilled alerts back when the queue runs low"""
+        while True:
+            if self._spilled and len(self._items) <= self.maxsize // 2:
+                self._unspill()
+            if self._items:
+                alert = self._items.popleft()
+                self._room.set()
+                self._update_depth()
+                return alert
+            self._available.clear()
+            await self._available.wait()
+
+    async def _work(self) -> None:
+        """Notifier task: deliver alerts one at a time until cancelled"""
+        while True:
+            alert = await self._next()
+            if alert.trace is not None:
+                alert.trace.mark('dequeued')
+
+            self._delivering += 1
+            try:
+                await self.deliver(alert)
+                outcome = 'delivered'
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[{self.network_name}] Failed to deliver {alert.rule} alert of block "
+                             f"#{alert.block_number}: {e}")
+                outcome = 'failed'
+            finally:
+                self._delivering -= 1
+            self.deliveries.inc(network=self.network_name, outcome=outcome)
+
+    def stats(self) -> Dict[str, int]:
+        """Queue counters for logs"""
+        return {
+            'queued': len(self._items),
+            'spilled': self._spilled,
+            'delivering': self._delivering
+        }
+
+    def close(self) -> None:
+        """Stop the notifier tasks; queued alerts are spilled with the 'spill' policy and lost otherwise"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        if not self._items:
+            return
+        if self.policy == 'spill':
+            # Queued alerts are older than the ones already on disk
+            pending = [json.dumps(self._to_record(alert), default=str) + '\n' for alert in self._items]
+            try:
+                with open(self.spill_path) as f:
+                    pending += [line for line in f if line.strip()]
+            except FileNotFoundError:
+                pass
+            temp_path = self.spill_path.with_suffix('.tmp')
+            with open(temp_path, 'w') as f:
+                f.writelines(pending)
+            os.replace(temp_path, self.spill_path)
+            self._spilled = len(pending)
+            logger.info(f"[{self.network_name}] Spilled {len(self._items)} undelivered alerts to {self.spill_path}")
+        else:
+            logger.warning(f"[{self.network_name}] {len(self._items)} queued alerts were not delivered")
+        self._items.clear()
+        self._update_depth()
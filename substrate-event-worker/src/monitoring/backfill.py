@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from .fetcher import create_fetcher, AsyncBlockFetcher, BlockFetchError
+from .metrics import MetricsTracker
+from .monitor import NetworkLoggerAdapter
+from .prometheus import MetricsRegistry
+from ..sinks import EventPublisher
+from ..storage import CheckpointStore, EventArchive
+from ..config.settings import DEFAULT_CONFIG, get_rule_matcher
+from ..utils import EndpointPool
+
+logger = logging.getLogger(__name__)
+
+# Fetchers opened in this worker process, keyed by (network, urls, fetch mode)
+_worker_fetchers: Dict[Tuple[str, Tuple[str, ...], str], Any] = {}
+
+
+def fetch_backfill_chunk(network_name: str, urls: List[str], fetch_mode: str,
+                         start_block: int, end_block: int) -> Tuple[List[tuple], Optional[int], Optional[str]]:
+    """
+    Fetch blocks [start_block, end_block) and keep their matched events (runs in a worker process)
+
+    The fetcher and its connection stay open in the worker between chunks, except
+    the async fetcher's, which is tied to the chunk's event loop; each worker ranks
+    and fails over between the network's endpoints on its own.
+
+    Returns:
+        Tuple[List[tuple], Optional[int], Optional[str]]: (block_number, [(event, rule), ...]) for every
+            fetched block in order, then the first block that failed and its error (None if none failed)
+    """
+    key = (network_name, tuple(urls), fetch_mode)
+    fetcher = _worker_fetchers.get(key)
+    if fetcher is None:
+        fetcher = create_fetcher(
+            fetch_mode=fetch_mode,
+            endpoints=EndpointPool(urls),
+            matcher=get_rule_matcher(network_name),
+            connection_timeout=DEFAULT_CONFIG['connection_timeout'],
+            fetch_window=DEFAULT_CONFIG['fetch_window'],
+            rpc_batch_size=DEFAULT_CONFIG['rpc_batch_size'],
+            network_name=network_name
+        )
+        _worker_fetchers[key] = fetcher
+
+    matcher = fetcher.matcher
+    blocks = []
+
+    async def collect():
+        try:
+            async for block_number, events, event_count in fetcher.fetch_range(start_block, end_block):
+                matched = []
+                for event in events or []:
+                    rule = matcher.match(event['module_id'], event['event_id'], event.get('attributes'))
+                    if rule is not None:
+                        matched.append((event, rule))
+                blocks.append((block_number, matched))
+        finally:
+            if isinstance(fetcher, AsyncBlockFetcher):
+                # Its connection belongs to this chunk's event loop, close it before asyncio.run closes the loop
+                fetcher.disconnect()
+
+    try:
+        asyncio.run(collect())
+    except BlockFetchError as e:
+        return blocks, e.block_number, str(e.error)
+    except Exception as e:
+        failed_block = blocks[-1][0] + 1 if blocks else start_block
+        return blocks, failed_block, str(e)
+
+    return blocks, None, None
+
+
+def split_shards(ranges: List[Tuple[int, int]], shards: int) -> List[List[Tuple[int, int]]]:
+    """Split [start, end) ranges into at most `shards` lists covering about the same number of blocks"""
+    total = sum(end - start for start, end in ranges)
+    shard_size = max(1, -(-total // max(1, shards)))
+
+    result, current, current_size = [], [], 0
+    for start, end in ranges:
+        while start < end:
+            piece_end = min(end, start + shard_size - current_size)
+            current.append((start, piece_end))
+            current_size += piece_end - start
+            start = piece_end
+            if current_size >= shard_size:
+                result.append(current)
+                current, current_size = [], 0
+    if current:
+        result.append(current)
+    return result
+
+
+class ShardedBackfill:
+    """
+    Backfill a historical block range of one network in parallel.
+
+    The blocks still missing from the coverage map are split into shards, each
+    fetched sequentially in chunks by a pool of worker processes with their own
+    connections. Matched events are archived as soon as their chunk arrives and
+    the chunk is then recorded in the coverage map, so an interrupted backfill
+    with the same start block resumes with only the blocks not done yet. Events are logged in block order,
+    holding back results of later shards until every block before them is
+    covered, and published to the event sinks in that order. The backfill ends
+    when the whole range is covered.
+    """
+
+    def __init__(self, network_name, urls, start_block, end_block, shards=None, fetch_mode=None,
+                 chunk_size=None, sinks=None):
+        self.network_name = network_name
+        self.urls = [urls] if isinstance(urls, str) else list(urls)
+        self.start_block = start_block
+        self.end_block = end_block
+        self.shards = shards or multiprocessing.cpu_count()
+        self.fetch_mode = fetch_mode or DEFAULT_CONFIG['fetch_mode']
+        self.chunk_size = chunk_size or DEFAULT_CONFIG['batch_size']
+        self.retry_delay = DEFAULT_CONFIG['retry_delay']
+        self.max_block_retries = DEFAULT_CONFIG['max_block_retries']
+        self.logger = NetworkLoggerAdapter(logger, {'network': network_name})
+        self.metrics = MetricsTracker(network_name=network_name, registry=MetricsRegistry())
+        self.publisher = EventPublisher(
+            sinks, network_name, self.metrics, batch_size=DEFAULT_CONFIG['sink_batch_size']
+        ) if sinks else None
+
+        # Coverage map shared by the shards, kept per start block so its low watermark
+        # never claims blocks before the range were done
+        self.coverage = CheckpointStore(
+            f"{network_name}-backfill-{start_block}",
+            commit_interval=DEFAULT_CONFIG['checkpoint_interval'],
+            commit_blocks=DEFAULT_CONFIG['checkpoint_blocks'],
+            before_commit=self.publisher.flush if self.publisher is not None else None
+        )
+        self.archive = EventArchive()
+
+        # Matched events waiting for the blocks before them, as a heap of (block_number, [(event, rule), ...])
+        self._held_events = []
+        self._next_block = start_block
+
+    async def run(self):
+        """Backfill until every block of the range is covered"""
+        if self.coverage.get_low_watermark() is None:
+            self.coverage.reset(self.start_block - 1)
+
+        started = time.time()
+        while True:
+            missing = self.coverage.missing_ranges(self.start_block, self.end_block)
+            if not missing:
+                break
+            await self._run_pass(missing)
+
+        self._emit_ready()
+        if self.publisher is not None:
+            self.publisher.flush()
+        self.logger.info(f"Backfill of blocks #{self.start_block} to #{self.end_block - 1} complete "
+                         f"in {time.time() - started:.0f}s")
+
+    async def _run_pass(self, missing):
+        """Fetch the given [start, end) ranges once, sharded over the worker processes"""
+        shards = split_shards(missing, self.shards)
+        total_blocks = sum(end - start for start, end in missing)
+        self.logger.info(f"Backfilling {total_blocks} blocks in {len(shards)} shard(s)")
+
+        executor = ProcessPoolExecutor(
+            max_workers=len(shards),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        queues = [
+            deque(
+                (chunk_start, min(chunk_start + self.chunk_size, end))
+                for start, end in shard
+                for chunk_start in range(start, end, self.chunk_size)
+            )
+            for shard in shards
+        ]
+        failures: Dict[int, int] = {}
+        pending: Dict[asyncio.Task, int] = {}
+        pass_started = last_report = time.time()
+        done_blocks = 0
+
+        try:
+            for shard_index, queue in enumerate(queues):
+                pending[self._submit(executor, queue.popleft())] = shard_index
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    shard_index = pending.pop(task)
+                    (start_block, end_block), (blocks, failed_block, error) = task.result()
+                    delay = 0
+
+                    for block_number, events in blocks:
+                        for event, _ in events:
+                            self.archive.add_event(self.network_name, block_number, event)
+                        if events:
+                            heapq.heappush(self._held_events, (block_number, events))
+
+                    completed_end = end_block if failed_block is None else failed_block
+                    if completed_end > start_block:
+                        self.coverage.mark_completed(start_block, completed_end)
+                        done_blocks += completed_end - start_block
+
+                    if failed_block is not None:
+                        failures[failed_block] = failures.get(failed_block, 0) + 1
+                        if failures[failed_block] >= self.max_block_retries:
+                            self.logger.error(f"Error processing block {failed_block}: {error} (skipping after "
+                                              f"{failures[failed_block]} attempts)")
+                            self.coverage.mark_completed(failed_block)
+                            done_blocks += 1
+                            failed_block += 1
+                        else:
+                            self.logger.error(f"Error processing block {failed_block}: {error} (will retry)")
+                            delay = self.retry_delay
+                        if failed_block < end_block:
+                            queues[shard_index].appendleft((failed_block, end_block))
+
+                    self._emit_ready()
+
+                    if queues[shard_index]:
+                        pending[self._submit(executor, queues[shard_index].popleft(), delay)] = shard_index
+
+                if time.time() - last_report >= 10:
+                    last_report = time.time()
+                    self.logger.info(f"Backfilled {done_blocks}/{total_blocks} blocks "
+                                     f"({done_blocks / (last_report - pass_started):.0f} blocks/s)")
+        finally:
+            for task in pending:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.coverage.flush()
+
+    def _submit(self, executor, chunk, delay=0) -> asyncio.Task:
+        """Schedule one chunk on the worker processes, optionally after a delay"""
+        async def run_chunk():
+            if delay:
+                await asyncio.sleep(delay)
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, fetch_backfill_chunk,
+                self.network_name, self.urls, self.fetch_mode, chunk[0], chunk[1]
+            )
+            return chunk, result
+
+        return asyncio.ensure_future(run_chunk())
+
+    def _emit_ready(self):
+        """Log and publish held events of every block before the first block not covered yet"""
+        self._next_block = self.coverage.covered_until(self._next_block)
+        while self._held_events and self._held_events[0][0] < self._next_block:
+            self._emit(*heapq.heappop(self._held_events))
+
+    def _emit(self, block_number, events):
+        for event, rule in events:
+            self.logger.info(f"Found monitored event in block #{block_number}: "
+                             f"{event['module_id']}.{event['event_id']}")
+            if self.publisher is not None:
+                self.publisher.add(block_number, event, rule)
+
+    def close(self):
+        """Publish events still held back, commit coverage and close the stores"""
+        if self.publisher is not None:
+            # Their blocks are already covered and would not be fetched again
+            while self._held_events:
+                self._emit(*heapq.heappop(self._held_events))
+        self.coverage.close()
+        self.archive.close()
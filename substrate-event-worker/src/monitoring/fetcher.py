@@ -0,0 +1,820 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from substrateinterface import SubstrateInterface
+from websocket import WebSocketConnectionClosedException, WebSocketTimeoutException
+from .metrics import MetricsTracker
+from .prometheus import MetricsRegistry
+from ..decoding import RuntimeEventDecoders, RuntimeSpec, decode_blocks
+from ..storage import MetadataCache
+from ..utils import (
+    AdaptiveController,
+    AsyncRpcClient,
+    BatchRpcClient,
+    CachedSubstrateInterface,
+    RateLimitedError,
+    is_oversize_error,
+    is_throttle_error,
+    is_unsupported_error,
+    SYSTEM_EVENTS_STORAGE_KEY,
+    CONNECTION_ERRORS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BlockFetchError(Exception):
+    """Raised when a block in a range could not be fetched"""
+
+    def __init__(self, block_number, error):
+        super().__init__(f"Failed to fetch block {block_number}: {error}")
+        self.block_number = block_number
+        self.error = error
+
+
+class RangeQueryUnsupported(Exception):
+    """Raised when a node cannot serve range storage queries"""
+    pass
+
+
+def plan_runtime_segments(start_block, end_block, spec_version_at):
+    """
+    Split blocks [start_block, end_block) into runs that share one runtime
+
+    Spec versions only increase, so a run whose first and last block have the same
+    version contains no upgrade. Runs that do are bisected until every change point
+    is found, which costs O(upgrades * log(blocks)) lookups instead of one per block.
+
+    Args:
+        start_block (int): First block of the range
+        end_block (int): Block after the last block of the range
+        spec_version_at (Callable[[int], int]): Spec version a block is decoded with
+
+    Returns:
+        List[Tuple[int, int, int]]: (segment_start, segment_end, spec_version) in block order
+    """
+    versions = {}
+
+    def version(block_number):
+        if block_number not in versions:
+            versions[block_number] = spec_version_at(block_number)
+        return versions[block_number]
+
+    segments = []
+    pending = [(start_block, end_block - 1)]
+    while pending:
+        low, high = pending.pop()
+        if version(low) == version(high):
+            if segments and segments[-1][2] == version(low):
+                segments[-1] = (segments[-1][0], high + 1, version(low))
+            else:
+                segments.append((low, high + 1, version(low)))
+        else:
+            middle = (low + high) // 2
+            # Lower half is popped first so segments come out in block order
+            pending.append((middle + 1, high))
+            pending.append((low, middle))
+
+    return segments
+
+
+class PipelinedBlockFetcher:
+    """
+    Fetch block hashes and events with a window of concurrent requests.
+
+    Every worker thread owns its own SubstrateInterface connection, so up to
+    `window` blocks are in flight at once while results are still handed back
+    strictly in block order. Within that window, the AdaptiveController decides
+    how many requests the current endpoint gets at a time.
+    """
+
+    def __init__(self, endpoints, matcher, window=16, connection_timeout=15, controller=None, metrics=None):
+        self.endpoints = endpoints
+        self.matcher = matcher
+        self.window = max(1, window)
+        self.connection_timeout = connection_timeout
+        self.controller = controller or AdaptiveController(max_in_flight=self.window)
+        self.metrics = metrics or MetricsTracker(registry=MetricsRegistry())
+        self.url = None
+
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.window,
+            thread_name_prefix='block-fetch'
+        )
+
+    def _get_substrate(self) -> SubstrateInterface:
+        """Get (or open) the connection owned by the current worker thread"""
+        substrate = getattr(self._local, 'substrate', None)
+        if substrate is None:
+            self._local.url, substrate = self.endpoints.connect(
+                lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': self.connection_timeout})
+            )
+            self.url = self._local.url
+            self._local.substrate = substrate
+            self._local.decoders = RuntimeEventDecoders(self.matcher.event_filters)
+            with self._lock:
+                self._connections.append(substrate)
+        return substrate
+
+    def _discard_substrate(self, substrate: SubstrateInterface) -> None:
+        """Drop a broken connection so the next request on this thread reconnects"""
+        self._local.substrate = None
+        with self._lock:
+            if substrate in self._connections:
+                self._connections.remove(substrate)
+        try:
+            substrate.close()
+        except Exception:
+            pass
+
+    def _fetch_block(self, block_number):
+        """Fetch the hash and monitored events of a single block (runs in a worker thread)"""
+        substrate = self._get_substrate()
+        started = time.monotonic()
+        try:
+            block_hash = substrate.get_block_hash(block_number)
+            hashed = time.monotonic()
+            substrate.init_runtime(block_hash=block_hash)
+            raw_events = substrate.rpc_request(
+                'state_getStorage',
+                [SYSTEM_EVENTS_STORAGE_KEY, block_hash]
+            ).get('result')
+            fetched = time.monotonic()
+            self.controller.record(self._local.url, fetched - started)
+            self.metrics.observe_stage('hash_fetch', hashed - started)
+            self.metrics.observe_stage('events_fetch', fetched - hashed)
+
+            if not raw_events:
+                return 0, None
+            decoded = self._local.decoders.decode(substrate, raw_events)
+            self.metrics.observe_stage('decode', time.monotonic() - fetched)
+            return decoded
+        except Exception as e:
+            self.controller.record(self._local.url, time.monotonic() - started, e)
+            self.metrics.record_rpc_error(self._local.url)
+            if isinstance(e, CONNECTION_ERRORS):
+                # Only a broken connection is replaced, node errors and decode failures keep it
+                self.endpoints.report_failure(self._local.url)
+                self.metrics.record_reconnect()
+                self._discard_substrate(substrate)
+            raise
+
+    async def fetch_range(self, start_block, end_block):
+        """
+        Yield (block_number, events, event_count) for every block in [start_block, end_block)
+
+        Up to `window` blocks are requested concurrently; results are yielded in
+        block order. Raises BlockFetchError for the first block that failed, after
+        every block before it has been yielded.
+        """
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        next_block = start_block
+
+        try:
+            while next_block < end_block or pending:
+                delay = self.controller.delay(self.url)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                in_flight = min(self.window, self.controller.in_flight(self.url))
+                while next_block < end_block and len(pending) < in_flight:
+                    future = loop.run_in_executor(self._executor, self._fetch_block, next_block)
+                    pending.append((next_block, future))
+                    next_block += 1
+
+                block_number, future = pending.popleft()
+                try:
+                    event_count, events = await future
+                except Exception as e:
+                    raise BlockFetchError(block_number, e) from e
+
+                yield block_number, events, event_count
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """Stop the worker threads and close their connections"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for substrate in connections:
+            try:
+                substrate.close()
+            except Exception:
+                pass
+
+
+class BatchBlockFetcher:
+    """
+    Fetch ranges of blocks with JSON-RPC batch requests over a single connection.
+
+    A chunk of blocks costs two round trips however many blocks it covers: one
+    batch of chain_getBlockHash and one of state_getStorage for System.Events.
+    Events are decoded against the runtime of the parent block, as
+    `substrate.query` does. Runtime upgrades inside a chunk are located by
+    bisecting state_getRuntimeVersion, and each runtime-homogeneous segment is
+    decoded with a runtime loaded once. The number of blocks per chunk follows
+    the AdaptiveController.
+
+    With a DecodePool, decoding moves to worker processes: raw events are sent to
+    the pool per runtime while the next chunk is already being fetched.
+    """
+
+    def __init__(self, endpoints, matcher, connection_timeout=15, max_batch_size=1000, network_name=None,
+                 decode_pool=None, controller=None, metrics=None):
+        self.endpoints = endpoints
+        self.matcher = matcher
+        self.connection_timeout = connection_timeout
+        self.max_batch_size = max_batch_size
+        self.controller = controller or AdaptiveController(max_batch_size=max_batch_size)
+        self.metrics = metrics or MetricsTracker(registry=MetricsRegistry())
+        self.network_name = network_name
+        self.decode_pool = decode_pool
+        self.decoders = RuntimeEventDecoders(matcher.event_filters)
+
+        self.substrate = None
+        self.url = None
+        self.client = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='block-batch')
+
+    def _connect(self) -> SubstrateInterface:
+        """Open the batch connection if it is not open yet"""
+        if self.substrate is None:
+            self.url, self.substrate = self.endpoints.connect(
+                lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': self.connection_timeout})
+            )
+            self.client = BatchRpcClient(self.substrate, max_batch_size=self.max_batch_size)
+        return self.substrate
+
+    def _disconnect(self) -> None:
+        """Drop the batch connection so the next chunk reconnects"""
+        substrate, self.substrate, self.client = self.substrate, None, None
+        if substrate is not None:
+            try:
+                substrate.close()
+            except Exception:
+                pass
+
+    def _fetch_chunk(self, start_block, end_block):
+        """
+        Fetch and decode blocks [start_block, end_block) (runs in the worker thread)
+
+        Returns the blocks in order, plus a BlockFetchError for the first block that
+        could not be fetched or decoded (None if all succeeded). Blocks are decoded
+        (block_number, events, event_count) tuples, or (block_number, runtime,
+        raw_events) tuples left for the decode pool.
+        """
+        results = []
+        block_number = start_block
+        started = time.monotonic()
+
+        try:
+            substrate = self._connect()
+
+            first_block = max(start_block - 1, 0)
+            numbers = list(range(first_block, end_block))
+            hashes = dict(zip(numbers, self.client.request('chain_getBlockHash', [[n] for n in numbers])))
+            hashed = time.monotonic()
+            self.metrics.observe_stage('hash_fetch', hashed - started)
+
+            # Only blocks up to the first unknown hash can be fetched
+            missing_block = next((n for n in range(start_block, end_block) if hashes[n] is None), None)
+            last_block = end_block if missing_block is None else missing_block
+
+            if last_block > start_block:
+                segments = plan_runtime_segments(start_block, last_block, lambda n: self._spec_version(hashes, n))
+                raw_events = self._read_events([hashes[n] for n in range(start_block, last_block)])
+                fetched = time.monotonic()
+                self.controller.record(self.url, fetched - started)
+                self.metrics.observe_stage('events_fetch', fetched - hashed)
+
+                for segment_start, segment_end, spec_version in segments:
+                    block_number = segment_start
+                    if spec_version != substrate.runtime_version:
+                        substrate.init_runtime(block_hash=hashes[segment_start])
+                        logger.debug(f"Blocks {segment_start}-{segment_end - 1} use runtime {spec_version}")
+
+                    runtime = None
+                    if self.decode_pool is not None:
+                        runtime = self.decode_pool.register_runtime(self.network_name, substrate)
+
+                    for block_number in range(segment_start, segment_end):
+                        raw = raw_events[block_number - start_block]
+                        if runtime is not None:
+                            results.append((block_number, runtime, raw))
+                        else:
+                            event_count, events = self.decoders.decode(substrate, raw) if raw else (0, None)
+                            results.append((block_number, events, event_count))
+
+                if self.decode_pool is None:
+                    self.metrics.observe_stage('decode', time.monotonic() - fetched)
+
+            if missing_block is not None:
+                block_number = missing_block
+                raise ValueError(f"Block {missing_block} not found")
+
+        except Exception as e:
+            self.controller.record(self.url, time.monotonic() - started, e)
+            self.metrics.record_rpc_error(self.url)
+            if isinstance(e, CONNECTION_ERRORS) and self.url is not None:
+                self.endpoints.report_failure(self.url)
+            if self.substrate is not None:
+                self.metrics.record_reconnect()
+            self._disconnect()
+            return results, BlockFetchError(block_number, e)
+
+        return results, None
+
+    def _spec_version(self, hashes, block_number):
+        """Spec version of the runtime a block is decoded with, i.e. that of its parent"""
+        runtime_version = self.client.request('state_getRuntimeVersion', [[hashes[max(block_number - 1, 0)]]])[0]
+        if not runtime_version:
+            raise ValueError(f"No runtime version for block {block_number}")
+        return runtime_version['specVersion']
+
+    def _read_events(self, block_hashes):
+        """Read raw System.Events for each block hash with one batch of state_getStorage"""
+        return self.client.request(
+            'state_getStorage',
+            [[SYSTEM_EVENTS_STORAGE_KEY, block_hash] for block_hash in block_hashes]
+        )
+
+    async def fetch_range(self, start_block, end_block):
+        """
+        Yield (block_number, events, event_count) for every block in [start_block, end_block)
+
+        Blocks are requested in chunks sized by the AdaptiveController (at most
+        max_batch_size) and yielded in block order. Raises BlockFetchError for the
+        first block that failed, after every block before it has been yielded.
+        """
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        chunk_start = start_block
+
+        try:
+            while chunk_start < end_block:
+                delay = self.controller.delay(self.url)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                chunk_end = min(chunk_start + self.controller.batch_size(self.url), end_block)
+                results, error = await loop.run_in_executor(
+                    self._executor, self._fetch_chunk, chunk_start, chunk_end
+                )
+
+                if self.decode_pool is None:
+                    for block_number, events, event_count in results:
+                        yield block_number, events, event_count
+                else:
+                    pending.extend(self._submit_decodes(results))
+
+                    # Keep the pool busy while the next chunk is fetched
+                    while len(pending) > 2 * self.decode_pool.workers or (error is not None and pending):
+                        for block in await pending.popleft():
+                            yield block
+
+                if error is not None:
+                    raise error
+
+                chunk_start = chunk_end
+
+            while pending:
+                for block in await pending.popleft():
+                    yield block
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _submit_decodes(self, results):
+        """Send fetched raw blocks to the decode pool, one task per runtime and chunk_size blocks"""
+        futures = []
+        runtime, blocks = None, []
+
+        def submit():
+            future = self.decode_pool.submit(runtime, self.matcher, blocks)
+            submitted = time.monotonic()
+            # Decode time in the pool includes the time the task waited for a worker
+            future.add_done_callback(lambda _: self.metrics.observe_stage('decode', time.monotonic() - submitted))
+            futures.append(future)
+
+        for block_number, block_runtime, raw_events in results:
+            if blocks and (block_runtime != runtime or len(blocks) >= self.decode_pool.chunk_size):
+                submit()
+                blocks = []
+            runtime = block_runtime
+            blocks.append((block_number, raw_events))
+
+        if blocks:
+            submit()
+
+        return futures
+
+    def close(self) -> None:
+        """Stop the worker thread and close the connection"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._disconnect()
+
+
+class RangeBlockFetcher(BatchBlockFetcher):
+    """
+    Fetch ranges of blocks, reading System.Events for a whole range in one call.
+
+    Events are read with state_queryStorage between the first and last block hash
+    of a chunk. The node only reports blocks where the value changed, so unchanged
+    blocks carry the previous value forward. Oversized ranges are split in half;
+    nodes that do not expose state_queryStorage (it is an unsafe RPC method on many
+    public endpoints) fall back to batched per-block state_getStorage reads. Other
+    errors fail the chunk like any fetch error, without giving up on range queries.
+    """
+
+    def __init__(self, endpoints, matcher, connection_timeout=15, max_batch_size=1000, network_name=None,
+                 decode_pool=None, controller=None, metrics=None):
+        super().__init__(
+            endpoints, matcher,
+            connection_timeout=connection_timeout,
+            max_batch_size=max_batch_size,
+            network_name=network_name,
+            decode_pool=decode_pool,
+            controller=controller,
+            metrics=metrics
+        )
+        self.range_supported = True
+
+    def _read_events(self, block_hashes):
+        """Read raw System.Events for each block hash, preferring a single range query"""
+        if self.range_supported:
+            try:
+                return self._query_storage_range(block_hashes)
+            except RangeQueryUnsupported as e:
+                logger.warning(f"Range storage queries unavailable ({e}), falling back to per-block reads")
+                self.range_supported = False
+
+        return super()._read_events(block_hashes)
+
+    def _query_storage_range(self, block_hashes):
+        """Read raw System.Events for a contiguous list of block hashes with state_queryStorage"""
+        try:
+            response = self.substrate.rpc_request(
+                'state_queryStorage',
+                [[SYSTEM_EVENTS_STORAGE_KEY], block_hashes[0], block_hashes[-1]]
+            )
+        except (WebSocketConnectionClosedException, WebSocketTimeoutException) as e:
+            # Nodes commonly drop the connection instead of sending an oversized response
+            self.substrate.connect_websocket()
+            return self._split_range(block_hashes, e)
+        except Exception as e:
+            error = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+            message = str(error.get('message', e))
+            if is_throttle_error(message):
+                raise RateLimitedError(f"state_queryStorage rate limited: {message}")
+            if is_oversize_error(message):
+                return self._split_range(block_hashes, message)
+            if is_unsupported_error(error.get('code'), message):
+                raise RangeQueryUnsupported(message)
+            # Anything else may be transient, the chunk fails and is retried with range queries
+            raise
+
+        values = {}
+        for change_set in response.get('result') or []:
+            for storage_key, value in change_set['changes']:
+                if storage_key == SYSTEM_EVENTS_STORAGE_KEY:
+                    values[change_set['block']] = value
+
+        if block_hashes[0] not in values:
+            raise RangeQueryUnsupported("node did not return the value at the start of the range")
+
+        raw_events = []
+        current = None
+        for block_hash in block_hashes:
+            current = values.get(block_hash, current)
+            raw_events.append(current)
+
+        return raw_events
+
+    def _split_range(self, block_hashes, reason):
+        """Query both halves of a range the node refused to answer in one response"""
+        if len(block_hashes) <= 1:
+            # Read the block on its own; a timeout or dropped connection says nothing about range support
+            logger.debug(f"Single block range query failed ({reason}), reading the block with state_getStorage")
+            return super()._read_events(block_hashes)
+
+        logger.debug(f"Splitting range query of {len(block_hashes)} blocks: {reason}")
+        middle = len(block_hashes) // 2
+        return self._query_storage_range(block_hashes[:middle]) + self._query_storage_range(block_hashes[middle:])
+
+
+class AsyncBlockFetcher:
+    """
+    Fetch ranges of blocks over one multiplexed asyncio JSON-RPC connection.
+
+    Like BatchBlockFetcher, a chunk of blocks costs a batch of chain_getBlockHash
+    and one of state_getStorage, but no thread waits on the network: up to the
+    AdaptiveController's `in_flight` chunks are outstanding at once on the same
+    AsyncRpcClient, within its request window, and are yielded in block order.
+    A chunk only reads the spec version of every block when its first and last
+    blocks differ. Runtime metadata comes from the MetadataCache, or from
+    state_getMetadata on first use, and events go through the decode path of
+    the DecodePool: in its worker processes when one is given, otherwise in a
+    single background thread so decoding never holds up the event loop.
+    Runtimes must have V14 or later metadata.
+    """
+
+    def __init__(self, endpoints, matcher, connection_timeout=15, max_batch_size=1000, rpc_window=32,
+                 network_name=None, decode_pool=None, controller=None, metrics=None, metadata_cache=None):
+        self.endpoints = endpoints
+        self.matcher = matcher
+        self.connection_timeout = connection_timeout
+        self.rpc_window = rpc_window
+        self.controller = controller or AdaptiveController(max_batch_size=max_batch_size)
+        self.metrics = metrics or MetricsTracker(registry=MetricsRegistry())
+        self.network_name = network_name or 'default'
+        self.decode_pool = decode_pool
+        self.metadata_cache = metadata_cache or MetadataCache()
+
+        self.client = None
+        self.url = None
+        self.genesis_hash = None
+        self.ss58_format = None
+        self._loop = None
+        self._connect_lock = None
+        self._runtimes = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='block-decode')
+
+    async def _connect(self) -> AsyncRpcClient:
+        """Open the shared connection if it is not open, once for all chunks waiting on it"""
+        async with self._connect_lock:
+            if self.client is None or self.client.closed:
+                self.url, self.client = await self.endpoints.connect_async(
+                    lambda url: AsyncRpcClient(url, window=self.rpc_window, timeout=self.connection_timeout).connect()
+                )
+                if self.genesis_hash is None:
+                    self.genesis_hash = await self.client.request('chain_getBlockHash', [0])
+                    properties = await self.client.request('system_properties') or {}
+                    self.ss58_format = properties.get('ss58Format', properties.get('SS58Prefix', 42))
+            return self.client
+
+    def _disconnect(self, client) -> None:
+        """Drop a broken connection so the next chunk reconnects, unless it was already replaced"""
+        if client is not None and client is self.client:
+            self.client = None
+            client.close()
+
+    async def _runtime(self, client, spec_version, block_hash) -> RuntimeSpec:
+        """Get the runtime of a spec version, loading it once for all chunks that need it"""
+        if spec_version not in self._runtimes:
+            self._runtimes[spec_version] = asyncio.ensure_future(
+                self._load_runtime(client, spec_version, block_hash)
+            )
+        try:
+            # Shielded: a cancelled chunk must not cancel a load other chunks wait for
+            return await asyncio.shield(self._runtimes[spec_version])
+        except Exception:
+            self._runtimes.pop(spec_version, None)
+            raise
+
+    async def _load_runtime(self, client, spec_version, block_hash) -> RuntimeSpec:
+        """Make sure the metadata of a runtime is in the on-disk cache, downloading it at block_hash"""
+        metadata_path = self.metadata_cache.path_for(self.genesis_hash, spec_version)
+        if not metadata_path.exists():
+            raw_metadata = await client.request('state_getMetadata', [block_hash])
+            if not raw_metadata:
+                raise ValueError(f"No metadata for block {block_hash}")
+            await asyncio.to_thread(self.metadata_cache.put, self.genesis_hash, spec_version, raw_metadata)
+            if not metadata_path.exists():
+                raise OSError(f"Failed to cache the metadata of runtime {spec_version}")
+            logger.debug(f"Downloaded metadata of runtime {spec_version}")
+
+        return RuntimeSpec(
+            key=f"{self.network_name}-{spec_version}",
+            spec_version=spec_version,
+            metadata_path=str(metadata_path),
+            ss58_format=self.ss58_format,
+            type_registry_preset=None
+        )
+
+    async def _plan_segments(self, client, hashes, start_block, end_block):
+        """Split blocks [start_block, end_block) into runtime segments, see plan_runtime_segments"""
+
+        def parent_hash(block_number):
+            return hashes[max(block_number - 1, 0)]
+
+        first, last = await asyncio.gather(
+            client.request('state_getRuntimeVersion', [parent_hash(start_block)]),
+            client.request('state_getRuntimeVersion', [parent_hash(end_block - 1)])
+        )
+        if not first or not last:
+            raise ValueError(f"No runtime version for blocks {start_block}-{end_block - 1}")
+        if first['specVersion'] == last['specVersion']:
+            return [(start_block, end_block, first['specVersion'])]
+
+        # A runtime upgrade inside the chunk, read the version of every block in one batch
+        numbers = range(start_block, end_block)
+        versions = await client.batch('state_getRuntimeVersion', [[parent_hash(n)] for n in numbers])
+        if not all(versions):
+            raise ValueError(f"No runtime version for blocks {start_block}-{end_block - 1}")
+        spec_versions = {n: version['specVersion'] for n, version in zip(numbers, versions)}
+        return plan_runtime_segments(start_block, end_block, spec_versions.__getitem__)
+
+    async def _decode(self, runtime, blocks):
+        """Decode blocks of one runtime in the decode pool, or in the background thread without one"""
+        if self.decode_pool is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, decode_blocks, runtime, self.matcher, blocks
+            )
+
+        chunk_size = self.decode_pool.chunk_size
+        decoded = await asyncio.gather(*(
+            self.decode_pool.submit(runtime, self.matcher, blocks[offset:offset + chunk_size])
+            for offset in range(0, len(blocks), chunk_size)
+        ))
+        return [block for chunk in decoded for block in chunk]
+
+    async def _fetch_chunk(self, start_block, end_block):
+        """
+        Fetch and decode blocks [start_block, end_block)
+
+        Returns the decoded (block_number, events, event_count) tuples in order,
+        plus a BlockFetchError for the first block that could not be fetched or
+        decoded (None if all succeeded).
+        """
+        results = []
+        block_number = start_block
+        started = time.monotonic()
+        client = None
+
+        try:
+            client = await self._connect()
+
+            numbers = list(range(max(start_block - 1, 0), end_block))
+            hashes = dict(zip(numbers, await client.batch('chain_getBlockHash', [[n] for n in numbers])))
+            hashed = time.monotonic()
+            self.metrics.observe_stage('hash_fetch', hashed - started)
+
+            # Only blocks up to the first unknown hash can be fetched
+            missing_block = next((n for n in range(start_block, end_block) if hashes[n] is None), None)
+            last_block = end_block if missing_block is None else missing_block
+
+            if last_block > start_block:
+                segments, raw_events = await asyncio.gather(
+                    self._plan_segments(client, hashes, start_block, last_block),
+                    client.batch(
+                        'state_getStorage',
+                        [[SYSTEM_EVENTS_STORAGE_KEY, hashes[n]] for n in range(start_block, last_block)]
+                    )
+                )
+                fetched = time.monotonic()
+                self.controller.record(self.url, fetched - started)
+                self.metrics.observe_stage('events_fetch', fetched - hashed)
+
+                for segment_start, segment_end, spec_version in segments:
+                    block_number = segment_start
+                    runtime = await self._runtime(client, spec_version, hashes[max(segment_start - 1, 0)])
+                    results.extend(await self._decode(runtime, [
+                        (n, raw_events[n - start_block]) for n in range(segment_start, segment_end)
+                    ]))
+                self.metrics.observe_stage('decode', time.monotonic() - fetched)
+
+            if missing_block is not None:
+                block_number = missing_block
+                raise ValueError(f"Block {missing_block} not found")
+
+        except Exception as e:
+            self.controller.record(self.url, time.monotonic() - started, e)
+            self.metrics.record_rpc_error(self.url)
+            if isinstance(e, CONNECTION_ERRORS):
+                # Other chunks on the connection fail too, only the first one reconnects
+                if self.url is not None and client is self.client:
+                    self.endpoints.report_failure(self.url)
+                    self.metrics.record_reconnect()
+                self._disconnect(client)
+            return results, BlockFetchError(block_number, e)
+
+        return results, None
+
+    async def fetch_range(self, start_block, end_block):
+        """
+        Yield (block_number, events, event_count) for every block in [start_block, end_block)
+
+        Chunks sized by the AdaptiveController are requested concurrently over the
+        shared connection and yielded in block order. Raises BlockFetchError for the
+        first block that failed, after every block before it has been yielded.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections belong to the loop that opened them, backfill workers run a loop per chunk
+            self._loop = loop
+            self.disconnect()
+            self._connect_lock = asyncio.Lock()
+            self._runtimes = {}
+
+        pending = deque()
+        chunk_start = start_block
+
+        try:
+            while chunk_start < end_block or pending:
+                delay = self.controller.delay(self.url)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                in_flight = self.controller.in_flight(self.url)
+                while chunk_start < end_block and len(pending) < in_flight:
+                    chunk_end = min(chunk_start + self.controller.batch_size(self.url), end_block)
+                    pending.append(asyncio.ensure_future(self._fetch_chunk(chunk_start, chunk_end)))
+                    chunk_start = chunk_end
+
+                results, error = await pending.popleft()
+                for block_number, events, event_count in results:
+                    yield block_number, events, event_count
+                if error is not None:
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def disconnect(self) -> None:
+        """Close the connection, e.g. while the event loop that opened it is still running"""
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def close(self) -> None:
+        """Stop the decode thread and close the connection"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.disconnect()
+
+
+def create_fetcher(fetch_mode, endpoints, matcher, connection_timeout=15, fetch_window=16, rpc_batch_size=1000,
+                   network_name=None, decode_pool=None, controller=None, metrics=None, rpc_window=32):
+    """
+    Create the block fetcher for the configured fetch mode
+
+    Args:
+        fetch_mode (str): 'range' for range storage queries, 'batch' for JSON-RPC batches,
+            'pipelined' for concurrent per-block requests, 'async' for concurrent JSON-RPC
+            batches over one asyncio connection
+        endpoints (EndpointPool): RPC endpoints of the network, connections fail over between them
+        matcher (RuleMatcher): Compiled monitoring rules, used to skip decoding unmonitored events
+        connection_timeout (int): Connection timeout in seconds
+        fetch_window (int): Blocks in flight at once in pipelined mode
+        rpc_batch_size (int): Largest JSON-RPC batch or range read in range and batch modes
+        network_name (str): Network being fetched, used to key runtimes in the decode pool
+        decode_pool (DecodePool): Optional process pool decoding events in range, batch and async modes
+        controller (AdaptiveController): Optional controller sizing batches and requests in flight
+        metrics (MetricsTracker): Optional tracker receiving stage latencies, RPC errors and reconnects
+        rpc_window (int): Requests outstanding at once on the connection in async mode
+
+    Returns:
+        The fetcher exposing `fetch_range` and `close`
+    """
+    if fetch_mode == 'range':
+        return RangeBlockFetcher(
+            endpoints=endpoints,
+            matcher=matcher,
+            connection_timeout=connection_timeout,
+            max_batch_size=rpc_batch_size,
+            network_name=network_name,
+            decode_pool=decode_pool,
+            controller=controller,
+            metrics=metrics
+        )
+    if fetch_mode == 'batch':
+        return BatchBlockFetcher(
+            endpoints=endpoints,
+            matcher=matcher,
+            connection_timeout=connection_timeout,
+            max_batch_size=rpc_batch_size,
+            network_name=network_name,
+            decode_pool=decode_pool,
+            controller=controller,
+            metrics=metrics
+        )
+    if fetch_mode == 'pipelined':
+        return PipelinedBlockFetcher(
+            endpoints=endpoints,
+            matcher=matcher,
+            window=fetch_window,
+            connection_timeout=connection_timeout,
+            controller=controller,
+            metrics=metrics
+        )
+    if fetch_mode == 'async':
+        return AsyncBlockFetcher(
+            endpoints=endpoints,
+            matcher=matcher,
+            connection_timeout=connection_timeout,
+            max_batch_size=rpc_batch_size,
+            rpc_window=rpc_window,
+            network_name=network_name,
+            decode_pool=decode_pool,
+            controller=controller,
+            metrics=metrics
+        )
+    raise ValueError(f"Unknown fetch mode: {fetch_mode}")
@@ -1,22 +1,85 @@
 import time
+from .prometheus import REGISTRY
 
 
 class MetricsTracker:
-    def __init__(self):
+    def __init__(self, controller=None, hedger=None, network_name=None, registry=REGISTRY):
+        self.controller = controller
+        self.hedger = hedger
+        self.network_name = network_name or 'default'
+        self.registry = registry
         self.start_time = None
         self.blocks_processed = 0
         self.last_metrics_update = time.time()
         self.last_blocks_count = 0
+        self.last_progress = None
+
+        # Series exported on /metrics, labelled with the network
+        self.blocks_total = registry.counter(
+            'substrate_worker_blocks_processed_total', 'Blocks processed', ('network',))
+        self.lag = registry.gauge(
+            'substrate_worker_lag_blocks', 'Finalized blocks not processed yet', ('network',))
+        self.stage_seconds = registry.histogram(
+            'substrate_worker_stage_seconds', 'Time spent per pipeline stage', ('network', 'stage'))
+        self.rpc_errors = registry.counter(
+            'substrate_worker_rpc_errors_total', 'Failed RPC requests', ('network', 'endpoint'))
+        self.reconnects = registry.counter(
+            'substrate_worker_reconnects_total', 'Connections dropped and reopened', ('network',))
+        self.alerts = registry.counter(
+            'substrate_worker_alerts_total', 'Monitored events found', ('network', 'rule'))
+        self.hedged_reads = registry.counter(
+            'substrate_worker_hedged_reads_total', 'Slow reads repeated on a second endpoint', ('network',))
+        self.hedge_wins = registry.counter(
+            'substrate_worker_hedge_wins_total', 'Hedged reads answered first by the hedge', ('network',))
 
     def start(self):
         """Start tracking metrics"""
         self.start_time = time.time()
         self.last_metrics_update = self.start_time
+        self.last_progress = self.start_time
+
+    def heartbeat(self):
+        """Record that the monitor is alive, e.g. after reading the finalized head"""
+        self.last_progress = time.time()
+
+    def is_healthy(self, max_stall):
+        """Check that the monitor has started and made progress within max_stall seconds"""
+        return self.last_progress is not None and time.time() - self.last_progress < max_stall
+
+    def set_lag(self, lag):
+        """Export the number of finalized blocks not processed yet"""
+        self.lag.set(max(0, lag), network=self.network_name)
+
+    def observe_stage(self, stage, seconds):
+        """Record the time spent in one pipeline stage: hash_fetch, events_fetch, decode, match, notify or publish"""
+        self.stage_seconds.observe(seconds, network=self.network_name, stage=stage)
+
+    def record_rpc_error(self, url):
+        """Count a failed RPC request to an endpoint"""
+        self.rpc_errors.inc(network=self.network_name, endpoint=url or 'unknown')
+
+    def record_reconnect(self):
+        """Count a connection that was dropped and will be reopened"""
+        self.reconnects.inc(network=self.network_name)
+
+    def record_alert(self, rule):
+        """Count a monitored event matched by a rule"""
+        self.alerts.inc(network=self.network_name, rule=rule)
+
+    def record_hedge(self):
+        """Count a slow read hedged on a second endpoint"""
+        self.hedged_reads.inc(network=self.network_name)
+
+    def record_hedge_win(self):
+        """Count a hedged read answered first by the hedge"""
+        self.hedge_wins.inc(network=self.network_name)
 
     def update(self, new_blocks=1):
         """Update block count and calculate metrics"""
         self.blocks_processed += new_blocks
+        self.blocks_total.inc(new_blocks, network=self.network_name)
         current_time = time.time()
+        self.last_progress = current_time
         time_diff = current_time - self.last_metrics_update
 
         # Update metrics every 5 seconds
@@ -29,10 +92,20 @@ class MetricsTracker:
             self.last_metrics_update = current_time
             self.last_blocks_count = self.blocks_processed
 
-            return {
+            metrics = {
                 'current_speed': blocks_per_second,
                 'average_speed': total_blocks_per_second,
                 'total_blocks': self.blocks_processed
             }
 
+            # Current profile and limits of the adaptive RPC controller
+            if self.controller is not None:
+                metrics['rpc'] = self.controller.snapshot()
+
+            # Hedged reads, so the extra load they put on endpoints stays visible
+            if self.hedger is not None:
+                metrics['hedging'] = self.hedger.stats()
+
+            return metrics
+
         return None
@@ -1,60 +1,174 @@
 import asyncio
 import json
 import os
+import threading
+import time
 import logging
+from .alert_queue import AlertQueue, QueuedAlert
 from .metrics import MetricsTracker
+from .fetcher import create_fetcher, BlockFetchError
+from .subscription import AsyncFinalizedHeadSubscription, FinalizedHeadSubscription
+from .tracing import AlertTracer
 from ..display import DisplayManager
-from ..storage import BlockStore
-from ..config.settings import DEFAULT_CONFIG, get_monitored_events
+from ..sinks import EventPublisher
+from ..storage import CheckpointStore, EventArchive, extract_referendum_index
+from ..config.settings import DEFAULT_CONFIG, get_rule_matcher
+from ..utils import AdaptiveController, CachedSubstrateInterface, EndpointPool, HedgedReader, CONNECTION_ERRORS
 from substrateinterface import SubstrateInterface
 
 logger = logging.getLogger(__name__)
 
+
+class NetworkLoggerAdapter(logging.LoggerAdapter):
+    """Prefix log messages with the network name so several monitors can share a process"""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['network']}] {msg}", kwargs
+
+
 class BlockRangeGovernanceMonitor:
-    def __init__(self, network_name, ws_url, display_mode=False, debug=False):
+    def __init__(self, network_name, urls, display_mode=False, debug=False, enable_discord=False,
+                 fetch_mode=None, fetch_window=None, follow_mode=None, decode_pool=None, hedge=None, matcher=None,
+                 alert_policy=None, sinks=None):
         self.network_name = network_name
-        self.ws_url = ws_url
+        self.endpoints = EndpointPool(urls)
         self.current_block = None
         self.debug = debug
         self.display_mode = display_mode
+        self.enable_discord = enable_discord
+        self.logger = NetworkLoggerAdapter(logger, {'network': network_name})
 
         # Get configuration values from settings
         self.batch_size = DEFAULT_CONFIG['batch_size']
         self.connection_timeout = DEFAULT_CONFIG['connection_timeout']
         self.retry_delay = DEFAULT_CONFIG['retry_delay']
+        self.fetch_mode = fetch_mode or DEFAULT_CONFIG['fetch_mode']
+        self.fetch_window = fetch_window or DEFAULT_CONFIG['fetch_window']
+        self.max_block_retries = DEFAULT_CONFIG['max_block_retries']
+        self.follow_mode = follow_mode or DEFAULT_CONFIG['follow_mode']
+
+        # Earliest time to (re)try the finalized head subscription after it dropped
+        self.subscription_retry_at = 0
+
+        # Block that failed to fetch and how many times it has been retried
+        self.failed_block = None
+        self.failed_attempts = 0
+
+        # Batch size and requests in flight adapt per endpoint to latency, errors and rate limits
+        self.controller = AdaptiveController(
+            max_batch_size=DEFAULT_CONFIG['rpc_batch_size'],
+            max_in_flight=self.fetch_window,
+            lag_threshold=DEFAULT_CONFIG['lag_threshold'],
+            tip_batch_size=DEFAULT_CONFIG['tip_batch_size'],
+            tip_in_flight=DEFAULT_CONFIG['tip_in_flight']
+        )
+
+        # Finalized head reads go to the best endpoint, optionally hedged on a second one when slow
+        self.reader = HedgedReader(
+            self.endpoints,
+            lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': self.connection_timeout}),
+            enabled=DEFAULT_CONFIG['hedge_reads'] if hedge is None else hedge,
+            percentile=DEFAULT_CONFIG['hedge_percentile'],
+            max_hedge_ratio=DEFAULT_CONFIG['hedge_max_ratio'],
+            on_error=self.record_read_error,
+            on_hedge=lambda: self.metrics.record_hedge(),
+            on_hedge_win=lambda: self.metrics.record_hedge_win()
+        )
 
         # Initialize components
-        self.metrics = MetricsTracker()
+        self.metrics = MetricsTracker(self.controller, self.reader, network_name=network_name)
         self.display = DisplayManager(
             max_events=DEFAULT_CONFIG['max_events'],
             max_alerts=DEFAULT_CONFIG['max_alerts']
         ) if display_mode else None
 
-        # Get monitored events from settings
-        self.governance_modules = get_monitored_events(network_name)
+        # Compile monitoring rules once, reused for every block
+        self.rule_matcher = matcher or get_rule_matcher(network_name)
+        self.governance_modules = self.rule_matcher.event_filters
+
+        # Per-alert latency traces, from the block timestamp to the notification
+        self.tracer = AlertTracer(
+            network_name, self.metrics,
+            reader=self.reader,
+            max_age=DEFAULT_CONFIG['alert_trace_max_age']
+        )
 
-        # Initialize block store
-        self.block_store = BlockStore(network_name)
+        # Notifications are delivered by notifier tasks behind a bounded queue, off the block processing path
+        self.notifier = None
+        self.alert_queue = None
+        self.notification_connection = None
+        self._notification_lock = threading.Lock()
+        if enable_discord:
+            from ..notifications import WebhookNotifier
+            self.notifier = WebhookNotifier()
+            self.alert_queue = AlertQueue(
+                self.deliver_alert, network_name, self.metrics,
+                workers=DEFAULT_CONFIG['notifier_workers'],
+                maxsize=DEFAULT_CONFIG['alert_queue_size'],
+                policy=alert_policy or DEFAULT_CONFIG['alert_queue_policy']
+            )
+
+        # Structured records of matched events for other consumers, written in batches
+        self.publisher = EventPublisher(
+            sinks, network_name, self.metrics,
+            batch_size=DEFAULT_CONFIG['sink_batch_size']
+        ) if sinks else None
+
+        # Durable record of processed blocks, committed only once their events are published
+        self.checkpoints = CheckpointStore(
+            network_name,
+            commit_interval=DEFAULT_CONFIG['checkpoint_interval'],
+            commit_blocks=DEFAULT_CONFIG['checkpoint_blocks'],
+            before_commit=self.publisher.flush if self.publisher is not None else None
+        )
+
+        # Indexed archive of every matched event
+        self.archive = EventArchive()
+
+        # Block fetcher for catch-up and tip following
+        self.fetcher = create_fetcher(
+            fetch_mode=self.fetch_mode,
+            endpoints=self.endpoints,
+            matcher=self.rule_matcher,
+            connection_timeout=self.connection_timeout,
+            fetch_window=self.fetch_window,
+            rpc_batch_size=DEFAULT_CONFIG['rpc_batch_size'],
+            network_name=network_name,
+            decode_pool=decode_pool,
+            controller=self.controller,
+            metrics=self.metrics,
+            rpc_window=DEFAULT_CONFIG['rpc_window']
+        )
+
+    def process_events(self, block_number, events, event_count=None):
+        """
+        Process events from a specific block
+
+        `events` may already be narrowed down to the monitored events by the
+        decoder, in which case event_count is the total number of events in the block.
+        """
+        if event_count is None:
+            event_count = len(events)
 
-    def process_events(self, block_number, events):
-        """Process events from a specific block"""
-        event_count = 0
+        fetched_at = time.time()
+        match_time = 0.0
         for event in events:
-            event_count += 1
             module_id = event['module_id']
             event_id = event['event_id']
 
-            # Check if this event should be monitored
-            should_monitor = False
-            for monitored_module, monitored_event in self.governance_modules:
-                if monitored_module.lower() == module_id.lower():
-                    # If monitored_event is None, monitor all events from this module
-                    # Otherwise, check if it matches the specific event
-                    if monitored_event is None or monitored_event.lower() == event_id.lower():
-                        should_monitor = True
-                        break
+            # Check if this event should be monitored, including attribute conditions
+            started = time.monotonic()
+            rule = self.rule_matcher.match(module_id, event_id, event.get('attributes'))
+            match_time += time.monotonic() - started
+
+            if rule is not None:
+                notify_started = time.monotonic()
+                trace = self.tracer.begin(block_number, event, rule, fetched_at)
+                self.metrics.record_alert(rule)
+                self.archive.add_event(self.network_name, block_number, event)
+                if self.publisher is not None:
+                    self.publisher.add(block_number, event, rule)
 
-            if should_monitor:
                 if self.display_mode:
                     attributes = event.get('attributes', {})
                     alert_header = f"🔹 Block #{block_number}: {module_id}.{event_id}"
@@ -63,24 +177,199 @@ class BlockRangeGovernanceMonitor:
                     alert = f"{alert_header}\n\t{indented_json}"
                     self.display.add_alert(alert)
                 else:
-                    logging.info(f"Found monitored event in block #{block_number}: {module_id}.{event_id}")
+                    self.logger.info(f"Found monitored event in block #{block_number}: {module_id}.{event_id}")
+                self.metrics.observe_stage('notify', time.monotonic() - notify_started)
+
+                if self.alert_queue is not None:
+                    # Finished by the notifier task once delivered
+                    self.alert_queue.put(QueuedAlert(
+                        block_number, event, rule, self.rule_matcher.priority(rule), trace
+                    ))
+                else:
+                    self.tracer.finish(trace)
+
+        self.metrics.observe_stage('match', match_time)
 
         if event_count > 0 and self.display_mode:
             self.display.add_event(f"🔸 Processed {event_count} events in block #{block_number}")
         elif event_count > 0 and self.debug:
-            logging.debug(f"Processed {event_count} events in block #{block_number}")
+            self.logger.debug(f"Processed {event_count} events in block #{block_number}")
 
         # Update metrics
         metrics_update = self.metrics.update()
         if metrics_update and self.display_mode:
+            rpc = metrics_update['rpc']
             self.display.set_speed(
                 f"⚡ Speed: {metrics_update['current_speed']:.2f} blocks/s " +
-                f"(avg: {metrics_update['average_speed']:.2f} blocks/s)"
+                f"(avg: {metrics_update['average_speed']:.2f} blocks/s) " +
+                f"[{rpc['profile']}: batch {rpc['batch_size']}, {rpc['in_flight']} in flight]"
             )
+        elif metrics_update and self.debug:
+            rpc = metrics_update['rpc']
+            hedging = metrics_update['hedging']
+            self.logger.debug(f"Speed: {metrics_update['current_speed']:.2f} blocks/s, {rpc['profile']} profile, "
+                              f"batch {rpc['batch_size']}, {rpc['in_flight']} in flight, "
+                              f"{hedging['hedged']}/{hedging['reads']} reads hedged ({hedging['hedge_wins']} won)")
+
+    async def process_range(self, start_block, end_block):
+        """
+        Fetch and process blocks [start_block, end_block) through the block fetcher.
+
+        Events are committed to process_events strictly in block order and every
+        fully processed block is recorded in the checkpoint store. A block that
+        keeps failing is skipped after max_block_retries attempts.
+        """
+        last_processed = start_block - 1
+
+        try:
+            async for block_number, events, event_count in self.fetcher.fetch_range(start_block, end_block):
+                if events is not None:
+                    self.process_events(block_number, events, event_count)
+                    if self.alert_queue is not None:
+                        await self.alert_queue.wait_for_room()
+                self.checkpoints.mark_completed(block_number)
+                last_processed = block_number
+
+            self.failed_block = None
+            self.failed_attempts = 0
+
+        except BlockFetchError as e:
+            last_processed = e.block_number - 1
+
+            if self.failed_block == e.block_number:
+                self.failed_attempts += 1
+            else:
+                self.failed_block = e.block_number
+                self.failed_attempts = 1
+
+            if self.failed_attempts >= self.max_block_retries:
+                self.logger.error(f"Error processing block {e.block_number}: {e.error} (skipping after "
+                                  f"{self.failed_attempts} attempts)")
+                last_processed = e.block_number
+                self.checkpoints.mark_completed(e.block_number)
+                self.failed_block = None
+                self.failed_attempts = 0
+            else:
+                self.logger.error(f"Error processing block {e.block_number}: {e.error} (will retry)")
+
+        if self.publisher is not None:
+            self.publisher.flush()
+
+        if last_processed >= start_block:
+            self.current_block = last_processed + 1
+
+    async def deliver_alert(self, alert: QueuedAlert) -> None:
+        """Send an alert to the Discord webhooks of the network (runs in a notifier task)"""
+        try:
+            proposal_index = extract_referendum_index(alert.event['module_id'], alert.event.get('attributes'))
+            if proposal_index is None:
+                self.logger.debug(f"No referendum in {alert.rule} alert of block #{alert.block_number}, "
+                                  f"not sent to Discord")
+                return
+            # The notifier reads Redis and the chain with blocking calls, keep them off the event loop
+            await asyncio.to_thread(self.send_discord_alert, alert, proposal_index)
+        finally:
+            if alert.trace is not None:
+                self.tracer.finish(alert.trace)
+
+    def send_discord_alert(self, alert: QueuedAlert, proposal_index: int) -> None:
+        """Run the webhook notifier for one alert (blocking, runs in a worker thread)"""
+        with self._notification_lock:
+            if self.notification_connection is None:
+                _, substrate = self.endpoints.connect(
+                    lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': self.connection_timeout})
+                )
+                # Load the chain properties once, before notifier threads share the connection
+                substrate.properties
+                self.notification_connection = substrate
+
+        asyncio.run(self.notifier.discord_governance_alert(
+            self.network_name, alert.event, proposal_index,
+            substrate=self.notification_connection, reader=self.reader, trace=alert.trace
+        ))
+
+    async def process_batch(self, finalized_block):
+        """Process the next batch of blocks, up to at most finalized_block"""
+        batch_end = min(self.current_block + self.batch_size, finalized_block + 1)
+        self.controller.set_lag(finalized_block - self.current_block)
+
+        if self.display_mode:
+            self.display.set_batch(
+                f"🤖 Processing blocks #{self.current_block} to #{batch_end - 1}"
+            )
+        elif self.debug:
+            self.logger.debug(f"🤖 Processing blocks #{self.current_block} to #{batch_end - 1}")
+
+        await self.process_range(self.current_block, batch_end)
+        self.metrics.set_lag(finalized_block + 1 - self.current_block)
+
+    async def follow_finalized_heads(self):
+        """
+        Process every finalized block as soon as it is announced.
+
+        Heights skipped between announcements, or since the last checkpoint, are
+        filled from self.current_block. Returns when the subscription drops so the
+        caller can fall back to polling.
+        """
+        # The async fetch mode follows heads over an asyncio connection too, without a listener thread
+        subscription_class = AsyncFinalizedHeadSubscription if self.fetch_mode == 'async' else FinalizedHeadSubscription
+        subscription = subscription_class(self.endpoints, timeout=DEFAULT_CONFIG['subscription_timeout'])
+
+        try:
+            await subscription.start()
+            self.logger.info("Following finalized heads via subscription")
+
+            while True:
+                finalized_block = await subscription.next_head()
+                if finalized_block is None:
+                    break
+                self.tracer.head_seen(finalized_block)
+
+                while finalized_block >= self.current_block:
+                    previous_block = self.current_block
+                    await self.process_batch(finalized_block)
+                    if self.current_block == previous_block:
+                        # A fresh failure is retried right away, on another endpoint if the
+                        # connection failed; after that the block waits for the next announcement
+                        if self.failed_attempts == 1:
+                            continue
+                        break
+
+        except Exception as e:
+            self.logger.error(f"Error following finalized heads: {e}")
+        finally:
+            subscription.close()
+
+        self.logger.warning("Finalized head subscription ended, falling back to polling")
+
+    @staticmethod
+    def get_finalized_block(substrate: SubstrateInterface) -> int:
+        """Get the number of the current finalized block (blocking)"""
+        finalized_hash = substrate.get_chain_finalised_head()
+        return substrate.get_block_number(finalized_hash)
+
+    async def read_finalized_block(self) -> int:
+        """Get the number of the current finalized block from the best endpoint, hedging a slow read"""
+        finalized_block = await asyncio.to_thread(self.reader.read, self.get_finalized_block)
+        self.metrics.heartbeat()
+        self.tracer.head_seen(finalized_block)
+        if self.current_block is not None:
+            self.metrics.set_lag(finalized_block + 1 - self.current_block)
+        return finalized_block
+
+    def record_read_error(self, url, error):
+        """Count a failed finalized head or referendum read (called from the reader's threads)"""
+        self.metrics.record_rpc_error(url)
+        if isinstance(error, CONNECTION_ERRORS):
+            self.metrics.record_reconnect()
 
     async def monitor_blocks(self, start_block=None):
         """
-        Monitor blocks starting from a specific block with adaptive polling
+        Monitor blocks starting from a specific block.
+
+        Blocks behind the finalized head are caught up in batches. Once caught up,
+        new blocks are followed through a finalized head subscription (follow_mode
+        'subscribe'), falling back to adaptive polling if the subscription drops.
         """
         base_delay = self.retry_delay  # Initial delay
         max_delay = 300  # Maximum delay of 5 minutes
@@ -89,101 +378,97 @@ class BlockRangeGovernanceMonitor:
         last_finalized_block = None
         poll_delay = 3  # Start with 3 seconds
 
+        if start_block is not None:
+            # An explicit start block replaces the stored progress
+            self.checkpoints.reset(start_block - 1)
+
         while True:
             try:
-                with SubstrateInterface(
-                        url=self.ws_url,
-                        ws_options={'timeout': self.connection_timeout}
-                ) as substrate:
-                    if start_block is None:
-                        last_block = self.block_store.get_last_block()
-                        if last_block is not None:
-                            start_block = last_block
+                if start_block is None:
+                    last_block = self.checkpoints.get_low_watermark()
+                    if last_block is not None:
+                        start_block = last_block + 1
+                    else:
+                        # If no stored block, get current finalized block
+                        start_block = await self.read_finalized_block()
+
+                self.current_block = start_block
+                self.metrics.start()
+
+                current_delay = base_delay
+                connection_attempts = 0
+
+                monitored_list = [
+                    f"{module}.{event if event else '*'}"
+                    for module, event in self.governance_modules
+                ]
+                self.logger.info(f"Monitoring for events: {', '.join(monitored_list)}")
+                self.logger.info(f"Processing blocks from #{start_block}")
+
+                if self.display_mode:
+                    await asyncio.sleep(3)
+                    os.system('cls' if os.name == 'nt' else 'clear')
+
+                while True:
+                    try:
+                        finalized_block = await self.read_finalized_block()
+
+                        # Adaptive polling delay based on block finalization to mitigate constant requests to RPC
+                        # until the next block is available.
+                        if last_finalized_block == finalized_block:
+                            poll_delay = min(poll_delay * 5, 10)
                         else:
-                            # If no stored block, get current finalized block
-                            finalized_hash = substrate.get_chain_finalised_head()
-                            start_block = substrate.get_block_number(finalized_hash)
-
-                    self.current_block = start_block
-                    self.metrics.start()
-
-                    current_delay = base_delay
-                    connection_attempts = 0
-
-                    monitored_list = [
-                        f"{module}.{event if event else '*'}"
-                        for module, event in self.governance_modules
-                    ]
-                    logging.info(f"Monitoring for events: {', '.join(monitored_list)}")
-                    logging.info(f"Processing blocks from #{start_block}")
-
-                    if self.display_mode:
-                        await asyncio.sleep(3)
-                        os.system('cls' if os.name == 'nt' else 'clear')
-
-                    while True:
-                        try:
-                            finalized_hash = substrate.get_chain_finalised_head()
-                            finalized_block = substrate.get_block_number(finalized_hash)
-
-                            # Adaptive polling delay based on block finalization to mitigate constant requests to RPC
-                            # until the next block is available.
-                            if last_finalized_block == finalized_block:
-                                poll_delay = min(poll_delay * 5, 10)
-                            else:
-                                poll_delay = max(poll_delay * 0.5, 1)
-                                last_finalized_block = finalized_block
-
-                            if finalized_block >= self.current_block:
-                                batch_end = min(self.current_block + self.batch_size, finalized_block + 1)
-
-                                if self.display_mode:
-                                    self.display.set_batch(
-                                        f"🤖 Processing blocks #{self.current_block} to #{batch_end - 1}"
-                                    )
-                                elif self.debug:
-                                    logging.debug(f"🤖 Processing blocks #{self.current_block} to #{batch_end - 1}")
-
-                                for block_number in range(self.current_block, batch_end):
-                                    try:
-                                        block_hash = substrate.get_block_hash(block_number)
-                                        events = substrate.query(
-                                            module="System",
-                                            storage_function="Events",
-                                            block_hash=block_hash
-                                        )
-
-                                        if events:
-                                            self.process_events(block_number, events.decode())
-
-                                    except Exception as e:
-                                        logging.error(f"Error processing block {block_number}: {e}")
-                                        continue
-
-                                self.current_block = batch_end
-                                # Store the last processed block
-                                self.block_store.save_last_block(self.current_block - 1)
-
-                            logging.debug(f"Current poll delay: {poll_delay:.1f}s")
-                            await asyncio.sleep(poll_delay)
-
-                        except Exception as e:
-                            logging.error(f"Error in block processing loop: {e}")
+                            poll_delay = max(poll_delay * 0.5, 1)
+                            last_finalized_block = finalized_block
+
+                        if finalized_block >= self.current_block:
+                            await self.process_batch(finalized_block)
+                            if self.failed_attempts == 1:
+                                # Retry a fresh failure right away, on another endpoint if the connection failed
+                                continue
+                        elif self.follow_mode == 'subscribe' and time.time() >= self.subscription_retry_at:
+                            # Caught up with the chain, switch to push-driven tip following
+                            await self.follow_finalized_heads()
+                            self.subscription_retry_at = time.time() + DEFAULT_CONFIG['subscription_retry_delay']
+                            continue
+
+                        self.logger.debug(f"Current poll delay: {poll_delay:.1f}s")
+                        await asyncio.sleep(poll_delay)
+
+                    except Exception as e:
+                        self.logger.error(f"Error in block processing loop: {e}")
+                        start_block = self.current_block  # Resume from the cursor after reconnecting
+                        if not (isinstance(e, CONNECTION_ERRORS) and self.endpoints.healthy_count()):
+                            # Fail over to another healthy endpoint immediately, otherwise wait
                             await asyncio.sleep(base_delay)
-                            break
+                        break
 
             except Exception as e:
                 connection_attempts += 1
-                logging.error(f"Error in block processing loop: {e}")
+                self.logger.error(f"Error in block processing loop: {e}")
                 start_block = self.current_block  # Preserve current block for reconnection
 
                 # Calculate exponential backoff with maximum limit
                 current_delay = min(base_delay * (2 ** (connection_attempts - 1)), max_delay)
-                logging.error(f"Retrying connection in {current_delay} seconds...")
+                self.logger.error(f"Retrying connection in {current_delay} seconds...")
 
                 await asyncio.sleep(current_delay)
                 continue
             except KeyboardInterrupt:
-                if self.display_mode:
-                    self.display.cleanup()
+                self.close()
                 break
+
+    def close(self):
+        """Release the fetcher connections and restore the terminal"""
+        if self.display_mode:
+            self.display.cleanup()
+        if self.alert_queue is not None:
+            self.alert_queue.close()
+        if self.notification_connection is not None:
+            self.notification_connection.close()
+        self.fetcher.close()
+        self.reader.close()
+        if self.publisher is not None:
+            self.publisher.flush()
+        self.checkpoints.close()
+        self.archive.close()
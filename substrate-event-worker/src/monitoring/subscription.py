@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from ..utils import AsyncRpcClient, CachedSubstrateInterface, CONNECTION_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+class FinalizedHeadSubscription:
+    """
+    Follow finalized heads with chain_subscribeFinalizedHeads on a dedicated connection.
+
+    The connection is opened and the blocking subscription run in a daemon thread
+    of its own, not in the event loop's default executor, so one subscription per
+    network never exhausts the pool shared by the other blocking calls. The number
+    of every announced block is pushed onto an asyncio queue. Headers are read
+    straight from the JSON-RPC notifications, so no runtime or metadata is loaded
+    for them.
+    """
+
+    def __init__(self, endpoints, timeout=60):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.substrate = None
+        self.url = None
+        self.queue = None
+        self._stopped = False
+        self._thread = None
+
+    async def start(self) -> None:
+        """Open the subscription connection and start listening in the background"""
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        connected = loop.create_future()
+        self._thread = threading.Thread(
+            target=self._run, args=(loop, connected), name='finalized-heads', daemon=True
+        )
+        self._thread.start()
+        await connected
+
+    def _run(self, loop, connected) -> None:
+        """Connect, then listen until the subscription drops or is closed (runs in the subscription thread)"""
+
+        def resolve(error=None):
+            if connected.done():
+                return
+            if error is None:
+                connected.set_result(None)
+            else:
+                connected.set_exception(error)
+
+        try:
+            self.url, self.substrate = self.endpoints.connect(
+                lambda url: CachedSubstrateInterface(url=url, ws_options={'timeout': self.timeout})
+            )
+        except Exception as e:
+            loop.call_soon_threadsafe(resolve, e)
+            return
+
+        if self._stopped:
+            # Closed while connecting
+            self.close()
+            return
+        loop.call_soon_threadsafe(resolve)
+        self._listen(loop)
+
+    def _listen(self, loop) -> None:
+        """Run the subscription until it drops or is closed (runs in the subscription thread)"""
+
+        def result_handler(message, update_nr, subscription_id):
+            header = message['params']['result']
+            loop.call_soon_threadsafe(self.queue.put_nowait, int(header['number'], 16))
+            if self._stopped:
+                return True
+
+        try:
+            self.substrate.rpc_request('chain_subscribeFinalizedHeads', [], result_handler=result_handler)
+        except Exception as e:
+            if not self._stopped:
+                logger.warning(f"Finalized head subscription dropped: {e}")
+                if isinstance(e, CONNECTION_ERRORS):
+                    self.endpoints.report_failure(self.url)
+        finally:
+            # Wake up the consumer so it can fall back to polling
+            loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def next_head(self) -> Optional[int]:
+        """Wait for the next finalized block number, or None once the subscription dropped"""
+        return await self.queue.get()
+
+    def close(self) -> None:
+        """Stop the subscription and close its connection"""
+        self._stopped = True
+        if self.substrate is not None:
+            try:
+                self.substrate.close()
+            except Exception:
+                pass
+
+
+class AsyncFinalizedHeadSubscription:
+    """
+    Follow finalized heads with chain_subscribeFinalizedHeads over an AsyncRpcClient.
+
+    Same interface as FinalizedHeadSubscription, without a background thread:
+    notifications are read by the client on the event loop. The subscription
+    counts as dropped when the connection is lost or no head arrives within
+    `timeout` seconds.
+    """
+
+    def __init__(self, endpoints, timeout=60):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.client = None
+        self.url = None
+        self.subscription = None
+        self._stopped = False
+
+    async def start(self) -> None:
+        """Open the subscription connection and subscribe"""
+        self.url, self.client = await self.endpoints.connect_async(
+            lambda url: AsyncRpcClient(url, timeout=self.timeout).connect()
+        )
+        self.subscription = await self.client.subscribe('chain_subscribeFinalizedHeads')
+
+    async def next_head(self) -> Optional[int]:
+        """Wait for the next finalized block number, or None once the subscription dropped"""
+        try:
+            header = await asyncio.wait_for(self.subscription.next(), self.timeout)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            if not self._stopped:
+                logger.warning(f"Finalized head subscription dropped: {e or 'no head within the timeout'}")
+                self.endpoints.report_failure(self.url)
+            return None
+        return int(header['number'], 16)
+
+    def close(self) -> None:
+        """Stop the subscription and close its connection"""
+        self._stopped = True
+        if self.client is not None:
+            self.client.close()
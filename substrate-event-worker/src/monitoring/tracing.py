@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Alert latency buckets in seconds, from a block or two after finalization to a long outage
+ALERT_LATENCY_BUCKETS = (6, 12, 18, 24, 30, 45, 60, 90, 120, 300, 600, 1800, 3600)
+
+
+class AlertTrace:
+    """
+    Timestamps of one alert on its way from the chain to its notification.
+
+    Marks are points in time (unix seconds): 'seen' when the monitor learned that
+    the block was finalized, 'fetched' when its events were fetched and decoded,
+    'matched', 'dequeued' when a notifier task took it from the alert queue,
+    'notified' and, for webhooks, 'delivered'. Spans time work done for
+    the alert, such as the preimage lookup and the webhook POSTs.
+    """
+
+    def __init__(self, network_name: str, block_number: int, module_id: str, event_id: str, rule: str):
+        self.network_name = network_name
+        self.block_number = block_number
+        self.module_id = module_id
+        self.event_id = event_id
+        self.rule = rule
+        self.block_timestamp: Optional[float] = None
+        self.marks: Dict[str, float] = {}
+        self.spans: Dict[str, Tuple[float, float]] = {}
+
+    def mark(self, stage: str, at: Optional[float] = None) -> None:
+        """Record the time a stage was reached, now by default"""
+        self.marks[stage] = at if at is not None else time.time()
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block as a span of this alert"""
+        started = time.time()
+        try:
+            yield self
+        finally:
+            self.spans[stage] = (started, time.time())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Structured record of the trace, stage latencies relative to the block timestamp"""
+        record = {
+            'network': self.network_name,
+            'block_number': self.block_number,
+            'event': f"{self.module_id}.{self.event_id}",
+            'rule': self.rule,
+            'block_timestamp': self.block_timestamp,
+            'marks': self.marks,
+            'spans': {stage: {'start': start, 'duration': end - start} for stage, (start, end) in self.spans.items()}
+        }
+        if self.block_timestamp is not None:
+            record['latency'] = {stage: at - self.block_timestamp for stage, at in self.marks.items()}
+        return record
+
+
+class AlertTracer:
+    """
+    Trace every alert of one network from block production to notification.
+
+    The on-chain Timestamp.Now of an alert's block is read when the alert is
+    finished, in the background and only for blocks with alerts. Finished traces
+    are appended to src/storage/data/traces/alerts.jsonl and each mark is
+    observed in the substrate_worker_alert_latency_seconds histogram, labelled by
+    stage. Alerts for blocks older than max_age when notified come from a
+    catch-up; they are written with 'catch_up' set and left out of the
+    histogram so it keeps tracking the live alert latency.
+    """
+
+    def __init__(self, network_name: str, metrics, reader=None, max_age: float = 3600,
+                 trace_path: Optional[Path] = None):
+        self.network_name = network_name
+        self.reader = reader
+        self.max_age = max_age
+        self.trace_path = Path(trace_path) if trace_path else self._ensure_storage_dir() / "alerts.jsonl"
+        self.latency = metrics.registry.histogram(
+            'substrate_worker_alert_latency_seconds',
+            'Time from the block timestamp of an alert to each stage of its notification',
+            ('network', 'stage'),
+            buckets=ALERT_LATENCY_BUCKETS
+        )
+
+        # Finalized heads in the order they were first seen, as parallel lists of numbers and times
+        self._head_numbers: List[int] = []
+        self._head_times: List[float] = []
+        self._timestamps: OrderedDict = OrderedDict()
+        self._pending = set()
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent.parent / "storage" / "data" / "traces"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def head_seen(self, block_number: int) -> None:
+        """Record the time a finalized head was first seen"""
+        if not self._head_numbers or block_number > self._head_numbers[-1]:
+            self._head_numbers.append(block_number)
+            self._head_times.append(time.time())
+
+    def seen_at(self, block_number: int) -> Optional[float]:
+        """Time the first finalized head at or above a block was seen, forgetting older heads"""
+        index = bisect.bisect_left(self._head_numbers, block_number)
+        # Blocks are processed in order, heads below this block are never needed again
+        del self._head_numbers[:index], self._head_times[:index]
+        return self._head_times[0] if self._head_times else None
+
+    def begin(self, block_number: int, event: Dict[str, Any], rule: str, fetched_at: float) -> AlertTrace:
+        """Start the trace of an alert that was just matched"""
+        trace = AlertTrace(self.network_name, block_number, event['module_id'], event['event_id'], rule)
+        seen_at = self.seen_at(block_number)
+        if seen_at is not None:
+            trace.mark('seen', min(seen_at, fetched_at))
+        trace.mark('fetched', fetched_at)
+        trace.mark('matched')
+        return trace
+
+    def finish(self, trace: AlertTrace) -> None:
+        """Mark an alert notified and export its trace once the block timestamp is known"""
+        trace.mark('notified')
+        task = asyncio.ensure_future(self._export(trace))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _block_timestamp(self, substrate, block_number: int) -> float:
+        """Read Timestamp.Now of a block in seconds (blocking)"""
+        block_hash = substrate.get_block_hash(block_number)
+        return substrate.query('Timestamp', 'Now', block_hash=block_hash).value / 1000
+
+    async def _export(self, trace: AlertTrace) -> None:
+        try:
+            if self.reader is not None:
+                timestamp = self._timestamps.get(trace.block_number)
+                if timestamp is None:
+                    timestamp = await asyncio.to_thread(
+                        self.reader.read, lambda substrate: self._block_timestamp(substrate, trace.block_number)
+                    )
+                    self._timestamps[trace.block_number] = timestamp
+                    while len(self._timestamps) > 100:
+                        self._timestamps.popitem(last=False)
+                trace.block_timestamp = timestamp
+        except Exception as e:
+            logger.debug(f"No timestamp for block {trace.block_number}: {e}")
+
+        record = trace.to_dict()
+        latency = record.get('latency', {})
+        record['catch_up'] = latency.get('notified', 0) > self.max_age
+        if latency and not record['catch_up']:
+            for stage, seconds in latency.items():
+                self.latency.observe(seconds, network=self.network_name, stage=stage)
+
+        try:
+            with open(self.trace_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except Exception as e:
+            logger.error(f"Failed to write alert trace: {e}")
+
+    async def flush(self) -> None:
+        """Wait for traces still being exported"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
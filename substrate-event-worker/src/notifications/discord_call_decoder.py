@@ -6,13 +6,17 @@ from datetime import datetime, timezone
 logger = logging.getLogger(__name__)
 
 class MaterializedChainState:
-    def __init__(self, substrate):
+    def __init__(self, substrate=None, reader=None):
             self.substrate = substrate
+            self.reader = reader
 
     def ref_caller(self, index: int, gov1: bool, call_data: bool):
         """
         Retrieves and decodes the referendum call data based on given parameters.
 
+        With a HedgedReader the lookup runs on the best endpoint and is hedged on a
+        second one when it is slow; otherwise it runs on the given substrate instance.
+
         Args:
             index (int): The index of the referendum to query.
             gov1 (bool): Determines which module to query ('Democracy' if True, 'Referenda' if False).
@@ -24,10 +28,17 @@ class MaterializedChainState:
         Raises:
             Exception: If an error occurs during the retrieval or decoding process.
         """
+        if self.reader is not None:
+            return self.reader.read(lambda substrate: self._ref_caller(substrate, index, gov1, call_data))
+        return self._ref_caller(self.substrate, index, gov1, call_data)
+
+    @staticmethod
+    def _ref_caller(substrate, index: int, gov1: bool, call_data: bool):
+        """Look up and decode a referendum call on one connection (see ref_caller)"""
         try:
-            referendum = self.substrate.query(module="Democracy" if gov1 else "Referenda",
-                                              storage_function="ReferendumInfoOf" if gov1 else "ReferendumInfoFor",
-                                              params=[index]).serialize()
+            referendum = substrate.query(module="Democracy" if gov1 else "Referenda",
+                                         storage_function="ReferendumInfoOf" if gov1 else "ReferendumInfoFor",
+                                         params=[index]).serialize()
 
             if referendum is None or 'Ongoing' not in referendum:
                 return False, f":warning: Referendum **#{index}** is inactive"
@@ -37,7 +48,7 @@ class MaterializedChainState:
             if 'Inline' in preimage:
                 call = preimage['Inline']
                 if not call_data:
-                    call_obj = self.substrate.create_scale_object('Call')
+                    call_obj = substrate.create_scale_object('Call')
                     decoded_call = call_obj.decode(ScaleBytes(call))
                     return decoded_call, preimage
                 else:
@@ -46,8 +57,8 @@ class MaterializedChainState:
             if 'Lookup' in preimage:
                 preimage_hash = preimage['Lookup']['hash']
                 preimage_length = preimage['Lookup']['len']
-                call = self.substrate.query(module='Preimage', storage_function='PreimageFor',
-                                            params=[(preimage_hash, preimage_length)]).value
+                call = substrate.query(module='Preimage', storage_function='PreimageFor',
+                                       params=[(preimage_hash, preimage_length)]).value
 
                 if call is None:
                     return False, ":warning: Preimage not found on chain"
@@ -56,7 +67,7 @@ class MaterializedChainState:
                     call = f"0x{''.join(f'{ord(c):02x}' for c in call)}"
 
                 if not call_data:
-                    call_obj = self.substrate.create_scale_object('Call')
+                    call_obj = substrate.create_scale_object('Call')
                     decoded_call = call_obj.decode(ScaleBytes(call))
                     return decoded_call, preimage_hash
                 else:
@@ -3,6 +3,7 @@ import aiohttp
 import json
 import os
 import logging
+from contextlib import nullcontext
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
@@ -19,7 +20,8 @@ class WebhookNotifier:
             token=os.getenv('KV_REST_API_TOKEN')
         )
 
-    async def discord_governance_alert(self, chain: str, event_data: Dict[str, Any], proposal_index: int, substrate=None) -> None:
+    async def discord_governance_alert(self, chain: str, event_data: Dict[str, Any], proposal_index: int, substrate=None,
+                                       reader=None, trace=None) -> None:
         """
         Notify all webhooks registered for a specific chain about an event
 
@@ -28,6 +30,8 @@ class WebhookNotifier:
             event_data: Event details including module_id, event_id, and attributes
             proposal_index: Block number where event was found
             substrate: Substrate instance
+            reader: Optional HedgedReader for the referendum lookup, hedging slow reads on a second endpoint
+            trace: Optional AlertTrace receiving the preimage lookup and webhook delivery timings
         """
 
         # Get all webhook IDs for this chain
@@ -38,10 +42,11 @@ class WebhookNotifier:
             logger.debug(f"No webhooks found for chain: {chain}")
             return
 
-        chainstate = MaterializedChainState(substrate) if substrate else MaterializedChainState()
+        chainstate = MaterializedChainState(substrate, reader=reader)
 
         # Get and process call data
-        data, preimagehash = chainstate.ref_caller(index=proposal_index, gov1=False, call_data=False)
+        with trace.span('preimage_lookup') if trace else nullcontext():
+            data, preimagehash = chainstate.ref_caller(index=proposal_index, gov1=False, call_data=False)
 
         # Process call data if available
         embedded_call_data = None
@@ -119,7 +124,7 @@ class WebhookNotifier:
             message["embeds"].append(embedded_call_data)
 
         # Send to all registered webhooks
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession() as session, trace.span('webhook_post') if trace else nullcontext():
             for webhook_id in webhook_ids:
                 webhook_key = f"webhook:{webhook_id}"
                 webhook_data = self.redis.get(webhook_key)
@@ -144,6 +149,8 @@ class WebhookNotifier:
                             logger.error(f"Failed to send to webhook {webhook_id}: {response.status}")
                         else:
                             logger.debug(f"Successfully notified webhook {webhook_id} for {chain}")
+                            if trace and 'delivered' not in trace.marks:
+                                trace.mark('delivered')
 
                 except Exception as e:
                     logger.error(f"Error processing webhook {webhook_id}: {e}")
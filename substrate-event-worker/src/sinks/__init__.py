@@ -0,0 +1,17 @@
+from .base import EventSink, event_record, serialize_record
+from .jsonl import JsonlSink
+from .redis_stream import RedisStreamSink
+from .stdout import StdoutSink
+from .publisher import EventPublisher, create_sinks, SINK_TYPES
+
+__all__ = [
+    'EventSink',
+    'event_record',
+    'serialize_record',
+    'JsonlSink',
+    'RedisStreamSink',
+    'StdoutSink',
+    'EventPublisher',
+    'create_sinks',
+    'SINK_TYPES'
+]
@@ -0,0 +1,54 @@
+import json
+from typing import Any, Dict, List
+from ..storage import extract_referendum_index
+
+
+def event_record(network_name: str, block_number: int, event: Dict[str, Any], rule: str) -> Dict[str, Any]:
+    """
+    Build the structured record of a matched event published to the sinks
+
+    Fields are named after the columns of the event archive, so sink
+    consumers and `main.py query --json` see the same fields, plus the rule
+    that matched.
+    """
+    attributes = event.get('attributes')
+    return {
+        'network': network_name,
+        'block_number': block_number,
+        'event_idx': event.get('event_idx', 0),
+        'module_id': event['module_id'],
+        'event_id': event['event_id'],
+        'rule': rule,
+        'referendum_index': extract_referendum_index(event['module_id'], attributes),
+        'attributes': attributes
+    }
+
+
+def serialize_record(record: Dict[str, Any]) -> str:
+    """Serialize a record as one compact JSON line, newline included"""
+    return json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str) + '\n'
+
+
+class EventSink:
+    """
+    Destination for matched event records.
+
+    Records arrive already serialized, in batches of one network's events in
+    block order, so a sink does one write per batch. Writes are blocking.
+    """
+
+    name = 'sink'
+
+    def write(self, network_name: str, lines: List[str]) -> None:
+        """
+        Write a batch of records
+
+        Args:
+            network_name (str): Network all records of the batch belong to
+            lines (List[str]): JSON lines from serialize_record, newline included
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush and release the sink"""
+        pass
@@ -0,0 +1,58 @@
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+from .base import EventSink
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlSink(EventSink):
+    """
+    Append records to a JSON lines file, rotated by size.
+
+    Once `max_bytes` would be exceeded, events.jsonl becomes events.jsonl.1,
+    the previous .1 becomes .2 and so on, keeping `backups` rotated files. A
+    batch is never split across files.
+    """
+
+    name = 'jsonl'
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 64 * 1024 * 1024, backups: int = 5):
+        self.path = Path(path) if path else self._ensure_storage_dir() / "events.jsonl"
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent.parent / "storage" / "data" / "events"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def _backup_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def _rotate(self) -> None:
+        """Shift the rotated files by one and start a new file"""
+        self.file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                if self._backup_path(index).exists():
+                    os.replace(self._backup_path(index), self._backup_path(index + 1))
+            os.replace(self.path, self._backup_path(1))
+        else:
+            self.path.unlink()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        logger.debug(f"Rotated {self.path}")
+
+    def write(self, network_name: str, lines: List[str]) -> None:
+        data = ''.join(lines)
+        size = self.file.tell()
+        if self.max_bytes and size > 0 and size + len(data) > self.max_bytes:
+            self._rotate()
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
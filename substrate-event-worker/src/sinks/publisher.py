@@ -0,0 +1,90 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from .base import EventSink, event_record, serialize_record
+from .jsonl import JsonlSink
+from .redis_stream import RedisStreamSink
+from .stdout import StdoutSink
+from ..config.settings import DEFAULT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SINK_TYPES = ('jsonl', 'redis', 'stdout')
+
+
+def create_sinks(names: List[str], redis_url: Optional[str] = None) -> List[EventSink]:
+    """
+    Create event sinks by name, configured from DEFAULT_CONFIG
+
+    Args:
+        names (List[str]): Sink types from SINK_TYPES
+        redis_url (str, optional): Redis server of the redis sink. Defaults to DEFAULT_CONFIG['redis_url']
+
+    Returns:
+        List[EventSink]: The sinks, in the given order
+    """
+    sinks = []
+    for name in dict.fromkeys(names):
+        if name == 'jsonl':
+            sinks.append(JsonlSink(
+                max_bytes=DEFAULT_CONFIG['sink_jsonl_max_bytes'],
+                backups=DEFAULT_CONFIG['sink_jsonl_backups']
+            ))
+        elif name == 'redis':
+            sinks.append(RedisStreamSink(
+                url=redis_url or DEFAULT_CONFIG['redis_url'],
+                key=DEFAULT_CONFIG['redis_stream_key'],
+                maxlen=DEFAULT_CONFIG['redis_stream_maxlen'],
+                groups=DEFAULT_CONFIG['redis_consumer_groups']
+            ))
+        elif name == 'stdout':
+            sinks.append(StdoutSink())
+        else:
+            raise ValueError(f"Unknown sink: {name}")
+    return sinks
+
+
+class EventPublisher:
+    """
+    Batch one network's matched events and write them to every sink.
+
+    Records are serialized once when added and written when `batch_size`
+    records are buffered or flush() is called: after each processed block
+    range and before each checkpoint commit, so a block is never recorded as
+    processed before its events were published. A sink that fails loses the
+    batch; the error is logged and counted, and the other sinks still get it.
+    """
+
+    def __init__(self, sinks: List[EventSink], network_name: str, metrics, batch_size: int = 500):
+        self.sinks = sinks
+        self.network_name = network_name
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.lines: List[str] = []
+
+        self.records = metrics.registry.counter(
+            'substrate_worker_sink_records_total', 'Event records written per sink', ('network', 'sink'))
+        self.errors = metrics.registry.counter(
+            'substrate_worker_sink_errors_total', 'Failed batch writes per sink', ('network', 'sink'))
+
+    def add(self, block_number: int, event: Dict[str, Any], rule: str) -> None:
+        """Buffer the record of a matched event, writing the batch once it is full"""
+        self.lines.append(serialize_record(event_record(self.network_name, block_number, event, rule)))
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records to every sink (blocking)"""
+        if not self.lines:
+            return
+        lines, self.lines = self.lines, []
+
+        started = time.monotonic()
+        for sink in self.sinks:
+            try:
+                sink.write(self.network_name, lines)
+                self.records.inc(len(lines), network=self.network_name, sink=sink.name)
+            except Exception as e:
+                self.errors.inc(network=self.network_name, sink=sink.name)
+                logger.error(f"[{self.network_name}] Failed to write {len(lines)} events to the {sink.name} sink: {e}")
+        self.metrics.observe_stage('publish', time.monotonic() - started)
@@ -0,0 +1,61 @@
+import logging
+from typing import List, Sequence
+from .base import EventSink
+
+logger = logging.getLogger(__name__)
+
+
+class RedisStreamSink(EventSink):
+    """
+    Add records to one Redis Stream per network.
+
+    Each record becomes a stream entry with its JSON in the 'event' field,
+    added through one pipelined round trip per batch. Streams are trimmed to
+    about `maxlen` entries. The consumer groups in `groups` are created on
+    first use from the start of the stream, so consumers such as a Discord
+    notifier can start later, scale out with XREADGROUP and acknowledge
+    entries independently of each other.
+
+    Needs the optional `redis` package.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', key: str = 'substrate:events:{network}',
+                 maxlen: int = 100000, groups: Sequence[str] = ()):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis sink needs the redis package: pip install redis")
+
+        self.client = redis.Redis.from_url(url)
+        self.response_error = redis.ResponseError
+        self.url = url
+        self.key = key
+        self.maxlen = maxlen
+        self.groups = list(groups)
+        self._streams = set()
+
+    def _ensure_groups(self, stream: str) -> None:
+        """Create the consumer groups of a stream, and the stream itself, if they do not exist yet"""
+        for group in self.groups:
+            try:
+                self.client.xgroup_create(stream, group, id='0', mkstream=True)
+                logger.info(f"Created consumer group {group} on {stream}")
+            except self.response_error as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+        self._streams.add(stream)
+
+    def write(self, network_name: str, lines: List[str]) -> None:
+        stream = self.key.format(network=network_name)
+        if stream not in self._streams:
+            self._ensure_groups(stream)
+
+        pipeline = self.client.pipeline(transaction=False)
+        for line in lines:
+            pipeline.xadd(stream, {'event': line.rstrip('\n')}, maxlen=self.maxlen or None, approximate=True)
+        pipeline.execute()
+
+    def close(self) -> None:
+        self.client.close()
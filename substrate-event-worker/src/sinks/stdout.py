@@ -0,0 +1,16 @@
+import sys
+from typing import List, TextIO
+from .base import EventSink
+
+
+class StdoutSink(EventSink):
+    """Write records to standard output for piping, e.g. into jq"""
+
+    name = 'stdout'
+
+    def __init__(self, stream: TextIO = None):
+        self.stream = stream or sys.stdout
+
+    def write(self, network_name: str, lines: List[str]) -> None:
+        self.stream.write(''.join(lines))
+        self.stream.flush()
@@ -1,3 +1,6 @@
 from .block_store import BlockStore
+from .checkpoint_store import CheckpointStore
+from .event_archive import EventArchive, extract_referendum_index
+from .metadata_cache import MetadataCache
 
-__all__ = ['BlockStore']
\ No newline at end of file
+__all__ = ['BlockStore', 'CheckpointStore', 'EventArchive', 'extract_referendum_index', 'MetadataCache']
@@ -0,0 +1,193 @@
+import bisect
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from .block_store import BlockStore
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Durable record of the blocks processed for a network.
+
+    Completed blocks are kept as a set of [start, end) intervals above a low
+    watermark, the highest block below which every block is done. Blocks may
+    complete out of order; the watermark only advances once the gap below an
+    interval is filled. State lives in memory and is committed to SQLite (WAL
+    mode) every `commit_interval` seconds or `commit_blocks` blocks, whichever
+    comes first, so a crash redoes at most that much work. `before_commit` is
+    called before each commit, e.g. to flush output of the blocks being recorded.
+    """
+
+    def __init__(self, network_name: str, commit_interval: float = 5, commit_blocks: int = 100,
+                 db_path: Optional[Path] = None, before_commit: Optional[Callable[[], None]] = None):
+        self.network_name = network_name
+        self.before_commit = before_commit
+        self.commit_interval = commit_interval
+        self.commit_blocks = commit_blocks
+        self.db_path = Path(db_path) if db_path else self._ensure_storage_dir() / "checkpoints.db"
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                network TEXT PRIMARY KEY,
+                low_watermark INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS completed_ranges (
+                network TEXT NOT NULL,
+                start_block INTEGER NOT NULL,
+                end_block INTEGER NOT NULL,
+                PRIMARY KEY (network, start_block)
+            );
+        """)
+
+        self.low_watermark: Optional[int] = None
+        self.intervals: List[List[int]] = []
+        self._pending_blocks = 0
+        self._last_commit = time.monotonic()
+
+        self._load()
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent / "data"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def _load(self) -> None:
+        """Load the committed state, migrating a legacy .lastblock file on first use"""
+        row = self.conn.execute(
+            "SELECT low_watermark FROM watermarks WHERE network = ?", (self.network_name,)
+        ).fetchone()
+
+        if row is None:
+            last_block = BlockStore(self.network_name).get_last_block()
+            if last_block is not None:
+                logger.info(f"Migrating last block {last_block} of {self.network_name} to the checkpoint store")
+                self.low_watermark = last_block
+                self.flush()
+            return
+
+        self.low_watermark = row[0]
+        self.intervals = [
+            [start, end] for start, end in self.conn.execute(
+                "SELECT start_block, end_block FROM completed_ranges WHERE network = ? ORDER BY start_block",
+                (self.network_name,)
+            )
+        ]
+
+    def get_low_watermark(self) -> Optional[int]:
+        """Get the highest block number below which every block has been processed"""
+        return self.low_watermark
+
+    def completed_ranges(self) -> List[Tuple[int, int]]:
+        """Get the completed [start, end) intervals above the low watermark"""
+        return [(start, end) for start, end in self.intervals]
+
+    def is_completed(self, block_number: int) -> bool:
+        """Check whether a block has been processed"""
+        if self.low_watermark is not None and block_number <= self.low_watermark:
+            return True
+        index = bisect.bisect_right(self.intervals, [block_number, float('inf')]) - 1
+        return index >= 0 and self.intervals[index][1] > block_number
+
+    def covered_until(self, block_number: int) -> int:
+        """Get the first unprocessed block at or after block_number"""
+        if self.low_watermark is not None and block_number <= self.low_watermark:
+            block_number = self.low_watermark + 1
+        index = bisect.bisect_right(self.intervals, [block_number, float('inf')]) - 1
+        if index >= 0 and self.intervals[index][1] > block_number:
+            return self.intervals[index][1]
+        return block_number
+
+    def missing_ranges(self, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        """Get the unprocessed [start, end) gaps within blocks [start_block, end_block)"""
+        missing = []
+        block_number = self.covered_until(start_block)
+        for interval_start, interval_end in self.intervals:
+            if block_number >= end_block:
+                break
+            if interval_end <= block_number:
+                continue
+            if interval_start > block_number:
+                missing.append((block_number, min(interval_start, end_block)))
+            block_number = interval_end
+        if block_number < end_block:
+            missing.append((block_number, end_block))
+        return missing
+
+    def reset(self, low_watermark: int) -> None:
+        """Restart tracking from a new low watermark, forgetting completed intervals"""
+        self.low_watermark = low_watermark
+        self.intervals = []
+        self.flush()
+
+    def mark_completed(self, start_block: int, end_block: Optional[int] = None) -> None:
+        """
+        Record blocks [start_block, end_block) as processed
+
+        Args:
+            start_block (int): First completed block
+            end_block (int, optional): Block after the last completed block. Defaults to start_block + 1
+        """
+        if end_block is None:
+            end_block = start_block + 1
+        if self.low_watermark is None:
+            self.low_watermark = start_block - 1
+
+        start_block = max(start_block, self.low_watermark + 1)
+        if start_block >= end_block:
+            return
+
+        # Insert and merge with overlapping or adjacent intervals
+        index = bisect.bisect_left(self.intervals, [start_block, end_block])
+        if index > 0 and self.intervals[index - 1][1] >= start_block:
+            index -= 1
+            start_block = self.intervals[index][0]
+        merge_end = index
+        while merge_end < len(self.intervals) and self.intervals[merge_end][0] <= end_block:
+            end_block = max(end_block, self.intervals[merge_end][1])
+            merge_end += 1
+        self.intervals[index:merge_end] = [[start_block, end_block]]
+
+        # Advance the watermark over the interval that now touches it
+        if self.intervals[0][0] <= self.low_watermark + 1:
+            self.low_watermark = self.intervals.pop(0)[1] - 1
+
+        self._pending_blocks += end_block - start_block
+        if (self._pending_blocks >= self.commit_blocks or
+                time.monotonic() - self._last_commit >= self.commit_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit the in-memory state in a single transaction"""
+        if self.low_watermark is None:
+            return
+        if self.before_commit is not None:
+            self.before_commit()
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (network, low_watermark) VALUES (?, ?)",
+                    (self.network_name, self.low_watermark)
+                )
+                self.conn.execute("DELETE FROM completed_ranges WHERE network = ?", (self.network_name,))
+                self.conn.executemany(
+                    "INSERT INTO completed_ranges (network, start_block, end_block) VALUES (?, ?, ?)",
+                    [(self.network_name, start, end) for start, end in self.intervals]
+                )
+            self._pending_blocks = 0
+            self._last_commit = time.monotonic()
+            logger.debug(f"Saved checkpoint {self.low_watermark} for {self.network_name}")
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint: {e}")
+
+    def close(self) -> None:
+        """Commit pending progress and close the database"""
+        self.flush()
+        self.conn.close()
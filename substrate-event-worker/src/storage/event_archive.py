@@ -0,0 +1,163 @@
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Attribute names holding the referendum (poll) index in governance pallet events
+REFERENDUM_INDEX_KEYS = ('index', 'ref_index', 'poll_index', 'referendum_index')
+
+
+def extract_referendum_index(module_id: str, attributes: Any) -> Optional[int]:
+    """
+    Get the referendum index of an event from a referenda or democracy pallet
+
+    Args:
+        module_id (str): Pallet name, e.g. 'Referenda' or 'FellowshipReferenda'
+        attributes (Any): Decoded event attributes
+
+    Returns:
+        Optional[int]: Referendum index, or None for other events
+    """
+    module_id = module_id.lower()
+    if not (module_id.endswith('referenda') or module_id == 'democracy'):
+        return None
+
+    value = None
+    if isinstance(attributes, dict):
+        value = next((attributes[key] for key in REFERENDUM_INDEX_KEYS if key in attributes), None)
+    elif isinstance(attributes, (list, tuple)) and attributes:
+        value = attributes[0]
+
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+class EventArchive:
+    """
+    Local indexed archive of matched events.
+
+    Every matched event is stored once per (network, block, event index), so
+    reprocessing a block after a crash or retry does not duplicate it. Inserts
+    are committed immediately: matched events are rare, and an archived event
+    must never be newer than the checkpoint that lets its block be skipped.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else self._ensure_storage_dir() / "events.db"
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                network TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                event_idx INTEGER NOT NULL,
+                module_id TEXT NOT NULL COLLATE NOCASE,
+                event_id TEXT NOT NULL COLLATE NOCASE,
+                referendum_index INTEGER,
+                attributes TEXT,
+                PRIMARY KEY (network, block_number, event_idx)
+            );
+            CREATE INDEX IF NOT EXISTS events_by_module_event
+                ON events (network, module_id, event_id, block_number);
+            CREATE INDEX IF NOT EXISTS events_by_referendum
+                ON events (network, referendum_index, block_number)
+                WHERE referendum_index IS NOT NULL;
+        """)
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent / "data"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def add_event(self, network_name: str, block_number: int, event: Dict[str, Any]) -> None:
+        """Archive one matched event record"""
+        attributes = event.get('attributes')
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO events "
+                    "(network, block_number, event_idx, module_id, event_id, referendum_index, attributes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        network_name,
+                        block_number,
+                        event.get('event_idx', 0),
+                        event['module_id'],
+                        event['event_id'],
+                        extract_referendum_index(event['module_id'], attributes),
+                        json.dumps(attributes, default=str)
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Failed to archive event {event['module_id']}.{event['event_id']} "
+                         f"in block #{block_number}: {e}")
+
+    def query(self, networks: Optional[List[str]] = None, module: Optional[str] = None,
+              event: Optional[str] = None, referendum_index: Optional[int] = None,
+              from_block: Optional[int] = None, to_block: Optional[int] = None,
+              limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """
+        Look up archived events, newest first
+
+        Args:
+            networks (List[str], optional): Only these networks
+            module (str, optional): Pallet name, case-insensitive
+            event (str, optional): Event name, case-insensitive
+            referendum_index (int, optional): Only events of this referendum
+            from_block (int, optional): First block, inclusive
+            to_block (int, optional): Last block, inclusive
+            limit (int, optional): Maximum number of events, None for all
+
+        Returns:
+            List[Dict[str, Any]]: Matching events with decoded attributes
+        """
+        clauses, params = [], []
+        if networks:
+            clauses.append(f"network IN ({', '.join('?' for _ in networks)})")
+            params.extend(networks)
+        if module:
+            clauses.append("module_id = ?")
+            params.append(module)
+        if event:
+            clauses.append("event_id = ?")
+            params.append(event)
+        if referendum_index is not None:
+            clauses.append("referendum_index = ?")
+            params.append(referendum_index)
+        if from_block is not None:
+            clauses.append("block_number >= ?")
+            params.append(from_block)
+        if to_block is not None:
+            clauses.append("block_number <= ?")
+            params.append(to_block)
+
+        sql = "SELECT * FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY block_number DESC, event_idx DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = []
+        for row in self.conn.execute(sql, params):
+            record = dict(row)
+            record['attributes'] = json.loads(record['attributes']) if record['attributes'] else None
+            rows.append(record)
+        return rows
+
+    def close(self) -> None:
+        """Close the database"""
+        self.conn.close()
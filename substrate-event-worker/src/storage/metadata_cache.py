@@ -0,0 +1,53 @@
+import os
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """
+    Raw runtime metadata on disk, keyed by genesis hash and spec version.
+
+    A runtime's metadata never changes for a given chain and spec version, so
+    blobs are kept forever and written atomically to survive crashes mid-write.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else self._ensure_storage_dir()
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent / "data" / "metadata"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    def path_for(self, genesis_hash: str, spec_version: int) -> Path:
+        """Location of the metadata blob for a runtime"""
+        return self.cache_dir / genesis_hash.lower() / f"{spec_version}.scale"
+
+    def get(self, genesis_hash: str, spec_version: int) -> Optional[str]:
+        """Get the hex encoded metadata of a runtime, or None if it is not cached"""
+        path = self.path_for(genesis_hash, spec_version)
+        try:
+            if path.exists():
+                return path.read_text()
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read cached metadata {path}: {e}")
+            return None
+
+    def put(self, genesis_hash: str, spec_version: int, raw_metadata: str) -> None:
+        """Store the hex encoded metadata of a runtime"""
+        path = self.path_for(genesis_hash, spec_version)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(raw_metadata)
+            os.replace(tmp_path, path)
+            logger.debug(f"Cached metadata for runtime {spec_version} of {genesis_hash}")
+        except Exception as e:
+            logger.error(f"Failed to cache metadata {path}: {e}")
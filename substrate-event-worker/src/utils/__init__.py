@@ -2,12 +2,47 @@ from .substrate import (
     get_block_hash,
     get_block_events,
     connect_to_network,
-    decode_events
+    decode_events,
+    decode_events_storage,
+    decode_events_value,
+    SYSTEM_EVENTS_STORAGE_KEY,
+    CachedSubstrateInterface
 )
+from .rpc_batch import (
+    BatchRpcClient,
+    BatchRejectedError,
+    RateLimitedError,
+    is_oversize_error,
+    is_throttle_error,
+    is_unsupported_error
+)
+from .endpoint_pool import EndpointPool, CONNECTION_ERRORS
+from .adaptive_controller import AdaptiveController
+from .hedging import HedgedReader
+from .profiler import SamplingProfiler, install_profile_signal
+from .async_rpc import AsyncRpcClient, AsyncSubscription
 
 __all__ = [
     'get_block_hash',
     'get_block_events',
     'connect_to_network',
-    'decode_events'
+    'decode_events',
+    'decode_events_storage',
+    'decode_events_value',
+    'SYSTEM_EVENTS_STORAGE_KEY',
+    'CachedSubstrateInterface',
+    'BatchRpcClient',
+    'BatchRejectedError',
+    'RateLimitedError',
+    'is_oversize_error',
+    'is_throttle_error',
+    'is_unsupported_error',
+    'EndpointPool',
+    'CONNECTION_ERRORS',
+    'AdaptiveController',
+    'HedgedReader',
+    'SamplingProfiler',
+    'install_profile_signal',
+    'AsyncRpcClient',
+    'AsyncSubscription'
 ]
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from .rpc_batch import is_throttle_error
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveController:
+    """
+    AIMD control of RPC batch size and requests in flight, per endpoint.
+
+    Every completed request nudges the limits of its endpoint: a fast success
+    raises them additively, a success slower than the profile's target latency
+    lowers them by a quarter, and an error halves them. A rate limited request
+    (HTTP 429 and friends) halves them and also pauses the endpoint, the pause
+    doubling while the endpoint keeps throttling.
+
+    Two profiles cap the limits. 'catch_up' allows the configured maxima while
+    far behind the finalized head; 'tip' keeps requests small and few once the
+    lag drops under lag_threshold, so following the chain stays light on
+    public endpoints.
+    """
+
+    def __init__(self, max_batch_size: int = 1000, max_in_flight: int = 16, min_batch_size: int = 10,
+                 lag_threshold: int = 100, tip_batch_size: int = 50, tip_in_flight: int = 2):
+        self.min_batch_size = min(min_batch_size, max_batch_size)
+        self.lag_threshold = lag_threshold
+        self.profiles = {
+            'catch_up': {'batch_size': max_batch_size, 'in_flight': max_in_flight, 'target_latency': 3.0},
+            'tip': {
+                'batch_size': max(self.min_batch_size, min(tip_batch_size, max_batch_size)),
+                'in_flight': min(tip_in_flight, max_in_flight),
+                'target_latency': 1.0
+            }
+        }
+        self.profile = 'catch_up'
+        self._endpoints: Dict[Optional[str], Dict[str, Any]] = {}
+        self._last_url = None
+        self._lock = threading.Lock()
+
+    def _state(self, url: Optional[str]) -> Dict[str, Any]:
+        """Get (or start) the limits of an endpoint, beginning at the profile's caps"""
+        if url not in self._endpoints:
+            limits = self.profiles[self.profile]
+            self._endpoints[url] = {
+                'batch_size': float(limits['batch_size']),
+                'in_flight': float(limits['in_flight']),
+                'paused_until': 0.0,
+                'pause': 0.0,
+                'latency': None
+            }
+        return self._endpoints[url]
+
+    def set_lag(self, lag: int) -> None:
+        """Pick the profile for the current distance to the finalized head"""
+        profile = 'catch_up' if lag > self.lag_threshold else 'tip'
+        if profile != self.profile:
+            logger.debug(f"Switching to the {profile} profile at a lag of {lag} blocks")
+            self.profile = profile
+            with self._lock:
+                for state in self._endpoints.values():
+                    self._clamp(state)
+
+    def _clamp(self, state: Dict[str, Any]) -> None:
+        """Keep an endpoint's limits within the active profile"""
+        limits = self.profiles[self.profile]
+        state['batch_size'] = min(max(state['batch_size'], self.min_batch_size), limits['batch_size'])
+        state['in_flight'] = min(max(state['in_flight'], 1), limits['in_flight'])
+
+    def batch_size(self, url: Optional[str] = None) -> int:
+        """Number of blocks to request at once from an endpoint"""
+        with self._lock:
+            return int(self._state(url)['batch_size'])
+
+    def in_flight(self, url: Optional[str] = None) -> int:
+        """Number of concurrent requests allowed to an endpoint"""
+        with self._lock:
+            return int(self._state(url)['in_flight'])
+
+    def delay(self, url: Optional[str] = None) -> float:
+        """Seconds to wait before the next request to a rate limited endpoint"""
+        with self._lock:
+            return max(0.0, self._state(url)['paused_until'] - time.monotonic())
+
+    def record(self, url: Optional[str], latency: float, error: Optional[Exception] = None) -> None:
+        """
+        Adjust an endpoint's limits after a request completed
+
+        Args:
+            url (str): Endpoint the request went to
+            latency (float): Seconds the request took
+            error (Exception, optional): The error the request failed with
+        """
+        limits = self.profiles[self.profile]
+        with self._lock:
+            self._last_url = url
+            state = self._state(url)
+            previous = state['latency']
+            state['latency'] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+            if error is not None and is_throttle_error(str(error)):
+                state['batch_size'] /= 2
+                state['in_flight'] /= 2
+                state['pause'] = min(max(state['pause'] * 2, 1.0), 60.0)
+                state['paused_until'] = time.monotonic() + state['pause']
+                logger.warning(f"Rate limited by {url}, pausing {state['pause']:.0f}s")
+            elif error is not None:
+                state['batch_size'] /= 2
+                state['in_flight'] /= 2
+            elif latency > limits['target_latency']:
+                state['batch_size'] *= 0.75
+                state['in_flight'] *= 0.75
+            else:
+                state['batch_size'] += max(1.0, limits['batch_size'] / 10)
+                state['in_flight'] += 1
+                state['pause'] = 0.0
+
+            self._clamp(state)
+
+    def snapshot(self, url: Optional[str] = None) -> Dict[str, Any]:
+        """Current profile and limits of an endpoint (by default the one used last), for metrics"""
+        with self._lock:
+            state = self._state(url if url is not None else self._last_url)
+            return {
+                'profile': self.profile,
+                'batch_size': int(state['batch_size']),
+                'in_flight': int(state['in_flight']),
+                'latency': state['latency']
+            }
@@ -0,0 +1,385 @@
+import asyncio
+import json
+import logging
+import ssl
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from substrateinterface.exceptions import SubstrateRequestException
+from .rpc_batch import BatchRejectedError, RateLimitedError, is_oversize_error, is_throttle_error
+from .websocket_frames import OP_CLOSE, OP_TEXT, WebSocketProtocolError, client_handshake, encode_frame, read_message
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSubscription:
+    """Notifications of one JSON-RPC subscription, in the order the node sent them"""
+
+    def __init__(self, client: 'AsyncRpcClient', unsubscribe_method: str):
+        self.client = client
+        self.unsubscribe_method = unsubscribe_method
+        self.subscription_id = None
+        self.queue = asyncio.Queue()
+
+    async def next(self) -> Any:
+        """
+        Wait for the next notification
+
+        Returns:
+            Any: The `result` of the notification
+
+        Raises:
+            ConnectionError: Once the connection of the subscription is lost
+        """
+        item = await self.queue.get()
+        if isinstance(item, Exception):
+            # Keep failing on later calls too
+            self.queue.put_nowait(item)
+            raise item
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self.next()
+        except ConnectionError:
+            raise StopAsyncIteration
+
+    async def unsubscribe(self) -> None:
+        """Cancel the subscription on the node"""
+        self.client._subscriptions.pop(self.subscription_id, None)
+        if not self.client.closed:
+            await self.client.request(self.unsubscribe_method, [self.subscription_id])
+
+
+class AsyncRpcClient:
+    """
+    JSON-RPC client multiplexing requests over one asyncio websocket connection.
+
+    Requests are written as soon as a slot of the request window is free and
+    matched to their responses by id, so many calls are outstanding at once on
+    one connection without any thread. A JSON-RPC batch takes a single slot.
+    Subscription notifications are routed to their AsyncSubscription by
+    subscription id. Node errors raise SubstrateRequestException (or
+    RateLimitedError / BatchRejectedError), like SubstrateInterface and
+    BatchRpcClient do; a lost connection fails every outstanding request and
+    subscription with ConnectionError.
+
+    A refused batch is answered with a single error without id. The error is
+    held against the batches outstanding when it arrived and settled once it can
+    only belong to one of them, as the others get their responses, or once
+    every remaining candidate has been refused.
+    """
+
+    def __init__(self, url: str, window: int = 32, timeout: float = 15):
+        self.url = url
+        self.window = max(1, window)
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+        self._next_id = 1
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._batches: Dict[int, List[int]] = {}
+        self._batch_of: Dict[int, int] = {}
+        self._rejections: List[Tuple[Any, Set[int]]] = []
+        self._subscribe_requests: Dict[int, AsyncSubscription] = {}
+        self._subscriptions: Dict[Any, AsyncSubscription] = {}
+        self._in_flight = 0
+        self._slot_freed = asyncio.Event()
+        self._read_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._error: Optional[Exception] = None
+
+    @property
+    def closed(self) -> bool:
+        return self._error is not None or self.writer is None
+
+    @property
+    def in_flight(self) -> int:
+        """Requests (or batches) sent and not answered yet"""
+        return self._in_flight
+
+    async def connect(self) -> 'AsyncRpcClient':
+        """
+        Open the websocket connection
+
+        Raises:
+            ConnectionError: If the connection or the websocket handshake failed
+        """
+        parsed = urlparse(self.url)
+        secure = parsed.scheme == 'wss'
+        port = parsed.port or (443 if secure else 80)
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        host = parsed.hostname if parsed.port is None else f"{parsed.hostname}:{parsed.port}"
+
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    parsed.hostname, port,
+                    ssl=ssl.create_default_context() if secure else None,
+                    server_hostname=parsed.hostname if secure else None
+                ),
+                self.timeout
+            )
+            await asyncio.wait_for(client_handshake(self.reader, self.writer, host, path), self.timeout)
+        except (OSError, asyncio.TimeoutError, WebSocketProtocolError) as e:
+            self._abort()
+            raise ConnectionError(f"Failed to connect to {self.url}: {e or e.__class__.__name__}") from e
+
+        self._error = None
+        self._loop = asyncio.get_running_loop()
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def _read_loop(self) -> None:
+        """Route every message of the connection to its request or subscription"""
+        try:
+            while True:
+                message = await read_message(self.reader, self.writer, mask=True)
+                if message is None:
+                    raise ConnectionError("Connection closed by the node")
+                self._dispatch(json.loads(message))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, ConnectionError):
+                e = ConnectionError(f"Connection to {self.url} lost: {e or e.__class__.__name__}")
+            self._fail(e)
+
+    def _dispatch(self, message: Any) -> None:
+        """Resolve the request or feed the subscription a message belongs to"""
+        if isinstance(message, list):
+            for item in message:
+                self._dispatch(item)
+            # The batch was answered, so it is not the one an unattributed rejection refers to
+            answered = {self._batch_of.get(item.get('id')) for item in message if isinstance(item, dict)}
+            for batch in answered - {None}:
+                self._batches.pop(batch, None)
+            self._settle_rejections()
+            return
+        if not isinstance(message, dict):
+            logger.debug(f"Ignoring unexpected message: {message}")
+            return
+
+        if 'id' not in message and 'params' in message:
+            params = message['params']
+            subscription = self._subscriptions.get(params.get('subscription'))
+            if subscription is not None:
+                subscription.queue.put_nowait(params.get('result'))
+            return
+
+        request_id = message.get('id')
+        if request_id is None and 'error' in message:
+            # A refused batch is answered with a single error without id
+            self._rejections.append((message['error'], set(self._batches)))
+            self._settle_rejections()
+            return
+
+        future = self._pending.get(request_id)
+        if future is None or future.done():
+            return
+        subscription = self._subscribe_requests.pop(request_id, None)
+        if subscription is not None and 'result' in message:
+            # Registered here, before any of its notifications is read
+            subscription.subscription_id = message['result']
+            self._subscriptions[message['result']] = subscription
+        future.set_result(message)
+
+    def _settle_rejections(self) -> None:
+        """Fail the batches unattributed rejections can be traced back to"""
+        settled = True
+        while settled and self._rejections:
+            settled = False
+            for error, candidates in self._rejections:
+                candidates.intersection_update(self._batches)
+            self._rejections = [rejection for rejection in self._rejections if rejection[1]]
+
+            for error, candidates in self._rejections:
+                # As many rejections as candidate batches: every one of them was refused
+                matching = [rejection for rejection in self._rejections if rejection[1] <= candidates]
+                if len(matching) >= len(candidates):
+                    for batch in candidates:
+                        self._reject_batch(batch, error)
+                    self._rejections = [rejection for rejection in self._rejections if rejection not in matching]
+                    settled = True
+                    break
+
+    def _reject_batch(self, batch: int, error: Any) -> None:
+        for request_id in self._batches.pop(batch, []):
+            future = self._pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_exception(self._error_for(error, 'batch'))
+
+    def _fail(self, error: Exception) -> None:
+        """Fail every outstanding request and subscription after the connection was lost"""
+        self._error = error
+        self._rejections = []
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        for subscription in self._subscriptions.values():
+            subscription.queue.put_nowait(error)
+        self._subscriptions.clear()
+        self._abort()
+
+    def _abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def _acquire(self) -> None:
+        """Wait for a free slot in the request window"""
+        while self._in_flight >= self.window:
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+        self._in_flight += 1
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._slot_freed.set()
+
+    def _register(self) -> int:
+        request_id = self._next_id
+        self._next_id += 1
+        self._pending[request_id] = asyncio.get_running_loop().create_future()
+        return request_id
+
+    def _forget(self, request_ids: List[int]) -> None:
+        for request_id in request_ids:
+            self._pending.pop(request_id, None)
+            self._subscribe_requests.pop(request_id, None)
+            batch = self._batch_of.pop(request_id, None)
+            if batch is not None and self._batches.pop(batch, None) is not None:
+                # Timed out or cancelled without an answer, it may have been the refused batch
+                self._rejections = [rejection for rejection in self._rejections if batch not in rejection[1]]
+
+    async def _send(self, payload: Any, request_ids: List[int], batch: bool = False) -> List[dict]:
+        """Write one frame and wait for the response to each of its requests"""
+        await self._acquire()
+        try:
+            if self.closed:
+                raise self._error or ConnectionError(f"Not connected to {self.url}")
+            if batch:
+                # Only batches on the wire can be the target of a rejection
+                self._batches[request_ids[0]] = request_ids
+                self._batch_of.update((request_id, request_ids[0]) for request_id in request_ids)
+            self.writer.write(encode_frame(OP_TEXT, json.dumps(payload).encode(), mask=True))
+            await self.writer.drain()
+
+            # asyncio.wait neither wraps nor cancels the futures, so no failure is left unretrieved
+            futures = [self._pending[request_id] for request_id in request_ids]
+            done, waiting = await asyncio.wait(futures, timeout=self.timeout, return_when=asyncio.FIRST_EXCEPTION)
+            errors = [future.exception() for future in done if future.exception() is not None]
+            if errors:
+                raise errors[0]
+            if waiting:
+                raise asyncio.TimeoutError()
+            return [future.result() for future in futures]
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No response from {self.url} within {self.timeout}s")
+        except OSError as e:
+            raise self._error or ConnectionError(f"Connection to {self.url} lost: {e}")
+        finally:
+            self._release()
+            self._forget(request_ids)
+
+    @staticmethod
+    def _error_for(error: Any, method: str) -> Exception:
+        """Translate a JSON-RPC error object into the matching exception"""
+        message = str(error.get('message', error) if isinstance(error, dict) else error)
+        if is_throttle_error(message):
+            return RateLimitedError(f"{method} rate limited: {message}")
+        if method == 'batch' and is_oversize_error(message):
+            return BatchRejectedError(message)
+        return SubstrateRequestException(error)
+
+    async def request(self, method: str, params: Optional[list] = None) -> Any:
+        """
+        Call a JSON-RPC method
+
+        Args:
+            method (str): JSON-RPC method name, e.g. 'chain_getBlockHash'
+            params (list, optional): Parameters of the call
+
+        Returns:
+            Any: The `result` of the call
+
+        Raises:
+            SubstrateRequestException: If the node returns an error
+        """
+        request_id = self._register()
+        payload = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id}
+        response, = await self._send(payload, [request_id])
+        if 'error' in response:
+            raise self._error_for(response['error'], method)
+        return response.get('result')
+
+    async def batch(self, method: str, params_list: List[list]) -> List[Any]:
+        """
+        Call `method` once for every entry in params_list in a single JSON-RPC batch
+
+        Returns:
+            List[Any]: The `result` of each call, in the order of params_list
+
+        Raises:
+            BatchRejectedError: If the node refuses the batch because of its size
+            SubstrateRequestException: If the node returns an error for a call
+        """
+        if not params_list:
+            return []
+        request_ids = [self._register() for _ in params_list]
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+            for request_id, params in zip(request_ids, params_list)
+        ]
+
+        results = []
+        for response in await self._send(payload, request_ids, batch=True):
+            if 'error' in response:
+                raise self._error_for(response['error'], method)
+            results.append(response.get('result'))
+        return results
+
+    async def subscribe(self, method: str, params: Optional[list] = None,
+                        unsubscribe_method: Optional[str] = None) -> AsyncSubscription:
+        """
+        Start a subscription, e.g. chain_subscribeFinalizedHeads
+
+        Args:
+            method (str): Subscription method
+            params (list, optional): Parameters of the subscription
+            unsubscribe_method (str, optional): Method cancelling it. Defaults to the
+                subscribe method with 'subscribe' replaced by 'unsubscribe'
+
+        Returns:
+            AsyncSubscription: Receives the notifications
+        """
+        subscription = AsyncSubscription(self, unsubscribe_method or method.replace('_subscribe', '_unsubscribe'))
+        request_id = self._register()
+        self._subscribe_requests[request_id] = subscription
+        payload = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id}
+        response, = await self._send(payload, [request_id])
+        if 'error' in response:
+            raise self._error_for(response['error'], method)
+        return subscription
+
+    def close(self) -> None:
+        """Close the connection, failing whatever is still outstanding"""
+        if self._loop is not None and self._loop.is_closed():
+            # The connection went down with its event loop, nothing is left to close or fail
+            self._error = self._error or ConnectionError(f"Connection to {self.url} closed")
+            self._read_task = None
+            self.writer = None
+            return
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self.writer is not None:
+            try:
+                self.writer.write(encode_frame(OP_CLOSE, b'\x03\xe8', mask=True))
+            except Exception:
+                pass
+        if self._error is None:
+            self._fail(ConnectionError(f"Connection to {self.url} closed"))
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from websocket import create_connection, WebSocketException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Errors that point at the endpoint or the connection to it rather than at the request
+CONNECTION_ERRORS = (WebSocketException, ConnectionError, TimeoutError, OSError)
+
+
+class EndpointPool:
+    """
+    RPC endpoints of one network, ordered by measured latency.
+
+    Endpoints are probed with a `system_health` round trip and ranked by a moving
+    average of their latency. An endpoint that fails to connect or drops a
+    connection goes into a cooldown that doubles with every consecutive failure,
+    so the next connection attempt immediately goes to the fastest healthy
+    endpoint instead of waiting for the failing one to recover.
+    """
+
+    def __init__(self, urls: Union[str, List[str]], cooldown: float = 30, max_cooldown: float = 300,
+                 probe_interval: float = 300, probe_timeout: float = 5):
+        self.urls = [urls] if isinstance(urls, str) else list(dict.fromkeys(urls))
+        if not self.urls:
+            raise ValueError("An endpoint pool needs at least one URL")
+
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+
+        self.latency: Dict[str, Optional[float]] = {url: None for url in self.urls}
+        self.failures: Dict[str, int] = {url: 0 for url in self.urls}
+        self.cooldown_until: Dict[str, float] = {url: 0.0 for url in self.urls}
+        self._last_probe = None
+        self._lock = threading.Lock()
+
+    def _probe_one(self, url: str) -> Optional[float]:
+        """Measure one `system_health` round trip in seconds, None if the endpoint is unreachable"""
+        try:
+            ws = create_connection(url, timeout=self.probe_timeout)
+            try:
+                started = time.monotonic()
+                ws.send(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'system_health', 'params': []}))
+                response = json.loads(ws.recv())
+                if 'error' in response:
+                    return None
+                return time.monotonic() - started
+            finally:
+                ws.close()
+        except Exception as e:
+            logger.debug(f"Probe of {url} failed: {e}")
+            return None
+
+    def probe(self) -> None:
+        """Probe every endpoint not in cooldown concurrently and update their ranking"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_probe = now
+            candidates = [url for url in self.urls if self.cooldown_until[url] <= now]
+
+        with ThreadPoolExecutor(max_workers=len(candidates) or 1) as executor:
+            results = list(zip(candidates, executor.map(self._probe_one, candidates)))
+
+        for url, latency in results:
+            if latency is None:
+                self.report_failure(url)
+            else:
+                self.report_success(url, latency)
+
+    def _maybe_probe(self) -> None:
+        """Re-rank endpoints when the last probe is older than probe_interval"""
+        if len(self.urls) < 2:
+            return
+        # Claim the probe under the lock so threads connecting at once run a single probe round
+        now = time.monotonic()
+        with self._lock:
+            stale = self._last_probe is None or now - self._last_probe >= self.probe_interval
+            if stale:
+                self._last_probe = now
+        if stale:
+            self.probe()
+
+    def ranked(self) -> List[str]:
+        """Endpoints in order of preference: healthy by latency, then cooling down by recovery time"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [url for url in self.urls if self.cooldown_until[url] <= now]
+            cooling = [url for url in self.urls if self.cooldown_until[url] > now]
+            healthy.sort(key=lambda url: float('inf') if self.latency[url] is None else self.latency[url])
+            cooling.sort(key=lambda url: self.cooldown_until[url])
+        return healthy + cooling
+
+    def best(self) -> str:
+        """The endpoint to use for the next connection"""
+        self._maybe_probe()
+        return self.ranked()[0]
+
+    def healthy_count(self) -> int:
+        """Number of endpoints not in cooldown"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for url in self.urls if self.cooldown_until[url] <= now)
+
+    def report_success(self, url: str, latency: Optional[float] = None) -> None:
+        """Record a successful request, folding its latency into the endpoint's moving average"""
+        with self._lock:
+            self.failures[url] = 0
+            self.cooldown_until[url] = 0.0
+            if latency is not None:
+                previous = self.latency[url]
+                self.latency[url] = latency if previous is None else 0.7 * previous + 0.3 * latency
+
+    def report_failure(self, url: str) -> None:
+        """Put an endpoint in cooldown after a failed connection or request"""
+        with self._lock:
+            self.failures[url] += 1
+            cooldown = min(self.cooldown * 2 ** (self.failures[url] - 1), self.max_cooldown)
+            self.cooldown_until[url] = time.monotonic() + cooldown
+        logger.warning(f"Endpoint {url} failed, cooling down for {cooldown:.0f}s")
+
+    def connect(self, factory: Callable[[str], T]) -> Tuple[str, T]:
+        """
+        Open a connection to the best endpoint that accepts one
+
+        Args:
+            factory (Callable[[str], T]): Opens a connection to a URL, raising on failure
+
+        Returns:
+            Tuple[str, T]: The URL connected to and the connection
+
+        Raises:
+            ConnectionError: If every endpoint failed
+        """
+        self._maybe_probe()
+        errors = []
+        for url in self.ranked():
+            try:
+                connection = factory(url)
+                self.report_success(url)
+                return url, connection
+            except Exception as e:
+                errors.append(f"{url}: {e}")
+                self.report_failure(url)
+        raise ConnectionError(f"All endpoints failed: {'; '.join(errors)}")
+
+    async def connect_async(self, factory: Callable[[str], Awaitable[T]]) -> Tuple[str, T]:
+        """
+        Open an asyncio connection to the best endpoint that accepts one, like connect()
+
+        Args:
+            factory (Callable[[str], Awaitable[T]]): Coroutine function opening a connection to a URL
+
+        Returns:
+            Tuple[str, T]: The URL connected to and the connection
+
+        Raises:
+            ConnectionError: If every endpoint failed
+        """
+        # Probes use blocking websockets, keep them off the event loop
+        await asyncio.to_thread(self._maybe_probe)
+        errors = []
+        for url in self.ranked():
+            try:
+                connection = await factory(url)
+                self.report_success(url)
+                return url, connection
+            except Exception as e:
+                errors.append(f"{url}: {e}")
+                self.report_failure(url)
+        raise ConnectionError(f"All endpoints failed: {'; '.join(errors)}")
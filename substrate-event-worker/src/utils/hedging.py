@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from .endpoint_pool import EndpointPool, CONNECTION_ERRORS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class HedgedReader:
+    """
+    Run blocking reads against the best endpoint, hedging slow ones.
+
+    A read is a function taking a connection. It first runs on a connection to
+    the best endpoint; if it has not answered within the `percentile` of recent
+    read latencies, the same read is started on the next endpoint (or a second
+    connection to the same one) and whichever answers first wins. The loser
+    finishes in the background and its connection goes back to the idle set.
+
+    Hedges are capped at `max_hedge_ratio` of recent reads so a slow network
+    cannot double the load on every endpoint. With hedging disabled reads simply
+    run on the best endpoint. `on_hedge` and `on_hedge_win` are called when a
+    hedge is sent and when it answers first, e.g. to count them in metrics.
+    """
+
+    def __init__(self, endpoints: EndpointPool, connect: Callable[[str], Any], enabled: bool = True,
+                 percentile: float = 95, min_delay: float = 0.2, max_delay: float = 5.0,
+                 max_hedge_ratio: float = 0.1, window: int = 200,
+                 on_error: Optional[Callable[[str, Exception], None]] = None,
+                 on_hedge: Optional[Callable[[], None]] = None,
+                 on_hedge_win: Optional[Callable[[], None]] = None):
+        self.endpoints = endpoints
+        self.connect = connect
+        self.on_error = on_error
+        self.on_hedge = on_hedge
+        self.on_hedge_win = on_hedge_win
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_ratio = max_hedge_ratio
+
+        self.latencies = deque(maxlen=window)
+        self.recent_hedges = deque(maxlen=window)
+        self.reads = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+        self._idle: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedged-read')
+
+    def threshold(self) -> float:
+        """Seconds a read may take before it is hedged: the configured percentile of recent latencies"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < 20:
+            return self.max_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(max(samples[index], self.min_delay), self.max_delay)
+
+    def _may_hedge(self) -> bool:
+        """Check the hedge budget over recent reads"""
+        with self._lock:
+            if not self.recent_hedges:
+                return True
+            return sum(self.recent_hedges) / len(self.recent_hedges) < self.max_hedge_ratio
+
+    def _checkout(self, url: str) -> Any:
+        """Take an idle connection to an endpoint, or open a new one"""
+        with self._lock:
+            idle = self._idle.get(url)
+            if idle:
+                return idle.pop()
+        return self.connect(url)
+
+    def _checkin(self, url: str, connection: Any) -> None:
+        """Return a healthy connection to the idle set"""
+        with self._lock:
+            self._idle.setdefault(url, []).append(connection)
+
+    def _run(self, url: str, read: Callable[[Any], T]) -> T:
+        """Run a read on a connection to `url` (runs in a worker thread)"""
+        try:
+            connection = self._checkout(url)
+        except Exception as e:
+            self.endpoints.report_failure(url)
+            self._report_error(url, e)
+            raise
+
+        started = time.monotonic()
+        try:
+            result = read(connection)
+        except Exception as e:
+            if isinstance(e, CONNECTION_ERRORS):
+                self.endpoints.report_failure(url)
+                self._close(connection)
+            else:
+                self._checkin(url, connection)
+            self._report_error(url, e)
+            raise
+
+        latency = time.monotonic() - started
+        with self._lock:
+            self.latencies.append(latency)
+        self.endpoints.report_success(url, latency)
+        self._checkin(url, connection)
+        return result
+
+    def _report_error(self, url: str, error: Exception) -> None:
+        """Pass a failed read to the on_error callback"""
+        if self.on_error is not None:
+            try:
+                self.on_error(url, error)
+            except Exception as e:
+                logger.debug(f"Error callback failed: {e}")
+
+    @staticmethod
+    def _report_hedge(callback: Optional[Callable[[], None]]) -> None:
+        """Call the on_hedge or on_hedge_win callback"""
+        if callback is not None:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Hedge callback failed: {e}")
+
+    def read(self, read: Callable[[Any], T]) -> T:
+        """
+        Run a read, hedging it on a second endpoint if it is slow
+
+        Args:
+            read (Callable[[Any], T]): Blocking function performing the read on a connection
+
+        Returns:
+            T: The result of whichever attempt answered first
+        """
+        urls = self.endpoints.ranked()
+        primary = self._executor.submit(self._run, urls[0], read)
+
+        with self._lock:
+            self.reads += 1
+
+        hedge = None
+        if self.enabled:
+            wait([primary], timeout=self.threshold())
+            if not primary.done() and self._may_hedge():
+                secondary_url = urls[1] if len(urls) > 1 else urls[0]
+                hedge = self._executor.submit(self._run, secondary_url, read)
+                logger.debug(f"Hedging slow read on {urls[0]} with {secondary_url}")
+
+        with self._lock:
+            self.recent_hedges.append(hedge is not None)
+            if hedge is not None:
+                self.hedged += 1
+
+        if hedge is None:
+            return primary.result()
+        self._report_hedge(self.on_hedge)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                        self._report_hedge(self.on_hedge_win)
+                    return future.result()
+
+        # Both attempts failed, report the error of the primary read
+        return primary.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedging counters for metrics"""
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                'reads': self.reads,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'threshold': threshold
+            }
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Close every idle connection and stop the worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle = {}
+        for connection in connections:
+            self._close(connection)
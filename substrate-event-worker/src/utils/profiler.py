@@ -0,0 +1,140 @@
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Low overhead sampling profiler for a running worker.
+
+    A background thread snapshots the stack of every other thread with
+    sys._current_frames() every `interval` seconds and counts identical stacks.
+    Nothing is hooked into the profiled code, so it can run against a live
+    worker. The result is written in the collapsed stack format ("thread;outer;
+    ...;inner count" per line) read by flamegraph.pl, speedscope and inferno.
+
+    Threads of one pool (block-fetch_0, block-fetch_1, ...) are merged under the
+    pool name. A thread blocked on a socket shows up in the read it waits in, so
+    RPC waits, decoding and rendering can be told apart.
+    """
+
+    def __init__(self, interval: float = 0.01, output_dir: Optional[Path] = None):
+        self.interval = interval
+        self.output_dir = Path(output_dir) if output_dir else self._ensure_storage_dir()
+        self.samples = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _ensure_storage_dir(self) -> Path:
+        """Ensure storage directory exists"""
+        storage_dir = Path(__file__).parent.parent / "storage" / "data" / "profiles"
+        storage_dir.mkdir(parents=True, exist_ok=True)
+        return storage_dir
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """
+        Start sampling in the background
+
+        Args:
+            duration (float, optional): Seconds to sample before writing the profile. Defaults to until stop()
+
+        Returns:
+            bool: False if a profile is already being taken
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.samples = Counter()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), name='profiler', daemon=True)
+            self._thread.start()
+
+        window = f"for {duration:g}s" if duration else "until stopped"
+        logger.info(f"Profiling every {self.interval * 1000:.0f}ms {window}")
+        return True
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the profile to be written"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration: Optional[float]) -> None:
+        started = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if duration and time.monotonic() - started >= duration:
+                break
+        self.write()
+
+    def _sample(self) -> None:
+        """Count the current stack of every thread but the profiler's own"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Merge the numbered threads of a pool
+            thread_name = re.sub(r'[_-]\d+$', '', names.get(ident, str(ident)))
+            stack.append(thread_name)
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self) -> Optional[Path]:
+        """Write the collapsed stacks sampled so far, returning the file written"""
+        if not self.samples:
+            logger.warning("No profile samples collected")
+            return None
+
+        path = self.output_dir / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        try:
+            with open(path, 'w') as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except Exception as e:
+            logger.error(f"Failed to write profile {path}: {e}")
+            return None
+
+        logger.info(f"Wrote {sum(self.samples.values())} samples to {path}")
+        return path
+
+
+def install_profile_signal(profiler: SamplingProfiler, duration: float) -> bool:
+    """
+    Take a profile of `duration` seconds whenever the process receives SIGUSR1
+
+    Must be called from the main thread. Returns False on platforms without SIGUSR1.
+    """
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+
+    def start():
+        if not profiler.start(duration):
+            logger.warning("A profile is already being taken")
+
+    def handle(signum, frame):
+        # Keep the handler itself trivial, it interrupts whatever the main thread is doing
+        threading.Thread(target=start, daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, handle)
+    return True
@@ -0,0 +1,171 @@
+import json
+import logging
+from typing import Any, List, Optional
+from substrateinterface import SubstrateInterface
+from substrateinterface.exceptions import SubstrateRequestException
+from websocket import WebSocketConnectionClosedException
+
+logger = logging.getLogger(__name__)
+
+# Error messages nodes use when a batch or its response exceeds their limits
+OVERSIZE_MARKERS = ('too big', 'too large', 'too many', 'limit', 'exceeded', 'oversized')
+
+
+# Error messages nodes and their proxies use when rate limiting a client
+THROTTLE_MARKERS = ('429', 'too many requests', 'rate limit', 'ratelimit', 'throttl')
+
+# JSON-RPC error code of an unknown method, also used by nodes refusing unsafe methods
+METHOD_NOT_FOUND = -32601
+
+# Error messages nodes use when a method is not exposed to the client
+UNSUPPORTED_MARKERS = ('method not found', 'unsafe')
+
+
+def is_oversize_error(message: str) -> bool:
+    """Check whether a node error message means a request or response was too large"""
+    return any(marker in message.lower() for marker in OVERSIZE_MARKERS)
+
+
+def is_throttle_error(message: str) -> bool:
+    """Check whether an error message means the client is being rate limited"""
+    return any(marker in message.lower() for marker in THROTTLE_MARKERS)
+
+
+def is_unsupported_error(code: Optional[int], message: str) -> bool:
+    """Check whether a node error means the method is not available, e.g. an unsafe method on a public node"""
+    return code == METHOD_NOT_FOUND or any(marker in message.lower() for marker in UNSUPPORTED_MARKERS)
+
+
+class BatchRejectedError(Exception):
+    """Raised when a node refuses a batch because of its size"""
+    pass
+
+
+class RateLimitedError(SubstrateRequestException):
+    """Raised when a node or its proxy rate limits the client"""
+    pass
+
+
+class BatchRpcClient:
+    """
+    Send JSON-RPC batch requests over the websocket of a SubstrateInterface.
+
+    Many calls to the same method are packed into a single JSON array frame. When
+    a node rejects a batch or drops the connection because the batch or its
+    response is too large, the batch size is halved and the request retried; it
+    grows back gradually after consecutive successes. A dropped connection only
+    counts as a rejection for batches of at least `min_oversize_batch` calls:
+    smaller batches, and timeouts of any batch, point at a failing endpoint and
+    are raised as connection errors so the caller fails over right away.
+    """
+
+    def __init__(self, substrate: SubstrateInterface, max_batch_size: int = 1000, min_batch_size: int = 1,
+                 growth_interval: int = 10, min_oversize_batch: int = 50):
+        self.substrate = substrate
+        self.max_batch_size = max_batch_size
+        self.min_batch_size = min_batch_size
+        self.min_oversize_batch = min_oversize_batch
+        self.growth_interval = growth_interval
+        self.batch_size = max_batch_size
+        self._successes = 0
+
+    def request(self, method: str, params_list: List[list]) -> List[Any]:
+        """
+        Call `method` once for every entry in params_list using as few batches as possible
+
+        Args:
+            method (str): JSON-RPC method name, e.g. 'chain_getBlockHash'
+            params_list (List[list]): Parameters for each call
+
+        Returns:
+            List[Any]: The `result` of each call, in the order of params_list
+
+        Raises:
+            SubstrateRequestException: If the node returns an error for a call
+            WebSocketException, ConnectionError: If the connection timed out or failed
+        """
+        results = []
+        offset = 0
+
+        while offset < len(params_list):
+            chunk = params_list[offset:offset + self.batch_size]
+            try:
+                results.extend(self._send_batch(method, chunk))
+            except BatchRejectedError as e:
+                if self.batch_size <= self.min_batch_size:
+                    raise SubstrateRequestException(f"Batch of {len(chunk)} {method} calls rejected: {e}")
+                self._shrink(e)
+                continue
+
+            offset += len(chunk)
+            self._grow()
+
+        return results
+
+    def _send_batch(self, method: str, params_chunk: List[list]) -> List[Any]:
+        """Send a single batch and return results ordered like params_chunk"""
+        first_id = self.substrate.request_id
+        self.substrate.request_id += len(params_chunk)
+
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": first_id + index}
+            for index, params in enumerate(params_chunk)
+        ]
+        request_ids = set(item['id'] for item in payload)
+
+        # A failed send or a timeout is left to the caller as a connection error
+        self.substrate.websocket.send(json.dumps(payload))
+        try:
+            response = None
+            while response is None:
+                message = json.loads(self.substrate.websocket.recv())
+                if isinstance(message, list):
+                    response = message
+                elif 'error' in message and message.get('id') in (None, *request_ids):
+                    # The batch as a whole was refused
+                    self._raise_for_error(message['error'], method)
+                else:
+                    logger.debug(f"Ignoring unrelated message while waiting for batch: {message}")
+        except (WebSocketConnectionClosedException, ConnectionError) as e:
+            if len(params_chunk) < self.min_oversize_batch:
+                raise
+            # Nodes commonly drop the connection instead of sending oversized responses
+            self.substrate.connect_websocket()
+            raise BatchRejectedError(str(e) or e.__class__.__name__)
+
+        by_id = {item.get('id'): item for item in response}
+        results = []
+        for item in payload:
+            message = by_id.get(item['id'])
+            if message is None:
+                raise BatchRejectedError(f"Missing response for request #{item['id']}")
+            if 'error' in message:
+                self._raise_for_error(message['error'], method)
+            results.append(message.get('result'))
+
+        return results
+
+    @staticmethod
+    def _raise_for_error(error: Optional[dict], method: str) -> None:
+        """Translate a JSON-RPC error object into the matching exception"""
+        message = str((error or {}).get('message', error))
+        if is_throttle_error(message):
+            # Checked first: "too many requests" would otherwise read as an oversized batch
+            raise RateLimitedError(f"{method} rate limited: {message}")
+        if is_oversize_error(message):
+            raise BatchRejectedError(message)
+        raise SubstrateRequestException(f"{method} failed: {message}")
+
+    def _shrink(self, reason: Exception) -> None:
+        """Halve the batch size after a rejection"""
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        self._successes = 0
+        logger.warning(f"Batch rejected ({reason}), reducing batch size to {self.batch_size}")
+
+    def _grow(self) -> None:
+        """Double the batch size again after enough consecutive successes"""
+        self._successes += 1
+        if self.batch_size < self.max_batch_size and self._successes >= self.growth_interval:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+            self._successes = 0
+            logger.debug(f"Increasing batch size to {self.batch_size}")
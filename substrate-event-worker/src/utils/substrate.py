@@ -1,11 +1,97 @@
 from substrateinterface import SubstrateInterface
-from typing import Optional, Dict, List, Any
+from substrateinterface.exceptions import SubstrateRequestException
+from scalecodec.base import ScaleBytes
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
 import logging
+import threading
+from ..storage.metadata_cache import MetadataCache
 
 logger = logging.getLogger(__name__)
 
+# twox128("System") ++ twox128("Events"), identical for every runtime
+SYSTEM_EVENTS_STORAGE_KEY = '0x26aa394eea5630e07c48ae0c9558cef780d41e5e16056765bc8461851072c9d7'
 
-def connect_to_network(url: str, timeout: int = 15) -> Optional[SubstrateInterface]:
+# Decoded metadata shared by every connection in the process, keyed by (genesis_hash, spec_version)
+_decoded_metadata: Dict[Tuple[str, int], Any] = {}
+_decoded_metadata_lock = threading.Lock()
+
+
+class CachedSubstrateInterface(SubstrateInterface):
+    """
+    SubstrateInterface that keeps runtime metadata across connections.
+
+    Metadata is looked up by (genesis_hash, spec_version), first among runtimes
+    already decoded in this process, then in the on-disk MetadataCache, and only
+    downloaded with state_getMetadata when neither has it. Reconnects within a
+    process therefore skip both the download and the decode; cold starts of a
+    known runtime skip the download but still decode the cached blob. The type
+    registry is rebuilt from the metadata on every connection either way:
+    scalecodec's decoded objects and registry types are generated classes that
+    cannot be persisted.
+    """
+
+    def __init__(self, *args, metadata_cache: Optional[MetadataCache] = None, **kwargs):
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self._genesis_hash = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def genesis_hash(self) -> str:
+        """Hash of block 0, identifying the chain independently of the endpoint"""
+        if self._genesis_hash is None:
+            self._genesis_hash = self.get_block_hash(0)
+        return self._genesis_hash
+
+    def cached_metadata_path(self) -> Optional[Path]:
+        """Location of the current runtime's metadata in the on-disk cache, if stored there"""
+        if self.runtime_version is None:
+            return None
+        path = self.metadata_cache.path_for(self.genesis_hash, self.runtime_version)
+        return path if path.exists() else None
+
+    def init_runtime(self, block_hash=None, block_id=None):
+        try:
+            return super().init_runtime(block_hash=block_hash, block_id=block_id)
+        except Exception:
+            # init_runtime records the block and spec version before loading the runtime, so a
+            # failed call would make the next one for the same runtime return early without it
+            self.block_hash = self.block_id = None
+            self.runtime_version = None
+            raise
+
+    def get_block_metadata(self, block_hash=None, decode=True):
+        # init_runtime sets runtime_version before asking for the metadata, so the
+        # spec version is known here; without it fall back to a plain download
+        if not decode or self.runtime_version is None:
+            return super().get_block_metadata(block_hash=block_hash, decode=decode)
+
+        key = (self.genesis_hash, self.runtime_version)
+        with _decoded_metadata_lock:
+            metadata = _decoded_metadata.get(key)
+        if metadata is not None:
+            self.debug_message(f'Retrieved metadata for {self.runtime_version} from process cache')
+            return metadata
+
+        raw_metadata = self.metadata_cache.get(*key)
+        if raw_metadata is None:
+            response = super().get_block_metadata(block_hash=block_hash, decode=False)
+            raw_metadata = response.get('result')
+            if not raw_metadata:
+                raise SubstrateRequestException(f"No metadata for block '{block_hash}'")
+            self.metadata_cache.put(*key, raw_metadata)
+        else:
+            self.debug_message(f'Retrieved metadata for {self.runtime_version} from disk cache')
+
+        metadata = self.runtime_config.create_scale_object('MetadataVersioned', data=ScaleBytes(raw_metadata))
+        metadata.decode()
+
+        with _decoded_metadata_lock:
+            _decoded_metadata.setdefault(key, metadata)
+        return metadata
+
+
+def connect_to_network(url: str, timeout: int = 15) -> Optional[CachedSubstrateInterface]:
     """
     Establish connection to a substrate network
 
@@ -14,10 +100,10 @@ def connect_to_network(url: str, timeout: int = 15) -> Optional[SubstrateInterfa
         timeout (int): Connection timeout in seconds
 
     Returns:
-        Optional[SubstrateInterface]: Connected substrate interface or None if connection fails
+        Optional[CachedSubstrateInterface]: Connected substrate interface or None if connection fails
     """
     try:
-        substrate = SubstrateInterface(
+        substrate = CachedSubstrateInterface(
             url=url,
             ws_options={'timeout': timeout}
         )
@@ -68,6 +154,47 @@ def get_block_events(substrate: SubstrateInterface, block_hash: str) -> Optional
         return None
 
 
+def decode_events_storage(substrate: SubstrateInterface, raw_events: str) -> List[Dict[str, Any]]:
+    """
+    Decode raw System.Events storage with the runtime currently loaded in `substrate`
+
+    Unlike `substrate.query`, this does not re-detect the runtime for a block hash;
+    callers are expected to have loaded the right runtime with `init_runtime` first.
+
+    Args:
+        substrate (SubstrateInterface): Connected substrate interface
+        raw_events (str): Hex encoded storage value of System.Events
+
+    Returns:
+        List[Dict[str, Any]]: Decoded event records
+    """
+    return decode_events_value(substrate.runtime_config, substrate.metadata, raw_events)
+
+
+def decode_events_value(runtime_config, metadata, raw_events: str) -> List[Dict[str, Any]]:
+    """
+    Decode raw System.Events storage with an explicit runtime configuration and metadata
+
+    Args:
+        runtime_config: Runtime configuration with the runtime's type registry loaded
+        metadata: Decoded runtime metadata
+        raw_events (str): Hex encoded storage value of System.Events
+
+    Returns:
+        List[Dict[str, Any]]: Decoded event records, each with its position in the block as 'event_idx'
+    """
+    storage_function = metadata.get_metadata_pallet('System').get_storage_function('Events')
+    events = runtime_config.create_scale_object(
+        type_string=storage_function.get_value_type_string(),
+        data=ScaleBytes(raw_events),
+        metadata=metadata
+    )
+    records = events.decode()
+    for event_idx, record in enumerate(records):
+        record['event_idx'] = event_idx
+    return records
+
+
 def decode_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Decode and clean up event data
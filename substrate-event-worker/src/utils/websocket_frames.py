@@ -0,0 +1,197 @@
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+# RFC 6455 constants
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Largest message accepted, substrate nodes default to a 15 MiB response limit
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class WebSocketProtocolError(Exception):
+    """Raised on a malformed handshake or frame, or when the peer closes the connection"""
+    pass
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept value for a Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = False) -> bytes:
+    """
+    Encode a single final frame
+
+    Args:
+        opcode (int): Frame opcode, e.g. OP_TEXT
+        payload (bytes): Frame payload
+        mask (bool, optional): Mask the payload, required for frames sent by clients. Defaults to False
+
+    Returns:
+        bytes: The encoded frame
+    """
+    length = len(payload)
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+
+    if not mask:
+        return bytes(header) + payload
+
+    masking_key = os.urandom(4)
+    return bytes(header) + masking_key + _apply_mask(payload, masking_key)
+
+
+def _apply_mask(payload: bytes, masking_key: bytes) -> bytes:
+    """XOR a payload with a 4 byte masking key, using one big integer operation instead of a byte loop"""
+    if not payload:
+        return payload
+    repeated = (masking_key * (len(payload) // 4 + 1))[:len(payload)]
+    masked = int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')
+    return masked.to_bytes(len(payload), 'big')
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+    """
+    Read one frame, unmasking its payload
+
+    Returns:
+        Tuple[bool, int, bytes]: The FIN flag, opcode and payload of the frame
+    """
+    try:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', await reader.readexactly(8))[0]
+        if length > MAX_MESSAGE_SIZE:
+            raise WebSocketProtocolError(f"Frame of {length} bytes exceeds the message size limit")
+        masking_key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise WebSocketProtocolError("Connection closed")
+
+    if masking_key:
+        payload = _apply_mask(payload, masking_key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       mask: bool = False) -> Optional[bytes]:
+    """
+    Read one complete data message, answering pings along the way
+
+    Args:
+        reader (asyncio.StreamReader): Stream to read from
+        writer (asyncio.StreamWriter): Stream pongs and close replies are written to
+        mask (bool, optional): Mask control frames sent back, True on the client side. Defaults to False
+
+    Returns:
+        Optional[bytes]: The message payload, None once the peer closed the connection
+    """
+    fragments = []
+    size = 0
+    while True:
+        fin, opcode, payload = await read_frame(reader)
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload, mask))
+            continue
+        if opcode == OP_PONG:
+            continue
+        if opcode == OP_CLOSE:
+            writer.write(encode_frame(OP_CLOSE, payload[:2], mask))
+            return None
+
+        fragments.append(payload)
+        size += len(payload)
+        if size > MAX_MESSAGE_SIZE:
+            raise WebSocketProtocolError(f"Message of over {size} bytes exceeds the message size limit")
+        if fin:
+            return b''.join(fragments)
+
+
+async def _read_http_head(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+    """Read an HTTP request or status line and its headers (lower case names)"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        raise WebSocketProtocolError("Incomplete handshake")
+
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def server_handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> str:
+    """
+    Accept the opening handshake of a websocket client
+
+    Returns:
+        str: The requested path
+
+    Raises:
+        WebSocketProtocolError: If the request is not a websocket upgrade
+    """
+    request_line, headers = await _read_http_head(reader)
+    parts = request_line.split(' ')
+    key = headers.get('sec-websocket-key')
+    if len(parts) < 2 or parts[0] != 'GET' or not key or 'websocket' not in headers.get('upgrade', '').lower():
+        writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        raise WebSocketProtocolError(f"Not a websocket upgrade: {request_line}")
+
+    writer.write((
+        'HTTP/1.1 101 Switching Protocols\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n'
+    ).encode())
+    await writer.drain()
+    return parts[1]
+
+
+async def client_handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str,
+                           path: str = '/') -> None:
+    """
+    Perform the opening handshake of a websocket client
+
+    Raises:
+        WebSocketProtocolError: If the server does not switch to the websocket protocol
+    """
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: {host}\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Key: {key}\r\n'
+        'Sec-WebSocket-Version: 13\r\n\r\n'
+    ).encode())
+    await writer.drain()
+
+    status_line, headers = await _read_http_head(reader)
+    if ' 101 ' not in f"{status_line} ":
+        raise WebSocketProtocolError(f"Handshake rejected: {status_line}")
+    if headers.get('sec-websocket-accept') != accept_key(key):
+        raise WebSocketProtocolError("Handshake failed: bad Sec-WebSocket-Accept")